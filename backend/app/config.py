@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict
 import json
 from pydantic import field_validator
 
@@ -24,6 +24,89 @@ class Settings(BaseSettings):
     # API配置
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    api_compression_enabled: bool = True  # 按 Accept-Encoding 压缩较大的响应（brotli/gzip）
+    api_compression_min_size: int = 1024  # 小于该大小（字节）的响应不压缩
+
+    # 爬虫HTTP并发配置（复用浏览器登录态的requests会话）
+    crawler_workers: int = 4  # 并发抓取线程数
+    crawler_requests_per_second: float = 4.0  # 全局请求速率上限（所有线程共享）
+    crawler_max_retries: int = 3  # 单个页面的最大重试次数
+    crawler_request_timeout: int = 15  # 单个请求超时（秒）
+    
+    # 获取图片列表时优先使用阅读页内嵌的完整图片列表（一次请求），页数不一致时回退到逐页扫描
+    crawler_use_gallery_list: bool = True
+    
+    # 从分页缩略图直接推导原图URL（抽样HEAD校验，失败的页面再访问查看页）
+    crawler_derive_from_thumbnails: bool = True
+    crawler_thumbnail_verify_samples: int = 3  # 抽样校验的图片数量
+    
+    # 图片发现与下载之间的有界队列容量（发现最多领先下载的图片数）
+    image_pipeline_queue_size: int = 32
+    
+    # 镜像站选择：并发探测发布页上的所有地址，按延迟排序并缓存
+    mirror_cache_ttl: int = 1800  # 探测结果缓存时间（秒），过期后在后台重新探测
+    mirror_probe_timeout: int = 5  # 单个镜像探测超时（秒）
+    mirror_failover_threshold: int = 3  # 当前镜像连续失败多少次后切换到次优镜像（浏览器访问和HTTP抓取共用计数）
+    mirror_refresh_enabled: bool = True  # 启动后在后台按 mirror_cache_ttl 定期重新探测
+    
+    # 图片服务器选择：根据真实下载的吞吐量和错误率，把图片请求改写到最快的等价服务器
+    image_host_selection: bool = True
+    image_host_min_samples: int = 3  # 服务器参与评分前需要的下载次数
+    image_host_reevaluate_interval: int = 300  # 服务器超过该时间（秒）未使用时重新探测
+    # 提供相同路径的等价图片域名（例如 ["wnimg.ru", "qy0.ru"]，JSON数组或逗号分隔），同域名下的 imgN 服务器默认等价
+    image_host_equivalent_domains: List[str] = []
+    
+    # 收藏夹增量同步：每个分类只爬取到上次同步的位置，定期完整遍历作为兜底
+    collection_incremental_sync: bool = True
+    collection_known_run: int = 10  # 连续遇到多少个已知漫画后停止翻页
+    collection_full_sync_days: int = 7  # 分类超过多少天未完整遍历时执行一次完整遍历
+    sync_batch_size: int = 50  # 同步时批量写入数据库的记录数
+    
+    # 漫画详情缓存有效期（小时），同步、下载和API共用，过期后重新抓取详情页
+    details_cache_ttl_hours: float = 24 * 7
+    
+    # 爬虫HTTP磁盘缓存（支持ETag/Last-Modified条件请求，按最近访问时间淘汰）
+    http_cache_enabled: bool = True
+    http_cache_dir: str = "./cache/http"
+    http_cache_max_mb: int = 200
+    # URL模式（正则） -> 有效期（秒）；有效期内不发请求，过期后发送条件请求，0表示每次都重新验证
+    http_cache_ttls: Dict[str, int] = {
+        r"photos-index-": 24 * 3600,  # 漫画分页（内容基本不变）
+        r"photos-gallery-aid-": 24 * 3600,  # 阅读页图片列表
+        r"photos-view-id-": 7 * 24 * 3600,  # 图片查看页
+        r"users-users_fav": 0,  # 收藏夹列表
+        r"/q/": 0,  # 搜索结果
+    }
+    
+    # 每个SSE客户端最多缓存的消息数（客户端消费不及时时丢弃最旧的消息）
+    sse_queue_max_size: int = 200
+    
+    # 任务进度写入数据库的间隔（进度推送不受影响，状态变化立即写入）
+    progress_flush_interval_seconds: float = 2.0
+    progress_flush_percent_step: int = 5  # 进度变化超过该百分比时立即写入
+    
+    # 中断任务恢复：sync/sync_recent_updates 定期保存爬取检查点，重启或重新触发时从检查点继续
+    resume_tasks_on_startup: bool = True  # 启动时自动恢复被中断的任务
+    checkpoint_max_age_hours: float = 24  # 超过该时间的检查点不再恢复
+    checkpoint_interval_seconds: int = 30  # 爬取过程中保存检查点的最小间隔（秒）
+    
+    # 任务历史保留：超过保留期的已完成/失败任务移到归档表，定期执行
+    task_retention_enabled: bool = True
+    task_retention_interval_hours: float = 24  # 执行间隔（小时）
+    task_retention_batch_size: int = 1000  # 每批归档和删除的任务数
+    task_retention_default_days: int = 30  # 未单独配置的任务类型的保留天数
+    # 任务类型 -> 保留天数（JSON对象），0表示不保留直接归档
+    task_retention_days: Dict[str, int] = {
+        "download": 30,
+        "batch_download": 30,
+        "sync": 14,
+        "sync_recent_updates": 7,
+    }
+    
+    # 最近更新：每个作者按自适应间隔检查（有新作品时缩短间隔，没有时延长）
+    author_watch_initial_interval_hours: float = 24
+    author_watch_min_interval_hours: float = 6
+    author_watch_max_interval_hours: float = 24 * 14
     
     # 最近更新搜索时排除的分类/作者名（环境变量可以是JSON数组或逗号分隔的字符串）
     excluded_categories: List[str] = [
@@ -31,10 +114,10 @@ class Settings(BaseSettings):
         "一般", "真人", "同人"
     ]
     
-    @field_validator('excluded_categories', mode='before')
+    @field_validator('excluded_categories', 'image_host_equivalent_domains', mode='before')
     @classmethod
     def parse_excluded_categories(cls, v):
-        """解析排除分类配置（支持JSON数组或逗号分隔的字符串）"""
+        """解析列表配置（支持JSON数组或逗号分隔的字符串）"""
         if isinstance(v, str):
             # 尝试解析为JSON数组
             try:
@@ -1,4 +1,6 @@
 """爬虫基础类 - 整合所有功能模块"""
+import threading
+from typing import Dict, Optional
 from app.crawler.browser import BrowserManager
 from app.crawler.collection import CollectionCrawler
 from app.crawler.manga_details import MangaDetailsCrawler
@@ -32,22 +34,35 @@ class MangaCrawler:
         """登录网站"""
         return self.browser.login(username, password)
     
-    def get_collection_stream(self):
-        """获取收藏夹中的所有漫画（生成器版本）"""
-        return self.collection.get_collection_stream()
+    def get_collection_stream(self, known_keys: Optional[set] = None,
+                              high_water_marks: Optional[Dict[str, Optional[str]]] = None,
+                              category_callback=None, progress_callback=None,
+                              resume: Optional[Dict] = None, page_callback=None):
+        """获取收藏夹中的所有漫画（生成器版本，按分类并发、增量爬取，支持从检查点恢复）"""
+        return self.collection.get_collection_stream(known_keys, high_water_marks, category_callback, progress_callback,
+                                                     resume, page_callback)
     
     def get_manga_details(self, manga_url: str):
         """获取漫画详情（页数、更新日期、封面等）"""
         return self.details.get_manga_details(manga_url)
     
-    def get_manga_images(self, manga_url: str):
-        """获取漫画的所有图片URL，按显示顺序"""
-        return self.details.get_manga_images(manga_url)
+    def get_manga_details_http(self, manga_url: str):
+        """通过HTTP获取漫画详情（可在工作线程中并发调用，失败时抛出异常）"""
+        return self.details.get_manga_details_http(manga_url)
+    
+    def get_manga_images(self, manga_url: str, expected_count: Optional[int] = None,
+                         stop_event: Optional[threading.Event] = None):
+        """获取漫画的所有图片URL，按显示顺序（生成器，边扫描边产出）"""
+        return self.details.get_manga_images(manga_url, expected_count, stop_event)
     
     def search_author_updates(self, author_name: str, since_date):
         """搜索作者并获取更新"""
         return self.search.search_author_updates(author_name, since_date)
     
+    def search_author_updates_http(self, author_name: str, since_date):
+        """通过HTTP搜索作者并获取更新（可在工作线程中并发调用，失败时抛出异常）"""
+        return self.search.search_author_updates_http(author_name, since_date)
+    
     def close(self):
         """关闭浏览器"""
         self.browser.close()
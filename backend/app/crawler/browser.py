@@ -1,8 +1,13 @@
 """浏览器管理和登录模块"""
 import time
 import os
-from typing import Optional
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlparse
 from app.config import settings
+from app.crawler.http_client import HttpFetcher, USER_AGENT
+from app.crawler.mirrors import mirror_selector
+from app.crawler.parser import parse_html
 from app.utils.logger import logger, get_error_message
 
 # 可选的Selenium导入
@@ -25,6 +30,12 @@ class BrowserManager:
     def __init__(self):
         self.base_url: Optional[str] = None
         self.driver: Optional[webdriver.Chrome] = None
+        self.http = HttpFetcher(self)  # 复用登录态的HTTP抓取器（用于并发抓取）
+        self._credentials: Optional[Tuple[str, str]] = None  # 故障切换镜像后重新登录使用
+        self._failure_lock = threading.Lock()
+        self._consecutive_failures = 0  # 当前镜像的连续失败次数
+        self._switch_lock = threading.Lock()
+        self._relogin_pending = False  # HTTP线程切换镜像后，浏览器需要在新镜像上重新登录
         self._init_driver()
     
     def _init_driver(self):
@@ -35,7 +46,7 @@ class BrowserManager:
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
         
         # 在Docker环境中，chromedriver可能在/usr/local/bin/chromedriver或/usr/bin/chromedriver
         chromedriver_paths = [
@@ -74,74 +85,18 @@ class BrowserManager:
             self.driver = None
     
     def get_available_url(self) -> Optional[str]:
-        """从发布页获取可用的漫画网站地址（根据页面布局和元素结构查找）"""
-        import requests
-        from bs4 import BeautifulSoup
-        
-        try:
-            response = requests.get(settings.publish_page_url, timeout=10)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            urls = []
-            
-            # 根据页面布局查找：在ul列表的li元素中查找target="_blank"的链接
-            # 这些链接通常就是漫画网站地址
-            ul_lists = soup.find_all('ul')
-            
-            for ul in ul_lists:
-                # 查找ul中的所有li元素
-                li_items = ul.find_all('li')
-                
-                for li in li_items:
-                    # 在每个li中查找target="_blank"的链接（根据页面结构特征）
-                    links = li.find_all('a', {'target': '_blank'}, href=True)
-                    
-                    for link in links:
-                        href = link.get('href', '')
-                        
-                        # 排除发布页本身和chrome浏览器链接（根据URL特征）
-                        if 'wn01.link' in href or 'google.cn' in href:
-                            continue
-                        
-                        # 检查链接内部是否有i标签（页面结构特征）
-                        # 漫画网站链接通常有i标签包裹文本
-                        if link.find('i') and href.startswith('http'):
-                            urls.append(href)
-            
-            # 如果上面的方法没找到，尝试备用方法：查找所有ul中li内的链接
-            if not urls:
-                for ul in ul_lists:
-                    li_items = ul.find_all('li')
-                    for li in li_items:
-                        links = li.find_all('a', href=True)
-                        for link in links:
-                            href = link.get('href', '')
-                            # 排除发布页和chrome链接
-                            if 'wn01.link' in href or 'google.cn' in href:
-                                continue
-                            # 检查是否是http/https链接
-                            if href.startswith('http'):
-                                urls.append(href)
-            
-            # 尝试连接每个URL，返回第一个可用的
-            for url in urls:
-                try:
-                    test_response = requests.get(f"{url}/", timeout=5)
-                    if test_response.status_code == 200:
-                        logger.info(f"找到可用的漫画网站地址: {url}")
-                        return url
-                except:
-                    continue
-            
+        """获取当前最优的漫画网站地址（并发探测发布页上的所有地址，按延迟排序并缓存）"""
+        url = mirror_selector.get_best()
+        if url:
+            logger.info(f"找到可用的漫画网站地址: {url}")
+        else:
             logger.warning("未找到可用的漫画网站地址")
-            return None
-        except Exception as e:
-            logger.error(f"获取网站地址失败: {get_error_message(e)}")
-            return None
+        return url
     
     def login(self, username: str, password: str) -> bool:
         """登录网站"""
+        self._credentials = (username, password)
+        
         if not self.base_url:
             self.base_url = self.get_available_url()
             if not self.base_url:
@@ -186,6 +141,8 @@ class BrowserManager:
             page_source = self.driver.page_source
             if "users-login" not in current_url or "我的空間" in page_source or username in page_source:
                 logger.info("登录成功，已保存cookies")
+                # 同步登录态到HTTP抓取器
+                self.http.sync_from_browser()
                 return True
             
             logger.warning("登录可能失败，仍在登录页面")
@@ -194,6 +151,121 @@ class BrowserManager:
             logger.error(f"登录失败: {get_error_message(e)}")
             return False
     
+    def rebase_url(self, url: str) -> str:
+        """将指向其他镜像的URL改写到当前镜像（数据库中的URL可能来自已失效的镜像）"""
+        if not url or not self.base_url:
+            return url
+        
+        parsed = urlparse(url)
+        current = urlparse(self.base_url)
+        if parsed.netloc and parsed.netloc != current.netloc and mirror_selector.is_known_host(parsed.netloc):
+            return parsed._replace(scheme=current.scheme, netloc=current.netloc).geturl()
+        return url
+    
+    def report_success(self):
+        """报告当前镜像请求成功（重置连续失败计数）"""
+        with self._failure_lock:
+            self._consecutive_failures = 0
+    
+    def report_failure(self) -> bool:
+        """报告当前镜像请求失败（线程安全，HTTP抓取线程也会调用）
+        
+        Returns:
+            连续失败次数是否已达到切换阈值
+        """
+        with self._failure_lock:
+            self._consecutive_failures += 1
+            return self._consecutive_failures >= settings.mirror_failover_threshold
+    
+    def switch_mirror(self, failed_url: Optional[str] = None) -> bool:
+        """切换到次优镜像（线程安全，不使用WebDriver，HTTP抓取线程也会调用）
+        
+        浏览器在持有它的线程下次访问页面时重新登录（见 ensure_login）
+        
+        Args:
+            failed_url: 失败请求所用的镜像；已被其他线程切换走时不再切换
+        
+        Returns:
+            当前是否已经在另一个镜像上（可以重试）
+        """
+        with self._switch_lock:
+            old_url = self.base_url
+            if failed_url and old_url and old_url.rstrip('/') != failed_url.rstrip('/'):
+                return True
+            if old_url:
+                mirror_selector.report_failure(old_url)
+            
+            new_url = mirror_selector.get_next(old_url)
+            if not new_url:
+                logger.warning("没有其他可用的镜像，无法切换")
+                return False
+            
+            logger.warning(f"当前镜像连续失败，切换镜像: {old_url} -> {new_url}")
+            self.base_url = new_url
+            self._relogin_pending = True
+        self.report_success()
+        return True
+    
+    def ensure_login(self) -> bool:
+        """镜像切换后在新镜像上重新登录（使用WebDriver，必须在持有浏览器的线程中调用）"""
+        if not self._relogin_pending:
+            return True
+        self._relogin_pending = False
+        if self._credentials and not self.login(*self._credentials):
+            logger.error(f"切换到镜像 {self.base_url} 后重新登录失败")
+            return False
+        return True
+    
+    def failover(self) -> bool:
+        """切换到次优镜像并重新登录
+        
+        注意：会使用WebDriver，必须在持有浏览器的线程中调用
+        
+        Returns:
+            是否切换成功
+        """
+        return self.switch_mirror() and self.ensure_login()
+    
+    def _load(self, url: str, wait: float) -> str:
+        """访问页面并返回源码"""
+        self.driver.get(url)
+        if wait:
+            time.sleep(wait)
+        return self.driver.page_source
+    
+    def snapshot(self, url: Optional[str] = None, wait: float = 0):
+        """获取页面源码快照并解析为lxml文档树（一次WebDriver往返）
+        
+        当前镜像连续失败达到阈值时，切换到次优镜像后重试一次
+        
+        Args:
+            url: 要访问的页面URL，为None时使用当前页面
+            wait: 访问后等待页面加载的秒数
+        """
+        if not url:
+            return parse_html(self.driver.page_source, self.driver.current_url)
+        
+        # HTTP抓取线程可能已经切换了镜像，先在新镜像上登录
+        self.ensure_login()
+        url = self.rebase_url(url)
+        try:
+            page_source = self._load(url, wait)
+            # Chrome在网络错误时不会抛异常，而是显示内置的错误页
+            if 'main-frame-error' not in page_source:
+                self.report_success()
+                return parse_html(page_source, url)
+            error = None
+        except Exception as e:
+            error = e
+        
+        logger.warning(f"访问页面失败 {url[:80]}: {get_error_message(error) if error else '浏览器错误页'}")
+        if self.report_failure() and self.failover():
+            url = self.rebase_url(url)
+            page_source = self._load(url, wait)
+        elif error:
+            raise error
+        return parse_html(page_source, url)
+    
     def close(self):
         """关闭浏览器"""
         if self.driver:
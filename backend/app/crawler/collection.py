@@ -1,10 +1,18 @@
 """收藏夹爬取模块"""
-import time
 import re
-from typing import Dict, Generator
-from selenium.webdriver.common.by import By
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Generator, List, Optional
+from app.config import settings
+from app.crawler.parser import (
+    parse_html, element_text, select_one, xpath_one, parse_page_count, find_next_page_url, manga_key
+)
 from app.utils.logger import logger, get_error_message
 
+# 书架页面中需要跳过的非作者分类
+SKIPPED_CATEGORY_NAMES = ["全部", "管理分類", "書架", "书架", "我的書架"]
+
 
 class CollectionCrawler:
     """收藏夹爬取器 - 负责从收藏夹获取漫画列表"""
@@ -18,14 +26,214 @@ class CollectionCrawler:
         """动态获取base_url，确保获取到最新值"""
         return self.browser.base_url
     
-    def get_collection_stream(self) -> Generator[Dict, None, None]:
+    @staticmethod
+    def parse_categories(root) -> Dict[str, str]:
+        """从书架页面解析作者分类链接（分类名 -> URL）"""
+        category_links = {}
+        for link in root.cssselect("a"):
+            href = link.get('href') or ''
+            text = element_text(link)
+            
+            if 'users-users_fav-c-' in href and text:
+                if text not in SKIPPED_CATEGORY_NAMES:
+                    category_links[text] = href
+        return category_links
+    
+    @staticmethod
+    def _parse_item_page_count(manga_link) -> Optional[int]:
+        """查找包含漫画链接的父容器，然后从 p.l_detla 元素中提取页数"""
+        parent_container = xpath_one(manga_link, "./ancestor::*[contains(@class, 'u_listcon') or contains(@class, 'box_cel')][1]")
+        if parent_container is None:
+            return None
+        page_elem = select_one(parent_container, "p.l_detla")
+        if page_elem is None:
+            return None
+        return parse_page_count(element_text(page_elem))
+    
+    @staticmethod
+    def parse_listing_page(root) -> List[Dict]:
+        """从收藏夹列表页解析漫画信息 [{'url', 'title', 'page_count'}]"""
+        manga_info_list = []
+        for manga_link in root.cssselect("a[href*='photos-index-aid-']"):
+            try:
+                manga_url = manga_link.get('href')
+                title = element_text(manga_link)
+                
+                if manga_url and title:
+                    manga_info_list.append({
+                        'url': manga_url,
+                        'title': title,
+                        'page_count': CollectionCrawler._parse_item_page_count(manga_link)
+                    })
+            except Exception:
+                # 如果获取信息失败，跳过这个链接
+                continue
+        return manga_info_list
+    
+    @staticmethod
+    def find_listing_next_page(root, category_id: str, visited_urls: set) -> Optional[str]:
+        """查找收藏夹分类的下一页链接（只使用 ".next > a"）"""
+        return find_next_page_url(
+            root,
+            lambda url: ('users-users_fav' in url and
+                         '-page-' in url and
+                         f'c-{category_id}' in url and
+                         url not in visited_urls)
+        )
+    
+    def _crawl_category(self, author: str, category_url: str, category_id: str,
+                        fetch_page: Callable[[str], object], emit: Callable[[Dict], None],
+                        known_keys: set, incremental: bool, high_water_url: Optional[str],
+                        stop_event: Optional[threading.Event] = None,
+                        cursor: Optional[Dict] = None,
+                        page_done: Optional[Callable[[Optional[str], Optional[str]], None]] = None) -> Optional[str]:
+        """
+        遍历单个作者分类的所有分页
+        
+        Args:
+            fetch_page: 获取页面文档树的函数（HTTP或浏览器），失败时抛出异常
+            emit: 每解析到一个漫画调用一次 emit(manga_info)
+            stop_event: 设置后停止翻页（消费者提前结束时）
+            cursor: 检查点 {'url': 从哪一页继续, 'newest_manga_url': 中断前记录的高水位}
+            page_done: 每页的漫画都 emit 之后调用 page_done(next_page_url, newest_manga_url)
+        
+        Returns:
+            本次同步的高水位（分类第一页的第一个漫画URL）
+        """
+        page_num = 1
+        author_manga_count = 0
+        current_url = (cursor or {}).get('url') or category_url
+        visited_urls = set()
+        category_urls = set()  # 分类内去重（跨分类去重由合并流负责）
+        
+        newest_manga_url = (cursor or {}).get('newest_manga_url')
+        if cursor:
+            logger.info(f"  [{author}] 从检查点继续: {current_url}")
+        
+        # 比较使用镜像无关的标识（aid），镜像切换后高水位和已知漫画仍然有效
+        high_water_key = manga_key(high_water_url)
+        known_run = 0  # 连续已知漫画数
+        reached_known = False
+        
+        # 遍历所有分页（每页只取一次页面快照，下一页链接和漫画列表都从快照中解析）
+        while not (stop_event and stop_event.is_set()):
+            if current_url in visited_urls:
+                logger.info(f"  [{author}] 检测到重复URL，停止翻页")
+                break
+            
+            logger.debug(f"  [{author}] 访问第 {page_num} 页: {current_url}")
+            root = fetch_page(current_url)
+            visited_urls.add(current_url)
+            
+            # 第一步：查找下一页链接
+            next_page_url = self.find_listing_next_page(root, category_id, visited_urls)
+            
+            # 第二步：解析当前页面的漫画
+            page_manga_count = 0
+            for manga_info in self.parse_listing_page(root):
+                manga_url = manga_info['url']
+                if newest_manga_url is None:
+                    newest_manga_url = manga_url
+                
+                # 增量模式：到达高水位或连续遇到已知漫画，后面的都已同步过
+                if incremental:
+                    key = manga_key(manga_url)
+                    if high_water_key and key == high_water_key:
+                        reached_known = True
+                        break
+                    known_run = known_run + 1 if key in known_keys else 0
+                    if known_run >= settings.collection_known_run:
+                        reached_known = True
+                        break
+                
+                if manga_url in category_urls:
+                    continue
+                
+                category_urls.add(manga_url)
+                page_manga_count += 1
+                author_manga_count += 1
+                emit({
+                    'title': manga_info['title'],
+                    'author': author,
+                    'manga_url': manga_url,
+                    'page_count': manga_info.get('page_count')
+                })
+            
+            logger.debug(f"  [{author}] 第 {page_num} 页：找到 {page_manga_count} 个漫画")
+            
+            if page_done and next_page_url and not reached_known and page_manga_count:
+                page_done(next_page_url, newest_manga_url)
+            
+            if reached_known:
+                logger.info(f"  [{author}] ✓ 已到达上次同步的位置，停止翻页")
+                break
+            
+            if page_manga_count == 0:
+                logger.info(f"  [{author}] 第 {page_num} 页没有找到漫画，停止翻页")
+                break
+            
+            # 第三步：如果找不到'.next > a'链接，说明已经到最后一页
+            if not next_page_url:
+                break
+            
+            current_url = next_page_url
+            page_num += 1
+            
+            if page_num > 100:
+                logger.warning(f"  [{author}] 已达到最大页数限制(100页)，停止翻页")
+                break
+        
+        logger.info(f"  [{author}] 总共获取 {author_manga_count} 个漫画（{page_num} 页）")
+        return newest_manga_url
+    
+    def _fetch_listing_page(self, url: str):
+        """通过HTTP获取收藏夹分页（在工作线程中调用），失败时抛出异常"""
+        page_source = self.browser.http.fetch(url)
+        if page_source is None:
+            raise RuntimeError(f"HTTP获取页面失败: {url}")
+        return parse_html(page_source, url)
+    
+    def _browser_listing_page(self, url: str):
+        """通过浏览器获取收藏夹分页（只能在持有浏览器的线程中调用）"""
+        return self.browser.snapshot(url, wait=2)
+    
+    def get_collection_stream(self, known_keys: Optional[set] = None,
+                              high_water_marks: Optional[Dict[str, Optional[str]]] = None,
+                              category_callback: Optional[Callable[[str, str, Optional[str], bool], None]] = None,
+                              progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                              resume: Optional[Dict] = None,
+                              page_callback: Optional[Callable[[str, Optional[str], Optional[str]], None]] = None
+                              ) -> Generator[Dict, None, None]:
         """
         获取收藏夹中的所有漫画（生成器版本）
         边爬取边返回，不等待全部完成，实现真正的实时同步
         
+        各作者分类由 crawler_workers 个线程通过HTTP并发遍历，结果合并到同一个流中并按 manga_url 去重。
+        HTTP遍历失败的分类在所有线程完成后由浏览器重新遍历。
+        回调都在消费者线程（调用方）中执行，可以安全使用调用方的数据库会话。
+        
+        增量模式：high_water_marks 中的分类只爬取到已知位置为止（收藏夹按收藏时间倒序）。
+        遇到上次同步的第一个漫画（高水位），或连续 collection_known_run 个已在 known_keys 中的漫画时停止翻页。
+        不在 high_water_marks 中的分类完整遍历。
+        
+        Args:
+            known_keys: 数据库中已有漫画的镜像无关标识集合（manga_key，增量模式使用）
+            high_water_marks: 增量爬取的分类 {分类ID: 上次同步时的第一个漫画URL}，为None时全部完整遍历
+            category_callback: 分类爬取完成回调 callback(category_id, name, newest_manga_url, full)
+            progress_callback: 分类进度回调 callback(completed_categories, total_categories, name)
+            resume: 中断任务的检查点 {'completed_categories': [分类ID], 'cursors': {分类ID: {'url', 'newest_manga_url'}}}，
+                    已完成的分类跳过，进行中的分类从记录的页面继续
+            page_callback: 分页完成回调 callback(category_id, next_page_url, newest_manga_url)，用于记录检查点
+        
         Yields:
             dict: 漫画信息字典 {'title', 'author', 'manga_url', 'page_count'}
         """
+        known_keys = known_keys or set()
+        high_water_marks = high_water_marks or {}
+        resume = resume or {}
+        completed_before = set(resume.get('completed_categories') or [])
+        cursors = resume.get('cursors') or {}
+        
         if not self.driver:
             return
         
@@ -41,257 +249,147 @@ class CollectionCrawler:
             # 正确的书架URL
             bookshelf_url = f"{base}/users-users_fav.html"
             logger.info(f"访问书架页面: {bookshelf_url}")
-            self.driver.get(bookshelf_url)
-            time.sleep(5)
+            root = self.browser.snapshot(bookshelf_url, wait=5)
             
             # 检查页面是否成功加载
-            current_url = self.driver.current_url
-            page_title = self.driver.title
-            logger.info(f"当前页面URL: {current_url}")
+            title_elem = select_one(root, "title")
+            page_title = element_text(title_elem)
             logger.info(f"页面标题: {page_title}")
             
-            if "404" in page_title.lower() or "404" in self.driver.page_source[:1000].lower():
+            if "404" in page_title.lower() or "404" in element_text(root)[:1000].lower():
                 logger.warning(f"书架页面返回404")
                 return
             
             # 查找分类链接
-            category_links = {}
-            all_links = self.driver.find_elements(By.CSS_SELECTOR, "a")
-            
-            for link in all_links:
-                href = link.get_attribute('href') or ''
-                text = link.text.strip()
-                
-                if 'users-users_fav-c-' in href and text:
-                    if text not in ["全部", "管理分類", "書架", "书架", "我的書架"]:
-                        category_links[text] = href
-                        logger.info(f"找到分类: {text} -> {href}")
+            category_links = self.parse_categories(root)
+            for text, href in category_links.items():
+                logger.info(f"找到分类: {text} -> {href}")
             
             logger.info(f"共找到 {len(category_links)} 个作者分类\n")
             
             total_count = 0
             
-            # 如果有分类，按分类获取漫画
+            # 如果有分类，按分类并发获取漫画
             if category_links:
-                for author_idx, (author, category_url) in enumerate(category_links.items(), 1):
-                    logger.info(f"[{author_idx}/{len(category_links)}] 处理作者分类: {author}")
-                    
+                categories = []
+                for author, category_url in category_links.items():
                     # 提取分类ID
                     category_id_match = re.search(r'users-users_fav-c-(\d+)\.html', category_url)
                     if not category_id_match:
-                        logger.warning(f"  无法提取分类ID，跳过")
+                        logger.warning(f"  无法提取分类ID，跳过: {author}")
                         continue
+                    categories.append((author, category_url, category_id_match.group(1)))
+                
+                total_categories = len(categories)
+                
+                # 从检查点恢复：跳过中断前已完成的分类
+                if completed_before:
+                    categories = [c for c in categories if c[2] not in completed_before]
+                    logger.info(f"从检查点恢复：跳过 {total_categories - len(categories)} 个已完成的分类")
+                completed_categories = total_categories - len(categories)
+                events: queue.Queue = queue.Queue()
+                stop_event = threading.Event()
+                failed = []
+                
+                def crawl(author, category_url, category_id, fetch_page, put_event):
+                    incremental = category_id in high_water_marks
+                    newest_manga_url = self._crawl_category(
+                        author, category_url, category_id, fetch_page,
+                        lambda item: put_event(('item', item)),
+                        known_keys, incremental, high_water_marks.get(category_id), stop_event,
+                        cursor=cursors.get(category_id),
+                        page_done=lambda next_url, newest: put_event(('page', (category_id, next_url, newest)))
+                    )
+                    return newest_manga_url, not incremental
+                
+                def worker(author, category_url, category_id):
+                    try:
+                        result = crawl(author, category_url, category_id, self._fetch_listing_page, events.put)
+                        events.put(('done', (author, category_id) + result))
+                    except Exception as e:
+                        events.put(('failed', (author, category_url, category_id, e)))
+                
+                def accept(item) -> bool:
+                    """跨分类去重"""
+                    if item['manga_url'] in manga_urls_set:
+                        return False
+                    manga_urls_set.add(item['manga_url'])
+                    return True
+                
+                def finish(author, category_id, newest_manga_url, full):
+                    nonlocal completed_categories
+                    completed_categories += 1
+                    logger.info(f"[{completed_categories}/{total_categories}] 分类完成: {author}")
+                    if category_callback:
+                        category_callback(category_id, author, newest_manga_url, full)
+                    if progress_callback:
+                        progress_callback(completed_categories, total_categories, author)
+                
+                workers = max(1, min(settings.crawler_workers, len(categories) or 1))
+                logger.info(f"使用 {workers} 个线程并发遍历 {len(categories)} 个分类")
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collection")
+                try:
+                    for author, category_url, category_id in categories:
+                        executor.submit(worker, author, category_url, category_id)
                     
-                    category_id = category_id_match.group(1)
-                    page_num = 1
-                    author_manga_count = 0
-                    
-                    current_url = category_url
-                    visited_urls = set()
-                    
-                    # 遍历所有分页
-                    # 🔥 关键改进：先缓存下一页链接，再遍历当前页，避免stale element reference
-                    next_page_url = None  # 缓存的下一页链接
-                    
-                    while True:
-                        if current_url in visited_urls:
-                            logger.info(f"  检测到重复URL，停止翻页")
-                            break
-                        
-                        logger.info(f"  访问第 {page_num} 页: {current_url}")
-                        self.driver.get(current_url)
-                        visited_urls.add(current_url)
-                        time.sleep(2)
-                        
-                        # 🔥 第一步：立即查找并缓存下一页链接（在遍历漫画之前）
-                        if not next_page_url:  # 如果还没有缓存下一页链接，现在查找
-                            logger.debug(f"    查找下一页链接...")
-                            
-                            try:
-                                # 根据MCP确认的结构：分页器有class "paginator"
-                                paginator = self.driver.find_element(By.CSS_SELECTOR, ".paginator")
-                                logger.debug(f"    ✓ 找到分页器元素 (class: paginator)")
-                                
-                                # 🔥 只使用 ".next > a"（"後頁>"链接）来获取下一页
-                                try:
-                                    next_span = paginator.find_element(By.CSS_SELECTOR, ".next")
-                                    if next_span:
-                                        next_link = next_span.find_element(By.CSS_SELECTOR, "a")
-                                        if next_link:
-                                            href = next_link.get_attribute('href')
-                                            if href:
-                                                # 处理相对路径
-                                                if not self.base_url:
-                                                    logger.error("base_url未设置，无法处理下一页链接")
-                                                else:
-                                                    if href.startswith('/'):
-                                                        base = self.base_url.rstrip('/')
-                                                        full_url = f"{base}{href}"
-                                                    elif not href.startswith('http'):
-                                                        base = self.base_url.rstrip('/')
-                                                        full_url = f"{base}/{href}"
-                                                    else:
-                                                        full_url = href
-                                                    
-                                                    # 验证URL是否符合条件
-                                                    if ('users-users_fav' in full_url and 
-                                                        '-page-' in full_url and 
-                                                        f'c-{category_id}' in full_url and
-                                                        full_url not in visited_urls):
-                                                        next_page_url = full_url
-                                                        logger.info(f"    ✓ 通过'.next > a'找到下一页: {next_page_url[:80]}")
-                                                    else:
-                                                        logger.debug(f"    '.next > a'链接不符合条件或已访问: {full_url[:80]}")
-                                            else:
-                                                logger.debug(f"    '.next > a'链接没有href属性")
-                                        else:
-                                            logger.debug(f"    '.next'内未找到<a>标签")
-                                    else:
-                                        logger.debug(f"    未找到'.next'元素")
-                                except Exception as e:
-                                    logger.debug(f"    未找到'.next > a'链接: {get_error_message(e)}")
-                                
-                                if not next_page_url:
-                                    logger.info(f"    ⚠️  未找到'.next > a'链接，这是最后一页，遍历完当前页后将结束")
-                            except Exception as e:
-                                logger.warning(f"    查找分页器失败: {get_error_message(e)}")
-                                pass
-                        
-                        # 🔥 第二步：遍历当前页面的漫画（此时下一页链接已缓存）
-                        manga_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='photos-index-aid-']")
-                        logger.info(f"    🔍 CSS找到 {len(manga_links)} 个链接")
-                        
-                        # 立即提取所有链接信息，避免stale element reference
-                        manga_info_list = []
-                        for manga_link in manga_links:
-                            try:
-                                manga_url = manga_link.get_attribute('href')
-                                title = manga_link.text.strip()
-                                
-                                # 尝试获取页数信息（使用class名称，避免汉字字符串）
-                                page_count = None
-                                try:
-                                    # 查找包含漫画链接的父容器，然后查找 p.l_detla 元素
-                                    parent_container = manga_link.find_element(By.XPATH, "./ancestor::*[contains(@class, 'u_listcon') or contains(@class, 'box_cel')]")
-                                    page_elem = parent_container.find_element(By.CSS_SELECTOR, "p.l_detla")
-                                    if page_elem:
-                                        page_text = page_elem.text
-                                        # 从文本中提取数字（格式：頁數：20 或 頁數：20P）
-                                        page_match = re.search(r'(\d+)\s*P?', page_text)
-                                        if page_match:
-                                            page_count = int(page_match.group(1))
-                                except:
-                                    pass
-                                
-                                if manga_url and title:
-                                    manga_info_list.append({
-                                        'url': manga_url,
-                                        'title': title,
-                                        'page_count': page_count
-                                    })
-                            except Exception as e:
-                                # 如果获取信息失败，跳过这个链接
-                                continue
-                        
-                        # 处理提取的信息列表
-                        page_manga_count = 0
-                        empty_count = 0
-                        dup_count = 0
-                        
-                        for idx, manga_info in enumerate(manga_info_list, 1):
-                            try:
-                                manga_url = manga_info['url']
-                                title = manga_info['title']
-                                page_count = manga_info.get('page_count')
-                                
-                                if not title or not manga_url:
-                                    empty_count += 1
-                                    continue
-                                
-                                # 去重
-                                if manga_url in manga_urls_set:
-                                    dup_count += 1
-                                    continue
-                                
-                                # ✨ 关键：立即 yield，不等待后续爬取
-                                manga_urls_set.add(manga_url)
-                                page_manga_count += 1
-                                author_manga_count += 1
+                    # 合并各线程的结果（在消费者线程中去重和回调）
+                    pending = len(categories)  # 只有本次提交的分类会发出 done/failed 事件
+                    while pending:
+                        kind, payload = events.get()
+                        if kind == 'item':
+                            if accept(payload):
                                 total_count += 1
-                                
-                                yield {
-                                    'title': title,
-                                    'author': author,
-                                    'manga_url': manga_url,
-                                    'page_count': page_count
-                                }
-                                
-                            except Exception as e:
-                                logger.warning(f"    处理漫画失败: {get_error_message(e)}")
-                                continue
-                        
-                        logger.info(f"    第 {page_num} 页：找到 {page_manga_count} 个漫画（总计: {total_count}）")
-                        logger.debug(f"    📊 跳过：空标题/URL={empty_count}, 重复={dup_count}")
-                        
-                        if page_manga_count == 0:
-                            logger.info(f"    第 {page_num} 页没有找到漫画，停止翻页")
-                            break
-                        
-                        # 🔥 第三步：检查是否有下一页链接
-                        # 如果找不到'.next > a'链接，说明已经到最后一页，遍历完当前页后结束，继续下一个作者
-                        if not next_page_url:
-                            logger.info(f"    ✓ 已到最后一页（未找到'.next > a'链接），结束当前作者，继续下一个作者")
-                            break
-                        
-                        # 保存当前缓存的下一页链接
-                        current_url = next_page_url
-                        next_page_url = None  # 清空缓存，准备查找新的下一页
-                        
-                        if not current_url:
-                            logger.warning(f"    下一页链接无效，停止翻页")
-                            break
-                        
-                        page_num += 1
-                        
-                        if page_num > 100:
-                            logger.warning(f"    已达到最大页数限制(100页)，停止翻页")
-                            break
-                    
-                    logger.info(f"  {author} 总共获取 {author_manga_count} 个漫画\n")
+                                yield payload
+                        elif kind == 'page':
+                            if page_callback:
+                                page_callback(*payload)
+                        elif kind == 'done':
+                            pending -= 1
+                            finish(*payload)
+                        else:
+                            pending -= 1
+                            author, category_url, category_id, error = payload
+                            logger.warning(f"  [{author}] HTTP遍历失败，稍后使用浏览器重试: {get_error_message(error)}")
+                            failed.append((author, category_url, category_id))
+                finally:
+                    stop_event.set()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                
+                # HTTP失败的分类使用浏览器重新遍历（浏览器只能在当前线程使用）
+                for author, category_url, category_id in failed:
+                    logger.info(f"使用浏览器遍历分类: {author}")
+                    pending_events = []
+                    try:
+                        result = crawl(author, category_url, category_id, self._browser_listing_page, pending_events.append)
+                    except Exception as e:
+                        logger.error(f"  [{author}] 遍历分类失败: {get_error_message(e)}")
+                        continue
+                    for kind, payload in pending_events:
+                        if kind == 'item':
+                            if accept(payload):
+                                total_count += 1
+                                yield payload
+                        elif page_callback:
+                            page_callback(*payload)
+                    finish(author, category_id, *result)
             else:
                 # 如果没有找到分类链接，直接从当前页面获取所有漫画
                 logger.info("未找到分类链接，从当前页面直接获取漫画...")
-                manga_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='photos-index-aid-']")
+                manga_links = root.cssselect("a[href*='photos-index-aid-']")
                 logger.info(f"找到 {len(manga_links)} 个漫画链接")
                 
                 for manga_link in manga_links:
                     try:
-                        manga_url = manga_link.get_attribute('href')
-                        title = manga_link.text.strip()
+                        manga_url = manga_link.get('href')
+                        title = element_text(manga_link)
                         
                         if title and manga_url and manga_url not in manga_urls_set:
                             author = "未知"
-                            try:
-                                parent = manga_link.find_element(By.XPATH, "./ancestor::*[position()<=5]")
-                                author_elem = parent.find_elements(By.XPATH, ".//*[contains(@href, 'users-users_fav-c-')]")
-                                if author_elem:
-                                    author = author_elem[0].text.strip() or "未知"
-                            except:
-                                pass
-                            
-                            page_count = None
-                            try:
-                                # 查找包含漫画链接的父容器，然后查找 p.l_detla 元素
-                                parent_container = manga_link.find_element(By.XPATH, "./ancestor::*[contains(@class, 'u_listcon') or contains(@class, 'box_cel')]")
-                                page_elem = parent_container.find_element(By.CSS_SELECTOR, "p.l_detla")
-                                if page_elem:
-                                    page_text = page_elem.text
-                                    # 从文本中提取数字（格式：頁數：20 或 頁數：20P）
-                                    page_match = re.search(r'(\d+)\s*P?', page_text)
-                                    if page_match:
-                                        page_count = int(page_match.group(1))
-                            except:
-                                pass
+                            parents = manga_link.xpath("./ancestor::*[position()<=5]")
+                            if parents:
+                                author_elem = xpath_one(parents[0], ".//*[contains(@href, 'users-users_fav-c-')]")
+                                if author_elem is not None:
+                                    author = element_text(author_elem) or "未知"
                             
                             manga_urls_set.add(manga_url)
                             total_count += 1
@@ -300,15 +398,14 @@ class CollectionCrawler:
                                 'title': title,
                                 'author': author,
                                 'manga_url': manga_url,
-                                'page_count': page_count
+                                'page_count': self._parse_item_page_count(manga_link)
                             }
                     except Exception as e:
                         logger.warning(f"处理漫画失败: {get_error_message(e)}")
                         continue
             
             logger.info(f"\n✓ 收藏夹爬取完成，总共 {total_count} 个漫画")
-            
+        
         except Exception as e:
             logger.error(f"获取收藏夹失败: {get_error_message(e)}")
             return
-
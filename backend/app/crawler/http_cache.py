@@ -0,0 +1,191 @@
+"""HTTP缓存模块 - 爬虫页面的磁盘缓存，支持条件请求（ETag/Last-Modified）"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import urlparse
+from app.config import settings
+from app.utils.logger import logger, get_error_message
+
+
+class CacheEntry:
+    """缓存条目"""
+    
+    def __init__(self, body: str, etag: Optional[str], last_modified: Optional[str], stored_at: float, ttl: int):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.ttl = ttl
+    
+    @property
+    def is_fresh(self) -> bool:
+        """是否在有效期内（有效期内直接使用，不发请求）"""
+        return time.time() - self.stored_at < self.ttl
+    
+    def conditional_headers(self) -> Dict[str, str]:
+        """条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """磁盘HTTP缓存
+    
+    - 只缓存匹配 http_cache_ttls 中URL模式的页面，每个模式有各自的有效期（秒）
+    - 有效期内直接返回缓存；过期后发送 If-None-Match / If-Modified-Since 条件请求，304时继续使用缓存
+    - 有效期为0的页面每次都重新验证（适合收藏夹、搜索结果等会变化的页面）
+    - 缓存键只包含路径和查询参数，不同镜像共用缓存
+    - 总大小超过 http_cache_max_mb 时按最近访问时间淘汰（LRU）
+    """
+    
+    def __init__(self, cache_dir: str, max_bytes: int, ttls: Dict[str, int]):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._patterns: List[Tuple[re.Pattern, int]] = [(re.compile(pattern), ttl) for pattern, ttl in ttls.items()]
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[float, int]]] = None  # 文件名 -> (最近访问时间, 大小)
+        self._total_bytes = 0
+    
+    def _load_index(self):
+        """首次使用时扫描缓存目录（调用方持有锁）"""
+        if self._index is not None:
+            return
+        
+        self._index = {}
+        self._total_bytes = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[path.name] = (stat.st_mtime, stat.st_size)
+            self._total_bytes += stat.st_size
+    
+    def ttl_for(self, url: str) -> Optional[int]:
+        """获取URL的缓存有效期，不缓存的URL返回None"""
+        for pattern, ttl in self._patterns:
+            if pattern.search(url):
+                return ttl
+        return None
+    
+    @staticmethod
+    def _filename(url: str) -> str:
+        parsed = urlparse(url)
+        key = parsed.path + ('?' + parsed.query if parsed.query else '')
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + ".json"
+    
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """读取缓存条目（不检查是否过期）"""
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return None
+        
+        filename = self._filename(url)
+        with self._lock:
+            self._load_index()
+            if filename not in self._index:
+                return None
+        
+        path = self.cache_dir / filename
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        self._touch(filename)
+        return CacheEntry(data['body'], data.get('etag'), data.get('last_modified'), data['stored_at'], ttl)
+    
+    def put(self, url: str, body: str, headers) -> None:
+        """写入缓存（只缓存匹配URL模式的页面）"""
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return
+        
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if ttl == 0 and not etag and not last_modified:
+            # 每次都要重新验证、但服务器不支持条件请求的页面，缓存没有意义
+            return
+        
+        filename = self._filename(url)
+        data = json.dumps({
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'body': body
+        }, ensure_ascii=False).encode('utf-8')
+        
+        path = self.cache_dir / filename
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with self._lock:
+                self._load_index()
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"写入HTTP缓存失败: {get_error_message(e)}")
+            return
+        
+        with self._lock:
+            _, old_size = self._index.get(filename, (0, 0))
+            self._index[filename] = (time.time(), len(data))
+            self._total_bytes += len(data) - old_size
+            self._evict()
+    
+    def refresh(self, url: str, headers) -> None:
+        """收到304时更新缓存的保存时间（重新开始计算有效期）"""
+        entry = self.get(url)
+        if entry is None:
+            return
+        # 服务器可能在304中返回新的验证器
+        self.put(url, entry.body, {
+            'ETag': headers.get('ETag') or entry.etag,
+            'Last-Modified': headers.get('Last-Modified') or entry.last_modified
+        })
+    
+    def _touch(self, filename: str):
+        """更新最近访问时间（用于LRU淘汰）"""
+        now = time.time()
+        with self._lock:
+            if filename in self._index:
+                self._index[filename] = (now, self._index[filename][1])
+        try:
+            os.utime(self.cache_dir / filename, (now, now))
+        except OSError:
+            pass
+    
+    def _evict(self):
+        """淘汰最久未访问的条目，直到总大小不超过上限（调用方持有锁）"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        
+        for filename, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                (self.cache_dir / filename).unlink()
+            except OSError:
+                pass
+            del self._index[filename]
+            self._total_bytes -= size
+
+
+# 全局HTTP缓存（所有爬虫实例共享）
+http_cache = HttpCache(
+    settings.http_cache_dir,
+    settings.http_cache_max_mb * 1024 * 1024,
+    settings.http_cache_ttls
+) if settings.http_cache_enabled else None
@@ -0,0 +1,155 @@
+"""HTTP抓取模块 - 复用浏览器登录态，使用requests并发抓取页面"""
+import time
+import threading
+from typing import Optional, Dict, Tuple
+import requests
+from app.config import settings
+from app.crawler.http_cache import http_cache
+from app.utils.logger import logger, get_error_message
+
+# 与浏览器保持一致的User-Agent
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class RateLimiter:
+    """全局限速器 - 保证所有线程的请求间隔不小于 1/requests_per_second"""
+    
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def wait(self):
+        """阻塞直到允许发出下一个请求"""
+        if self.min_interval <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+# 全局限速器（所有爬虫实例共享，避免并发过高被封）
+crawler_rate_limiter = RateLimiter(settings.crawler_requests_per_second)
+
+
+class HttpFetcher:
+    """HTTP抓取器 - 每个线程持有独立的requests会话，共享浏览器的登录cookies"""
+    
+    def __init__(self, browser_manager):
+        self.browser = browser_manager
+        self._local = threading.local()
+        self._cookies: Dict[str, str] = {}
+        self._user_agent = USER_AGENT
+        self._version = 0  # cookies版本号，变化后线程会话会重建
+    
+    def sync_from_browser(self):
+        """从浏览器同步cookies和User-Agent
+        
+        注意：WebDriver不是线程安全的，必须在持有浏览器的线程中调用（例如登录成功后）
+        """
+        driver = self.browser.driver
+        if not driver:
+            return
+        
+        try:
+            cookies = {}
+            for cookie in driver.get_cookies():
+                cookies[cookie['name']] = cookie['value']
+            self._cookies = cookies
+            self._user_agent = driver.execute_script("return navigator.userAgent;") or USER_AGENT
+            self._version += 1
+            logger.debug(f"已同步 {len(cookies)} 个浏览器cookies到HTTP会话")
+        except Exception as e:
+            logger.warning(f"同步浏览器cookies失败: {get_error_message(e)}")
+    
+    def _session(self) -> requests.Session:
+        """获取当前线程的会话"""
+        session = getattr(self._local, 'session', None)
+        if session is None or getattr(self._local, 'version', -1) != self._version:
+            session = requests.Session()
+            session.headers['User-Agent'] = self._user_agent
+            session.cookies.update(self._cookies)
+            self._local.session = session
+            self._local.version = self._version
+        return session
+    
+    def fetch(self, url: str, retries: Optional[int] = None, referer: Optional[str] = None) -> Optional[str]:
+        """抓取页面HTML，失败时按退避时间重试
+        
+        当前镜像连续失败达到阈值时，切换到次优镜像后重试一次（与浏览器访问共用失败计数）
+        
+        Args:
+            url: 页面URL
+            retries: 最大尝试次数，默认使用配置 crawler_max_retries
+            referer: 可选的Referer头
+        
+        Returns:
+            页面HTML文本，全部重试失败返回None
+        """
+        attempts = retries or settings.crawler_max_retries
+        base_url = self.browser.base_url
+        text, mirror_error = self._fetch(url, attempts, referer)
+        # 只有镜像本身的问题（连接失败/超时/5xx）计入失败次数，4xx不计入
+        if text is None and mirror_error and self.browser.report_failure() and self.browser.switch_mirror(base_url):
+            text, _ = self._fetch(url, attempts, referer)
+        return text
+    
+    def _fetch(self, url: str, attempts: int, referer: Optional[str]) -> Tuple[Optional[str], bool]:
+        """在当前镜像上抓取页面
+        
+        Returns:
+            (页面HTML文本或None, 最后一次失败是否为镜像本身的问题)
+        """
+        # 数据库中的URL可能来自其他镜像，统一改写到当前镜像
+        url = self.browser.rebase_url(url)
+        headers = {'Referer': self.browser.rebase_url(referer)} if referer else {}
+        mirror_error = False
+        
+        # 磁盘缓存：有效期内直接返回，过期后发送条件请求
+        cached = http_cache.get(url) if http_cache else None
+        if cached:
+            if cached.is_fresh:
+                return cached.body, False
+            headers.update(cached.conditional_headers())
+        
+        for attempt in range(1, attempts + 1):
+            crawler_rate_limiter.wait()
+            try:
+                response = self._session().get(url, headers=headers, timeout=settings.crawler_request_timeout)
+                if response.status_code == 304 and cached:
+                    self.browser.report_success()
+                    http_cache.refresh(url, response.headers)
+                    return cached.body, False
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                self.browser.report_success()
+                if http_cache:
+                    http_cache.put(url, response.text, response.headers)
+                return response.text, False
+            except Exception as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                mirror_error = status is None or status >= 500
+                logger.debug(f"    HTTP抓取失败（第 {attempt}/{attempts} 次）{url[:80]}: {get_error_message(e)}")
+                if attempt < attempts:
+                    time.sleep(attempt)
+        
+        return None, mirror_error
+    
+    def head_ok(self, url: str, referer: Optional[str] = None) -> bool:
+        """发送HEAD请求检查资源是否可用（用于低成本校验图片地址）"""
+        headers = {'Referer': referer} if referer else None
+        crawler_rate_limiter.wait()
+        try:
+            response = self._session().head(
+                url, headers=headers, timeout=settings.crawler_request_timeout, allow_redirects=True
+            )
+            content_type = response.headers.get('Content-Type', '')
+            return response.status_code == 200 and (not content_type or content_type.startswith('image/'))
+        except Exception as e:
+            logger.debug(f"    HEAD请求失败 {url[:80]}: {get_error_message(e)}")
+            return False
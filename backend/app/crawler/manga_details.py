@@ -1,9 +1,15 @@
 """漫画详情和图片获取模块"""
-import time
 import re
-from typing import List, Optional, Dict
+import threading
+from typing import List, Optional, Dict, Tuple, Generator
+from collections import deque
 from datetime import datetime
-from selenium.webdriver.common.by import By
+from urllib.parse import urljoin, urlparse, urlunparse
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.crawler.parser import (
+    parse_html, element_text, select_one, xpath_one, parse_page_count, find_next_page_url
+)
 from app.utils.logger import logger, get_error_message
 
 
@@ -25,277 +31,423 @@ class MangaDetailsCrawler:
             return None
         
         try:
-            self.driver.get(manga_url)
-            time.sleep(3)
-            
-            # 获取标题
-            title = None
-            try:
-                title_elem = self.driver.find_element(By.CSS_SELECTOR, "h2")
-                title = title_elem.text.strip()
-            except:
-                pass
-            
-            # 获取页数（使用class名称，避免汉字字符串）
-            page_count = None
-            try:
-                # 使用 p.l_detla class 查找页数信息
-                page_elem = self.driver.find_element(By.CSS_SELECTOR, "p.l_detla")
-                page_text = page_elem.text  # 例如: "頁數：20P"
-                # 从文本中提取数字（格式：頁數：20 或 頁數：20P）
-                page_match = re.search(r'(\d+)\s*P?', page_text)
-                if page_match:
-                    page_count = int(page_match.group(1))
-            except Exception as e:
-                logger.debug(f"    获取页数失败: {get_error_message(e)}")
-            
-            # 获取上传日期（使用class名称，避免汉字字符串）
-            updated_at = None
-            try:
-                # 查找图片列表项（使用 .gallary_item class）
-                gallery_items = self.driver.find_elements(By.CSS_SELECTOR, ".gallary_item")
-                if gallery_items:
-                    # 从第一个图片项中提取日期（格式：YYYY-MM-DD）
-                    first_item_text = gallery_items[0].text
-                    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', first_item_text)
-                    if date_match:
-                        date_str = date_match.group(1)
-                        updated_at = datetime.strptime(date_str, '%Y-%m-%d')
-            except Exception as e:
-                logger.debug(f"    获取上传日期失败: {get_error_message(e)}")
-            
-            # 获取封面图片URL - 取第一张图片的缩略图
-            cover_url = None
-            try:
-                # 查找所有图片，通常第一张是封面
-                images = self.driver.find_elements(By.CSS_SELECTOR, "img[src*='wnimg']")
-                if images:
-                    cover_url = images[0].get_attribute('src')
-            except Exception as e:
-                logger.debug(f"    获取封面失败: {get_error_message(e)}")
-            
-            # 获取分类信息
-            category = None
-            try:
-                # 查找包含"分類："的标签
-                category_elem = self.driver.find_element(By.XPATH, "//label[contains(text(), '分類：')]")
-                if category_elem:
-                    category_text = category_elem.text.replace("分類：", "").strip()
-                    category = category_text
-            except Exception as e:
-                logger.debug(f"    获取分类失败: {get_error_message(e)}")
-            
-            # 获取标签信息
-            tags = []
-            try:
-                # 查找标签链接（在"標籤："之后的所有链接）
-                tag_links = self.driver.find_elements(By.XPATH, "//label[contains(text(), '標籤：')]/following-sibling::a[contains(@href, 'albums-index-tag-')]")
-                for tag_link in tag_links:
-                    tag_text = tag_link.text.strip()
-                    if tag_text and tag_text != "+TAG":
-                        tags.append(tag_text)
-            except Exception as e:
-                logger.debug(f"    获取标签失败: {get_error_message(e)}")
-            
-            # 获取上传者/作者信息
-            uploader = None
-            try:
-                # 查找上传者链接（包含用户头像的链接）
-                uploader_link = self.driver.find_element(By.XPATH, "//a[contains(@href, 'search/index.php') and .//img[contains(@src, 'userpic')]]")
-                if uploader_link:
-                    uploader = uploader_link.text.strip()
-            except Exception as e:
-                logger.debug(f"    获取上传者失败: {get_error_message(e)}")
-            
-            # 获取简介
-            summary = None
-            try:
-                # 查找简介内容（在"簡介："标签之后）
-                summary_elem = self.driver.find_element(By.XPATH, "//p[contains(text(), '簡介：')]/following-sibling::*[1]")
-                if summary_elem:
-                    summary = summary_elem.text.strip()
-            except Exception as e:
-                logger.debug(f"    获取简介失败: {get_error_message(e)}")
-            
-            return {
-                'title': title,
-                'manga_url': manga_url,
-                'page_count': page_count,
-                'updated_at': updated_at,
-                'cover_image_url': cover_url,
-                'category': category,
-                'tags': tags,
-                'uploader': uploader,
-                'summary': summary
-            }
+            # 一次获取页面快照，在进程内解析所有字段
+            root = self.browser.snapshot(manga_url, wait=3)
+            return self.parse_manga_details(root, manga_url)
         except Exception as e:
             logger.error(f"获取漫画详情失败: {get_error_message(e)}")
             return None
     
-    def get_manga_images(self, manga_url: str) -> List[Dict]:
-        """获取漫画的所有图片URL，按显示顺序
+    def get_manga_details_http(self, manga_url: str) -> Dict:
+        """通过HTTP获取漫画详情（不使用浏览器，可在工作线程中并发调用，失败时抛出异常）"""
+        html = self.browser.http.fetch(manga_url)
+        if html is None:
+            raise RuntimeError(f"HTTP获取详情页失败: {manga_url}")
+        return self.parse_manga_details(parse_html(html, manga_url), manga_url)
+    
+    @staticmethod
+    def parse_manga_details(root, manga_url: str) -> Dict:
+        """从详情页快照中解析漫画详情（页数、更新日期、封面、分类、标签、上传者、简介）"""
+        # 获取标题
+        title = element_text(select_one(root, "h2")) or None
+        
+        # 获取页数（使用class名称，避免汉字字符串）
+        page_count = None
+        try:
+            # 使用 p.l_detla class 查找页数信息，例如: "頁數：20P"
+            page_elem = select_one(root, "p.l_detla")
+            if page_elem is not None:
+                page_count = parse_page_count(element_text(page_elem))
+        except Exception as e:
+            logger.debug(f"    获取页数失败: {get_error_message(e)}")
+        
+        # 获取上传日期（使用class名称，避免汉字字符串）
+        updated_at = None
+        try:
+            # 查找图片列表项（使用 .gallary_item class），从第一个图片项中提取日期（格式：YYYY-MM-DD）
+            first_item = select_one(root, ".gallary_item")
+            if first_item is not None:
+                date_match = re.search(r'(\d{4}-\d{2}-\d{2})', element_text(first_item))
+                if date_match:
+                    updated_at = datetime.strptime(date_match.group(1), '%Y-%m-%d')
+        except Exception as e:
+            logger.debug(f"    获取上传日期失败: {get_error_message(e)}")
+        
+        # 获取封面图片URL - 取第一张图片的缩略图
+        cover_url = None
+        cover_elem = select_one(root, "img[src*='wnimg']")
+        if cover_elem is not None:
+            cover_url = cover_elem.get('src')
+        
+        # 获取分类信息（查找包含"分類："的标签）
+        category = None
+        category_elem = xpath_one(root, "//label[contains(text(), '分類：')]")
+        if category_elem is not None:
+            category = element_text(category_elem).replace("分類：", "").strip()
+        
+        # 获取标签信息（在"標籤："之后的所有链接）
+        tags = []
+        for tag_link in root.xpath("//label[contains(text(), '標籤：')]/following-sibling::a[contains(@href, 'albums-index-tag-')]"):
+            tag_text = element_text(tag_link)
+            if tag_text and tag_text != "+TAG":
+                tags.append(tag_text)
+        
+        # 获取上传者/作者信息（包含用户头像的链接）
+        uploader = None
+        uploader_link = xpath_one(root, "//a[contains(@href, 'search/index.php') and .//img[contains(@src, 'userpic')]]")
+        if uploader_link is not None:
+            uploader = element_text(uploader_link)
+        
+        # 获取简介（在"簡介："标签之后）
+        summary = None
+        summary_elem = xpath_one(root, "//p[contains(text(), '簡介：')]/following-sibling::*[1]")
+        if summary_elem is not None:
+            summary = element_text(summary_elem)
+        
+        return {
+            'title': title,
+            'manga_url': manga_url,
+            'page_count': page_count,
+            'updated_at': updated_at,
+            'cover_image_url': cover_url,
+            'category': category,
+            'tags': tags,
+            'uploader': uploader,
+            'summary': summary
+        }
+    
+    def get_manga_images(self, manga_url: str, expected_count: Optional[int] = None,
+                         stop_event: Optional[threading.Event] = None) -> Generator[Dict, None, None]:
+        """获取漫画的所有图片URL，按显示顺序（生成器版本）
+        
+        边扫描边产出，调用方可以在扫描完成前就开始下载前面的图片。
         
         流程：
-        1. 遍历漫画详情页的所有分页，收集所有图片查看链接 (photos-view-id-xxxxx.html)
-        2. 逐个访问这些链接，从每个页面提取原图 URL
-        3. 不使用"下拉阅读"，因为它是懒加载，大漫画会导致部分图片未加载
+        0. 快速路径：请求阅读页内嵌的图片列表（一次请求），与 expected_count 校验一致则直接产出
+        1. 逐页扫描漫画详情页的分页，收集图片查看链接 (photos-view-id-xxxxx.html) 及其缩略图
+        2. 每扫描完一页，立即由缩略图推导原图 URL 并抽样校验；推导失败的链接提交到有界线程池访问查看页
+        3. 按页面顺序产出已解析完成的图片（前面的未完成时，后面的先等待）
+        4. 不使用"下拉阅读"页面渲染，因为它是懒加载，大漫画会导致部分图片未加载
+        
+        Args:
+            manga_url: 漫画详情页URL
+            expected_count: 期望的图片数量（通常为 get_manga_details 返回的 page_count），用于校验快速路径结果，
+                为None时快速路径先从详情页获取
+            stop_event: 设置后在下一次使用浏览器前停止（在后台线程中运行时，由消费者通知停止，
+                之后调用方才能安全关闭浏览器）
+        
+        Yields:
+            dict: 图片信息 {'index', 'url', 'filename'}
         """
         if not self.driver:
-            return []
+            return
         
         try:
             logger.info(f"\n开始获取漫画图片: {manga_url}")
             
-            # 第一步：收集所有图片查看链接
-            # 重要：必须严格按照页面显示顺序收集，不能对链接进行任何排序！
-            view_urls = []  # 保持页面顺序的链接列表
+            # 快速路径：一次请求获取完整图片列表
+            if settings.crawler_use_gallery_list:
+                images = self._get_images_from_gallery(manga_url, expected_count)
+                if images:
+                    yield from images
+                    return
+            
+            # 重要：必须严格按照页面显示顺序产出，不能对链接进行任何排序！
             view_urls_set = set()  # 用于快速去重
+            pending = deque()  # 待产出的图片 [index, view_url, original_url, future]，保持页面顺序
+            stats = {'found': 0, 'resolved': 0}
+            derivation_trusted = False  # 推导规则在本漫画上验证通过后，后续页面只抽样1张
             page_num = 1
             
             # 从第一页开始
             current_url = manga_url
             visited_page_urls = set()
             
-            while True:
-                # 避免重复访问同一分页
-                if current_url in visited_page_urls:
-                    logger.info(f"  检测到重复URL，停止扫描")
-                    break
-                
-                logger.info(f"  扫描第 {page_num} 页: {current_url}")
-                self.driver.get(current_url)
-                visited_page_urls.add(current_url)
-                time.sleep(2)
-                
-                # 查找所有图片查看链接 (photos-view-id-xxxxx.html)
-                # 注意：find_elements 返回的顺序就是页面上的显示顺序
-                view_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='photos-view-id-']")
-                
-                if not view_links:
-                    if page_num == 1:
-                        logger.warning(f"    ✗ 第 1 页没有找到图片链接")
+            executor = ThreadPoolExecutor(max_workers=max(1, settings.crawler_workers))
+            try:
+                while True:
+                    if stop_event and stop_event.is_set():
+                        logger.info("  已停止获取图片列表")
+                        return
+                    
+                    # 避免重复访问同一分页
+                    if current_url in visited_page_urls:
+                        logger.info(f"  检测到重复URL，停止扫描")
+                        break
+                    
+                    logger.info(f"  扫描第 {page_num} 页: {current_url}")
+                    root = self.browser.snapshot(current_url, wait=2)
+                    visited_page_urls.add(current_url)
+                    
+                    # 查找所有图片查看链接 (photos-view-id-xxxxx.html)，返回顺序就是页面上的显示顺序
+                    view_links = self.parse_gallery_index(root)
+                    
+                    if not view_links:
+                        if page_num == 1:
+                            logger.warning(f"    ✗ 第 1 页没有找到图片链接")
+                        else:
+                            logger.info(f"    第 {page_num} 页没有更多图片，停止扫描")
+                        break
+                    
+                    # 按照页面顺序提取链接，使用 set 快速去重
+                    batch = []
+                    thumb_urls = {}  # 查看链接 -> 缩略图URL（用于推导原图）
+                    for url, thumb in view_links:
+                        # 去重：只添加未见过的链接，但保持顺序
+                        if url not in view_urls_set:
+                            batch.append(url)
+                            view_urls_set.add(url)
+                            if settings.crawler_derive_from_thumbnails and thumb:
+                                thumb_urls[url] = thumb
+                    
+                    logger.info(f"    找到 {len(batch)} 个图片链接（总计: {len(view_urls_set)}）")
+                    
+                    # 立即解析本页的原图：先由缩略图推导，推导失败的提交到线程池访问查看页
+                    if thumb_urls:
+                        derived = self._derive_from_thumbnails(
+                            batch, thumb_urls, executor,
+                            sample_count=1 if derivation_trusted else settings.crawler_thumbnail_verify_samples
+                        )
+                        derivation_trusted = derivation_trusted or all(derived)
                     else:
-                        logger.info(f"    第 {page_num} 页没有更多图片，停止扫描")
-                    break
-                
-                # 按照页面顺序提取链接，使用 set 快速去重
-                page_view_count = 0
-                for link in view_links:
-                    url = link.get_attribute('href')
-                    # 去重：只添加未见过的链接，但保持顺序
-                    if url and 'photos-view-id-' in url and url not in view_urls_set:
-                        view_urls.append(url)
-                        view_urls_set.add(url)
-                        page_view_count += 1
-                
-                logger.info(f"    找到 {page_view_count} 个图片链接（总计: {len(view_urls)}）")
-                
-                # 🔥 只使用 ".next > a"（"後頁>"链接）来获取下一页
-                next_page_url = None
-                try:
-                    # 根据MCP确认的结构：分页器有class "paginator"
-                    paginator = self.driver.find_element(By.CSS_SELECTOR, ".paginator")
-                    if paginator:
-                        # 查找 ".next > a"（"後頁>"链接）
-                        try:
-                            next_span = paginator.find_element(By.CSS_SELECTOR, ".next")
-                            if next_span:
-                                next_link = next_span.find_element(By.CSS_SELECTOR, "a")
-                                if next_link:
-                                    href = next_link.get_attribute('href')
-                                    if href:
-                                        # 处理相对路径
-                                        if not self.base_url:
-                                            logger.error("base_url未设置，无法处理下一页链接")
-                                        else:
-                                            if href.startswith('/'):
-                                                base = self.base_url.rstrip('/')
-                                                full_url = f"{base}{href}"
-                                            elif not href.startswith('http'):
-                                                base = self.base_url.rstrip('/')
-                                                full_url = f"{base}/{href}"
-                                            else:
-                                                full_url = href
-                                            
-                                            # 验证URL是否符合条件且未访问过
-                                            if ('photos-index' in full_url and 
-                                                '-page-' in full_url and
-                                                full_url not in visited_page_urls):
-                                                next_page_url = full_url
-                                                logger.info(f"    ✓ 通过'.next > a'找到下一页: {next_page_url[:80]}")
-                                            else:
-                                                logger.debug(f"    '.next > a'链接不符合条件或已访问: {full_url[:80]}")
-                        except Exception as e:
-                            logger.debug(f"    未找到'.next > a'链接: {get_error_message(e)}")
-                except Exception as e:
-                    logger.debug(f"    查找分页器失败: {get_error_message(e)}")
-                    pass
-                
-                # 如果找不到'.next > a'链接，说明已经到最后一页，遍历完当前页后结束
-                if not next_page_url:
-                    logger.info(f"    ⚠️  未找到'.next > a'链接，这是最后一页，扫描完成")
-                    break
-                
-                # next_page_url已经在前面处理过，直接使用
-                current_url = next_page_url
-                if not current_url:
-                    logger.warning(f"    下一页链接无效，停止扫描")
-                    break
+                        derived = [None] * len(batch)
+                    
+                    for view_url, original_url in zip(batch, derived):
+                        stats['found'] += 1
+                        future = None if original_url else executor.submit(self._fetch_original_url, view_url)
+                        pending.append([stats['found'], view_url, original_url, future])
+                    
+                    # 产出已经解析完成的前缀（不阻塞扫描）
+                    yield from self._drain_resolved(pending, stats, block=False, stop_event=stop_event)
+                    
+                    # 🔥 只使用 ".next > a"（"後頁>"链接）来获取下一页
+                    next_page_url = find_next_page_url(
+                        root,
+                        lambda url: ('photos-index' in url and
+                                     '-page-' in url and
+                                     url not in visited_page_urls)
+                    )
+                    
+                    # 如果找不到'.next > a'链接，说明已经到最后一页，遍历完当前页后结束
+                    if not next_page_url:
+                        logger.info(f"    ⚠️  未找到'.next > a'链接，这是最后一页，扫描完成")
+                        break
+                    
+                    logger.info(f"    ✓ 通过'.next > a'找到下一页: {next_page_url[:80]}")
+                    current_url = next_page_url
+                    page_num += 1
+                    
+                    # 安全限制：最多 100 页
+                    if page_num > 100:
+                        logger.warning(f"    达到最大页数限制 (100 页)")
+                        break
                 
-                page_num += 1
+                logger.info(f"\n共收集到 {stats['found']} 个图片链接")
                 
-                # 安全限制：最多 100 页
-                if page_num > 100:
-                    logger.warning(f"    达到最大页数限制 (100 页)")
-                    break
+                # 等待并产出剩余的图片
+                yield from self._drain_resolved(pending, stats, block=True, stop_event=stop_event)
+            finally:
+                # 提前结束时取消尚未开始的查看页请求，只等待正在执行的请求
+                executor.shutdown(wait=True, cancel_futures=True)
             
-            logger.info(f"\n共收集到 {len(view_urls)} 个图片链接")
-            
-            if not view_urls:
+            if not stats['found']:
                 logger.warning("✗ 没有找到任何图片链接")
+                return
+            
+            logger.info(f"\n✓ 成功获取 {stats['resolved']}/{stats['found']} 张原图")
+            
+        except Exception as e:
+            logger.error(f"获取漫画图片失败: {get_error_message(e)}")
+            return
+    
+    def _get_images_from_gallery(self, manga_url: str, expected_count: Optional[int]) -> List[Dict]:
+        """从阅读页内嵌的图片列表中提取所有原图URL
+        
+        阅读页 (photos-gallery-aid-xxx.html) 在脚本中按顺序内嵌了全部原图地址，
+        只需一次请求。数量与 expected_count 不一致时返回空列表，由调用方回退到逐页扫描。
+        没有传入 expected_count 时先从详情页获取页数，无法获取时不使用快速路径（未经校验的列表可能不完整）。
+        """
+        aid_match = re.search(r'aid-(\d+)', manga_url)
+        if not aid_match or not self.base_url:
+            return []
+        
+        base = self.base_url.rstrip('/')
+        aid = aid_match.group(1)
+        gallery_url = f"{base}/photos-gallery-aid-{aid}.html"
+        
+        try:
+            if not expected_count:
+                expected_count = self.get_manga_details_http(manga_url).get('page_count')
+                if not expected_count:
+                    logger.info("  无法获取页数校验阅读页图片列表，使用逐页扫描")
+                    return []
+            
+            html = self.browser.http.fetch(gallery_url, referer=f"{base}/photos-slide-aid-{aid}.html")
+            if not html:
+                logger.info("  阅读页获取失败，回退到逐页扫描")
                 return []
             
-            # 第二步：逐个访问链接获取原图
-            images = []
+            # 脚本中的地址可能带有转义的斜杠或引号（例如 \"//img4.qy0.ru/data/...jpg\"）
+            html = html.replace('\\/', '/')
+            urls = []
+            seen = set()
+            for match in re.finditer(r'(?:https?:)?//[^"\'\s\\<>]+?\.(?:jpe?g|png|gif|webp)', html, re.IGNORECASE):
+                url = urljoin(gallery_url, match.group(0))
+                if self._is_original_image(url) and url not in seen:
+                    urls.append(url)
+                    seen.add(url)
             
-            for idx, view_url in enumerate(view_urls, 1):
-                try:
-                    logger.info(f"  [{idx}/{len(view_urls)}] 获取原图...")
-                    self.driver.get(view_url)
-                    time.sleep(1.5)
-                    
-                    # 查找原图
-                    # 原图特征：src 包含 wnimg，且路径为 /data/.../xxx.jpg (不含 /t/)
-                    img_elems = self.driver.find_elements(By.CSS_SELECTOR, "img[src*='wnimg']")
-                    original_url = None
-                    
-                    for img_elem in img_elems:
-                        src = img_elem.get_attribute('src')
-                        # 过滤掉缩略图 (包含 /t/) 和其他非原图
-                        if src and '/data/' in src and '/t/' not in src:
-                            original_url = src
-                            break
-                    
-                    if original_url:
-                        # 获取文件扩展名
-                        ext = original_url.split('.')[-1].split('?')[0] if '.' in original_url else 'jpg'
-                        images.append({
-                            'index': idx,
-                            'url': original_url,
-                            'filename': f"{idx:04d}.{ext}"
-                        })
-                        logger.debug(f"    ✓ {original_url[:70]}...")
-                    else:
-                        logger.warning(f"    ✗ 未找到原图")
-                        
-                except Exception as e:
-                    logger.warning(f"    ✗ 获取失败: {get_error_message(e)}")
-                    continue
+            if not urls:
+                logger.info("  阅读页中未找到图片列表，回退到逐页扫描")
+                return []
             
-            logger.info(f"\n✓ 成功获取 {len(images)}/{len(view_urls)} 张原图")
-            return images
+            if len(urls) != expected_count:
+                logger.warning(f"  阅读页图片数量 ({len(urls)}) 与页数 ({expected_count}) 不一致，回退到逐页扫描")
+                return []
             
+            logger.info(f"✓ 通过阅读页一次获取到 {len(urls)} 张原图")
+            return [self._build_image_entry(idx, url) for idx, url in enumerate(urls, 1)]
         except Exception as e:
-            logger.error(f"获取漫画图片失败: {get_error_message(e)}")
+            logger.warning(f"  解析阅读页失败，回退到逐页扫描: {get_error_message(e)}")
             return []
-
+    
+    @staticmethod
+    def _is_original_image(src: Optional[str]) -> bool:
+        """判断是否为原图URL：路径为 /data/.../xxx.jpg，且不是缩略图 (不含 /t/)"""
+        return bool(src) and '/data/' in src and '/t/' not in src
+    
+    @staticmethod
+    def _build_image_entry(idx: int, original_url: str) -> Dict:
+        """构造图片信息字典"""
+        # 获取文件扩展名
+        ext = original_url.split('.')[-1].split('?')[0] if '.' in original_url else 'jpg'
+        return {
+            'index': idx,
+            'url': original_url,
+            'filename': f"{idx:04d}.{ext}"
+        }
+    
+    @staticmethod
+    def _derive_original_url(thumb_url: Optional[str]) -> Optional[str]:
+        """由缩略图URL推导原图URL
+        
+        缩略图与原图通常只差一个路径段和主机前缀，例如：
+        //t4.qy0.ru/data/t/2234/54/01.jpg -> //img4.qy0.ru/data/2234/54/01.jpg
+        """
+        if not thumb_url or '/data/' not in thumb_url or '/t/' not in thumb_url:
+            return None
+        
+        parsed = urlparse(thumb_url)
+        path = parsed.path.replace('/t/', '/', 1)
+        netloc = re.sub(r'^t(\d*)\.', r'img\1.', parsed.netloc)
+        return urlunparse(parsed._replace(scheme=parsed.scheme or 'https', netloc=netloc, path=path))
+    
+    def _derive_from_thumbnails(self, view_urls: List[str], thumb_urls: Dict[str, str],
+                                executor: ThreadPoolExecutor, sample_count: int = 3) -> List[Optional[str]]:
+        """由缩略图推导原图URL并抽样校验
+        
+        - 抽样（首、中、尾）发送HEAD请求，全部通过则信任所有推导结果
+        - 抽样有失败时，对每个推导结果逐一HEAD校验，失败的置为None
+        
+        Returns:
+            与 view_urls 等长的列表，None 表示需要访问查看页获取
+        """
+        derived = []
+        for view_url in view_urls:
+            thumb = thumb_urls.get(view_url)
+            derived.append(self._derive_original_url(urljoin(view_url, thumb)) if thumb else None)
+        
+        candidates = [idx for idx, url in enumerate(derived) if url]
+        if not candidates:
+            return derived
+        
+        sample_count = max(1, sample_count)
+        if len(candidates) <= sample_count:
+            samples = candidates
+        else:
+            step = (len(candidates) - 1) / (sample_count - 1) if sample_count > 1 else 0
+            samples = sorted({candidates[round(i * step)] for i in range(sample_count)})
+        
+        sample_results = list(executor.map(lambda idx: self.browser.http.head_ok(derived[idx]), samples))
+        if all(sample_results):
+            logger.info(f"  ✓ 缩略图推导原图抽样校验通过（{len(samples)} 张），共推导 {len(candidates)} 张")
+            return derived
+        
+        logger.info(f"  缩略图推导抽样校验未全部通过，逐张校验 {len(candidates)} 个推导地址...")
+        verify_results = list(executor.map(lambda idx: self.browser.http.head_ok(derived[idx]), candidates))
+        for idx, ok in zip(candidates, verify_results):
+            if not ok:
+                derived[idx] = None
+        logger.info(f"  逐张校验通过 {sum(verify_results)}/{len(candidates)} 张")
+        return derived
+    
+    @staticmethod
+    def parse_gallery_index(root) -> List[Tuple[str, Optional[str]]]:
+        """从分页快照中解析图片查看链接及其缩略图 [(view_url, thumb_url)]"""
+        view_links = []
+        for link in root.cssselect("a[href*='photos-view-id-']"):
+            url = link.get('href')
+            if url and 'photos-view-id-' in url:
+                thumb = select_one(link, "img")
+                view_links.append((url, thumb.get('src') if thumb is not None else None))
+        return view_links
+    
+    @classmethod
+    def parse_original_image(cls, root) -> Optional[str]:
+        """从查看页快照中提取原图URL"""
+        for img in root.cssselect("img[src*='wnimg']"):
+            src = img.get('src')
+            if cls._is_original_image(src):
+                return src
+        return None
+    
+    def _fetch_original_url(self, view_url: str) -> Optional[str]:
+        """通过HTTP抓取单个查看页并提取原图URL（在线程池中执行）"""
+        html = self.browser.http.fetch(view_url)
+        if not html:
+            return None
+        return self.parse_original_image(parse_html(html, view_url))
+    
+    def _fetch_original_url_by_browser(self, view_url: str) -> Optional[str]:
+        """使用浏览器访问查看页并提取原图URL（HTTP方式失败时的兜底）"""
+        return self.parse_original_image(self.browser.snapshot(view_url, wait=1.5))
+    
+    def _drain_resolved(self, pending: deque, stats: Dict, block: bool,
+                        stop_event: Optional[threading.Event] = None) -> Generator[Dict, None, None]:
+        """按页面顺序产出已解析完成的图片
+        
+        Args:
+            pending: 待产出队列 [index, view_url, original_url, future]
+            stats: 统计信息（'resolved' 会被累加）
+            block: 为True时等待所有未完成的解析；为False时遇到未完成的项就返回
+            stop_event: 设置后不再使用浏览器重试，直接返回
+        """
+        while pending:
+            idx, view_url, original_url, future = pending[0]
+            
+            if not original_url and future is not None:
+                if not block and not future.done():
+                    return
+                try:
+                    original_url = future.result()
+                except Exception as e:
+                    logger.debug(f"    [{idx}] HTTP解析失败: {get_error_message(e)}")
+            
+            pending.popleft()
+            
+            # HTTP方式失败的页面用浏览器重试
+            if not original_url:
+                if stop_event and stop_event.is_set():
+                    return
+                try:
+                    logger.info(f"    [{idx}] HTTP获取失败，使用浏览器重试...")
+                    original_url = self._fetch_original_url_by_browser(view_url)
+                except Exception as e:
+                    logger.warning(f"    ✗ [{idx}] 获取失败: {get_error_message(e)}")
+            
+            if original_url:
+                stats['resolved'] += 1
+                logger.debug(f"    ✓ [{idx}] {original_url[:70]}...")
+                yield self._build_image_entry(idx, original_url)
+            else:
+                logger.warning(f"    ✗ [{idx}] 未找到原图")
@@ -0,0 +1,221 @@
+"""镜像站选择模块 - 并发探测发布页上的网站地址，按延迟排序并缓存"""
+import time
+import threading
+from typing import List, Optional, Dict
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import requests
+from bs4 import BeautifulSoup
+from app.config import settings
+from app.utils.logger import logger, get_error_message
+
+
+class MirrorSelector:
+    """镜像站选择器（单例）
+    
+    - 从发布页解析候选地址，并发探测所有候选，按成功与否和延迟排序
+    - 排序结果缓存 mirror_cache_ttl 秒；过期后先返回旧结果，同时在后台重新探测
+    - 应用启动后由后台线程每隔 mirror_cache_ttl 秒主动重新探测（start/stop），空闲时排序也保持最新
+    - 任务中当前镜像连续失败时，通过 report_failure / get_next 切换到次优镜像
+    """
+    
+    _instance = None
+    _lock = Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(MirrorSelector, cls).__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self._state_lock = Lock()
+        self._refresh_lock = Lock()
+        self._ranked: List[str] = []  # 可用镜像，按延迟从低到高排序
+        self._latencies: Dict[str, float] = {}
+        self._known_hosts: set = set()  # 所有候选镜像的主机名（用于URL改写）
+        self._probed_at: float = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._initialized = True
+    
+    def start(self):
+        """启动后台定期探测线程（重复调用无效）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="mirror-refresh", daemon=True)
+        self._thread.start()
+        logger.info(f"镜像定期探测已启动（每 {settings.mirror_cache_ttl} 秒执行一次）")
+    
+    def stop(self):
+        """停止后台定期探测线程"""
+        self._stop_event.set()
+    
+    def _loop(self):
+        # 启动时立即探测一次，之后按缓存有效期定期探测
+        interval = max(settings.mirror_cache_ttl, 60)
+        delay = 0
+        while not self._stop_event.wait(delay):
+            self.refresh()
+            delay = interval
+    
+    def _is_fresh(self) -> bool:
+        return bool(self._ranked) and time.monotonic() - self._probed_at < settings.mirror_cache_ttl
+    
+    def get_ranked(self) -> List[str]:
+        """获取按延迟排序的可用镜像列表"""
+        with self._state_lock:
+            ranked = list(self._ranked)
+            fresh = self._is_fresh()
+        
+        if fresh:
+            return ranked
+        
+        if ranked:
+            # 缓存已过期：先返回旧结果，在后台重新探测
+            self.refresh_in_background()
+            return ranked
+        
+        # 首次使用，同步探测
+        self.refresh()
+        with self._state_lock:
+            return list(self._ranked)
+    
+    def get_best(self) -> Optional[str]:
+        """获取当前最优的镜像地址"""
+        ranked = self.get_ranked()
+        return ranked[0] if ranked else None
+    
+    def get_next(self, current: Optional[str]) -> Optional[str]:
+        """获取除 current 以外的最优镜像（用于故障切换）"""
+        for url in self.get_ranked():
+            if url != current:
+                return url
+        return None
+    
+    def is_known_host(self, host: str) -> bool:
+        """判断主机名是否属于候选镜像"""
+        return host in self._known_hosts
+    
+    def report_failure(self, url: str):
+        """报告镜像故障：降到排序末尾，并在后台重新探测"""
+        with self._state_lock:
+            if url in self._ranked:
+                self._ranked.remove(url)
+                self._ranked.append(url)
+        logger.warning(f"镜像故障，已降级: {url}")
+        self.refresh_in_background()
+    
+    def refresh_in_background(self):
+        """在后台线程中重新探测（已在探测中时忽略）"""
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="mirror-probe", daemon=True).start()
+    
+    def refresh(self):
+        """重新获取候选地址并并发探测"""
+        if not self._refresh_lock.acquire(blocking=False):
+            # 其他线程正在探测，等待其完成
+            with self._refresh_lock:
+                return
+        
+        try:
+            candidates = self._fetch_candidates()
+            if not candidates:
+                logger.warning("未找到可用的漫画网站地址")
+                return
+            
+            with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+                latencies = list(executor.map(self._probe, candidates))
+            
+            results = {url: latency for url, latency in zip(candidates, latencies) if latency is not None}
+            ranked = sorted(results, key=results.get)
+            
+            with self._state_lock:
+                self._known_hosts.update(urlparse(url).netloc for url in candidates)
+                self._latencies = results
+                self._probed_at = time.monotonic()
+                # 全部探测失败时保留旧结果，避免清空可用列表
+                if ranked:
+                    self._ranked = ranked
+            
+            if ranked:
+                summary = ", ".join(f"{url} ({results[url] * 1000:.0f}ms)" for url in ranked)
+                logger.info(f"镜像探测完成，可用 {len(ranked)}/{len(candidates)}: {summary}")
+            else:
+                logger.warning(f"镜像探测完成，{len(candidates)} 个候选地址均不可用")
+        except Exception as e:
+            logger.error(f"镜像探测失败: {get_error_message(e)}")
+        finally:
+            self._refresh_lock.release()
+    
+    @staticmethod
+    def _probe(url: str) -> Optional[float]:
+        """探测单个镜像，返回延迟（秒），不可用返回None"""
+        try:
+            start = time.monotonic()
+            response = requests.get(f"{url}/", timeout=settings.mirror_probe_timeout)
+            if response.status_code == 200:
+                return time.monotonic() - start
+        except Exception:
+            pass
+        return None
+    
+    @staticmethod
+    def _fetch_candidates() -> List[str]:
+        """从发布页获取候选的漫画网站地址（根据页面布局和元素结构查找）"""
+        try:
+            response = requests.get(settings.publish_page_url, timeout=10)
+            response.encoding = 'utf-8'
+            soup = BeautifulSoup(response.text, 'html.parser')
+        except Exception as e:
+            logger.error(f"获取发布页失败: {get_error_message(e)}")
+            return []
+        
+        urls = []
+        
+        # 根据页面布局查找：在ul列表的li元素中查找target="_blank"的链接
+        # 这些链接通常就是漫画网站地址
+        ul_lists = soup.find_all('ul')
+        
+        for ul in ul_lists:
+            for li in ul.find_all('li'):
+                # 在每个li中查找target="_blank"的链接（根据页面结构特征）
+                for link in li.find_all('a', {'target': '_blank'}, href=True):
+                    href = link.get('href', '')
+                    
+                    # 排除发布页本身和chrome浏览器链接（根据URL特征）
+                    if 'wn01.link' in href or 'google.cn' in href:
+                        continue
+                    
+                    # 检查链接内部是否有i标签（页面结构特征）
+                    # 漫画网站链接通常有i标签包裹文本
+                    if link.find('i') and href.startswith('http'):
+                        urls.append(href)
+        
+        # 如果上面的方法没找到，尝试备用方法：查找所有ul中li内的链接
+        if not urls:
+            for ul in ul_lists:
+                for li in ul.find_all('li'):
+                    for link in li.find_all('a', href=True):
+                        href = link.get('href', '')
+                        # 排除发布页和chrome链接
+                        if 'wn01.link' in href or 'google.cn' in href:
+                            continue
+                        # 检查是否是http/https链接
+                        if href.startswith('http'):
+                            urls.append(href)
+        
+        # 去重并保持顺序
+        return list(dict.fromkeys(url.rstrip('/') for url in urls))
+
+
+# 全局镜像选择器实例
+mirror_selector = MirrorSelector()
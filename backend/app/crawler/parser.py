@@ -0,0 +1,96 @@
+"""页面解析模块 - 基于 page_source 快照使用 lxml 解析
+
+每次 find_element / .text / get_attribute 都是一次 WebDriver HTTP 往返，
+这里改为一次性获取页面源码，在进程内用相同的选择器解析。
+解析函数同样适用于 HTTP 抓取到的 HTML。
+"""
+import re
+from typing import Optional, Callable
+from urllib.parse import urlparse
+from lxml import html as lxml_html
+
+# 漫画URL中的 aid（例如 photos-index-aid-12345.html）
+MANGA_AID_PATTERN = re.compile(r'aid-(\d+)')
+
+
+def parse_html(page_source: str, base_url: Optional[str] = None):
+    """解析HTML为lxml文档树
+    
+    Args:
+        page_source: 页面源码
+        base_url: 页面URL，用于将相对链接转换为绝对链接（与Selenium的get_attribute行为一致）
+    """
+    try:
+        root = lxml_html.fromstring(page_source or "<html></html>")
+    except ValueError:
+        # 带有XML编码声明的字符串不能直接解析，转为字节后交给lxml识别编码
+        root = lxml_html.fromstring(page_source.encode('utf-8'))
+    if base_url:
+        root.make_links_absolute(base_url, resolve_base_href=True)
+    return root
+
+
+def element_text(element) -> str:
+    """获取元素文本（合并空白，近似Selenium的 .text）"""
+    if element is None:
+        return ""
+    return " ".join(element.text_content().split())
+
+
+def select_one(root, selector: str):
+    """CSS选择器查找第一个元素，找不到返回None"""
+    found = root.cssselect(selector)
+    return found[0] if found else None
+
+
+def xpath_one(root, expression: str):
+    """XPath查找第一个元素，找不到返回None"""
+    found = root.xpath(expression)
+    return found[0] if found else None
+
+
+def parse_page_count(text: str) -> Optional[int]:
+    """从文本中提取页数（格式：頁數：20 或 頁數：20P）"""
+    page_match = re.search(r'(\d+)\s*P?', text or "")
+    if page_match:
+        return int(page_match.group(1))
+    return None
+
+
+def find_next_page_url(root, is_valid: Callable[[str], bool]) -> Optional[str]:
+    """通过分页器的 ".next > a"（"後頁>"链接）查找下一页
+    
+    Args:
+        root: 页面文档树（链接已转换为绝对地址）
+        is_valid: 校验下一页URL是否符合条件的函数
+    
+    Returns:
+        下一页URL，没有则返回None
+    """
+    paginator = select_one(root, ".paginator")
+    if paginator is None:
+        return None
+    
+    next_link = select_one(paginator, ".next a")
+    if next_link is None:
+        return None
+    
+    href = next_link.get('href')
+    if href and is_valid(href):
+        return href
+    return None
+
+
+def manga_key(manga_url: Optional[str]) -> Optional[str]:
+    """漫画URL的镜像无关标识：aid，URL中没有aid时使用路径和查询串
+    
+    同一漫画在不同镜像上的URL只有主机名不同，比较和去重时使用该标识
+    """
+    if not manga_url:
+        return None
+    match = MANGA_AID_PATTERN.search(manga_url)
+    if match:
+        return match.group(1)
+    parsed = urlparse(manga_url)
+    return parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
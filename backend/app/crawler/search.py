@@ -1,10 +1,9 @@
 """搜索功能模块"""
-import time
 import re
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from datetime import datetime
-from urllib.parse import quote, urlparse, parse_qs, urlencode
-from selenium.webdriver.common.by import By
+from urllib.parse import quote
+from app.crawler.parser import parse_html, element_text, select_one
 from app.utils.logger import logger, get_error_message
 
 
@@ -20,6 +19,239 @@ class SearchCrawler:
         """动态获取base_url，确保获取到最新值"""
         return self.browser.base_url
     
+    @staticmethod
+    def _absolute_url(url: str, base: str) -> str:
+        """确保URL完整"""
+        if url.startswith('//'):
+            return f"https:{url}"
+        if url.startswith('/'):
+            return f"{base}{url}"
+        if not url.startswith('http'):
+            return f"{base}/{url}"
+        return url
+    
+    @staticmethod
+    def _parse_info_text(info_text: str):
+        """从 span.info 文本中提取创建时间和页数
+        
+        Returns:
+            (updated_at, page_count)
+        """
+        updated_at = None
+        page_count = None
+        
+        # 提取日期：创建于2024-09-21 01:45:25
+        date_match = re.search(r'创建于(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2}:\d{2})', info_text)
+        if date_match:
+            date_str = f"{date_match.group(1)} {date_match.group(2)}"
+            updated_at = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        else:
+            # 尝试只提取日期
+            date_match = re.search(r'创建于(\d{4}-\d{2}-\d{2})', info_text)
+            if date_match:
+                updated_at = datetime.strptime(date_match.group(1), '%Y-%m-%d')
+        
+        # 提取页数：55张图片
+        page_match = re.search(r'(\d+)张图片', info_text)
+        if page_match:
+            page_count = int(page_match.group(1))
+        
+        return updated_at, page_count
+    
+    @staticmethod
+    def parse_search_results(root, base: str) -> List[Dict]:
+        """从搜索结果页快照中解析漫画列表
+        
+        Returns:
+            [{'url', 'title', 'updated_at', 'page_count', 'cover_image_url'}]
+        """
+        manga_info_list = []
+        
+        # 查找 ul.col_2 容器
+        container = select_one(root, "ul.col_2")
+        if container is None:
+            logger.warning(f"    未找到漫画列表容器 ul.col_2")
+            # 备用方法：直接查找所有漫画链接
+            manga_links = root.cssselect("a[href*='photos-index-aid-']")
+            logger.info(f"    备用方法找到 {len(manga_links)} 个漫画链接")
+            for manga_link in manga_links:
+                manga_url = manga_link.get('href')
+                title = element_text(manga_link)
+                if manga_url and title:
+                    manga_info_list.append({
+                        'url': SearchCrawler._absolute_url(manga_url, base),
+                        'title': title,
+                        'updated_at': None,
+                        'page_count': None,
+                        'cover_image_url': None
+                    })
+            return manga_info_list
+        
+        # 查找所有 li.cate-* 项
+        manga_items = container.cssselect("li[class*='cate-']")
+        logger.info(f"    找到 {len(manga_items)} 个漫画项")
+        
+        for item in manga_items:
+            try:
+                # 查找漫画链接
+                manga_link = select_one(item, "a[href*='photos-index-aid-']")
+                if manga_link is None:
+                    continue
+                manga_url = manga_link.get('href')
+                title = element_text(manga_link)
+                
+                if not manga_url or not title:
+                    continue
+                
+                # 获取创建时间和页数（从 span.info 中提取）
+                updated_at = None
+                page_count = None
+                info_span = select_one(item, "span.info")
+                if info_span is not None:
+                    updated_at, page_count = SearchCrawler._parse_info_text(element_text(info_span))
+                
+                # 获取封面图片URL
+                cover_image_url = None
+                img = select_one(item, "img[src*='wnimg'], img[src*='qy0']")
+                if img is not None and img.get('src'):
+                    cover_image_url = SearchCrawler._absolute_url(img.get('src'), base)
+                
+                manga_info_list.append({
+                    'url': SearchCrawler._absolute_url(manga_url, base),
+                    'title': title,
+                    'updated_at': updated_at,
+                    'page_count': page_count,
+                    'cover_image_url': cover_image_url
+                })
+            except Exception as e:
+                logger.warning(f"    提取漫画信息失败: {get_error_message(e)}")
+                continue
+        
+        return manga_info_list
+    
+    @staticmethod
+    def find_search_next_page(root, page_num: int, visited_urls: set) -> Optional[str]:
+        """查找页码为"当前页+1"的搜索结果链接"""
+        paginator = select_one(root, ".paginator")
+        if paginator is None:
+            return None
+        
+        # 获取当前页页码（优先从.thispage元素获取，更准确）
+        current_page_num = page_num
+        thispage_elem = select_one(paginator, ".thispage")
+        if thispage_elem is not None:
+            try:
+                current_page_num = int(element_text(thispage_elem))
+            except ValueError:
+                pass
+        
+        # 计算下一页页码
+        next_page_num = current_page_num + 1
+        logger.debug(f"    当前页: {current_page_num}, 查找页码为 {next_page_num} 的链接")
+        
+        # 在分页器中查找所有链接，找到页码等于"当前页+1"的链接
+        for link in paginator.cssselect("a"):
+            full_url = link.get('href')
+            if not full_url:
+                continue
+            
+            # 从URL中提取页码参数（格式：p=2 或 &p=2）
+            page_match = re.search(r'[&?]p=(\d+)', full_url)
+            if page_match and int(page_match.group(1)) == next_page_num:
+                # 找到页码等于"当前页+1"且未访问过的链接
+                if full_url not in visited_urls and 'q=' in full_url:
+                    logger.info(f"    ✓ 找到页码为 {next_page_num} 的链接: {full_url[:80]}")
+                    return full_url
+        
+        return None
+    
+    def _search_author(self, author_name: str, since_date: datetime,
+                       fetch_page: Callable[[str], object]) -> List[Dict]:
+        """
+        遍历作者搜索结果，返回晚于截止日期的漫画（失败时抛出异常）
+        
+        Args:
+            fetch_page: 获取页面文档树的函数（HTTP或浏览器）
+        """
+        base = self.base_url.rstrip('/')
+        # 构造搜索URL（使用正确的搜索格式）
+        encoded_author = quote(author_name)
+        search_url = f"{base}/q/?q={encoded_author}&f=_all&s=create_time_DESC&syn=yes"
+        logger.info(f"搜索作者: {author_name}, URL: {search_url}")
+        
+        visited_urls = set()
+        current_url = search_url
+        page_num = 1
+        all_mangas = []
+        
+        # 遍历所有搜索结果页面
+        while True:
+            if current_url in visited_urls:
+                logger.info(f"  检测到重复URL，停止翻页")
+                break
+            
+            logger.info(f"  访问第 {page_num} 页: {current_url}")
+            root = fetch_page(current_url)
+            visited_urls.add(current_url)
+            
+            # 从页面快照中解析漫画列表
+            manga_info_list = self.parse_search_results(root, base)
+            
+            if len(manga_info_list) == 0:
+                logger.info(f"    第 {page_num} 页没有找到漫画，停止翻页")
+                break
+            
+            # 筛选出晚于截止日期的漫画，同时检查是否遇到早于截止日期的漫画
+            # 由于搜索结果按时间倒序排列，一旦遇到早于截止日期的漫画，后面的都是更旧的，可以停止翻页
+            should_stop = False
+            for manga_info in manga_info_list:
+                if manga_info['updated_at']:
+                    if manga_info['updated_at'] > since_date:
+                        # 晚于截止日期，添加到结果
+                        all_mangas.append({
+                            'title': manga_info['title'],
+                            'manga_url': manga_info['url'],
+                            'updated_at': manga_info['updated_at'],
+                            'page_count': manga_info['page_count'],
+                            'cover_image_url': manga_info['cover_image_url'],
+                            'author': author_name
+                        })
+                    else:
+                        # 早于或等于截止日期，由于结果按时间倒序，后面的都是更旧的，可以停止翻页
+                        logger.info(f"    遇到早于截止日期的漫画（{manga_info['updated_at']} <= {since_date}），停止翻页")
+                        should_stop = True
+                        break
+            
+            # 如果遇到早于截止日期的漫画，停止翻页
+            if should_stop:
+                break
+            
+            # 🔥 搜索结果页只有数字分页，通过记录当前页码，查找页码为"当前页+1"的链接
+            next_page_url = self.find_search_next_page(root, page_num, visited_urls)
+            
+            # 如果找不到下一页链接，说明已经到最后一页，遍历完当前页后结束
+            if not next_page_url:
+                logger.info(f"    ⚠️  未找到下一页链接，这是最后一页，停止翻页")
+                break
+            
+            # next_page_url已经在前面处理过，直接使用
+            current_url = next_page_url
+            page_num += 1
+            
+            if page_num > 100:  # 限制最大页数
+                logger.warning(f"    已达到最大页数限制(100页)，停止翻页")
+                break
+        
+        logger.info(f"  作者 {author_name} 共找到 {len(all_mangas)} 个新更新")
+        return all_mangas
+    
+    def _fetch_search_page(self, url: str):
+        """通过HTTP获取搜索结果页（线程安全），失败时抛出异常"""
+        page_source = self.browser.http.fetch(url)
+        if page_source is None:
+            raise RuntimeError(f"HTTP获取页面失败: {url}")
+        return parse_html(page_source, url)
+    
     def search_author_updates(self, author_name: str, since_date: datetime) -> List[Dict]:
         """
         搜索作者并获取更新
@@ -41,224 +273,20 @@ class SearchCrawler:
             return []
         
         try:
-            base = self.base_url.rstrip('/')
-            # 构造搜索URL（使用正确的搜索格式）
-            encoded_author = quote(author_name)
-            search_url = f"{base}/q/?q={encoded_author}&f=_all&s=create_time_DESC&syn=yes"
-            logger.info(f"搜索作者: {author_name}, URL: {search_url}")
-            
-            visited_urls = set()
-            current_url = search_url
-            page_num = 1
-            all_mangas = []
-            
-            # 遍历所有搜索结果页面
-            while True:
-                if current_url in visited_urls:
-                    logger.info(f"  检测到重复URL，停止翻页")
-                    break
-                
-                logger.info(f"  访问第 {page_num} 页: {current_url}")
-                self.driver.get(current_url)
-                visited_urls.add(current_url)
-                time.sleep(2)
-                
-                # 查找漫画列表容器（使用正确的选择器）
-                manga_info_list = []
-                try:
-                    # 查找 ul.col_2 容器
-                    container = self.driver.find_element(By.CSS_SELECTOR, "ul.col_2")
-                    # 查找所有 li.cate-* 项
-                    manga_items = container.find_elements(By.CSS_SELECTOR, "li[class*='cate-']")
-                    logger.info(f"    找到 {len(manga_items)} 个漫画项")
-                    
-                    for item in manga_items:
-                        try:
-                            # 查找漫画链接
-                            manga_link = item.find_element(By.CSS_SELECTOR, "a[href*='photos-index-aid-']")
-                            manga_url = manga_link.get_attribute('href')
-                            title = manga_link.text.strip()
-                            
-                            if not manga_url or not title:
-                                continue
-                            
-                            # 确保URL完整
-                            if manga_url.startswith('/'):
-                                manga_url = f"{base}{manga_url}"
-                            elif not manga_url.startswith('http'):
-                                manga_url = f"{base}/{manga_url}"
-                            
-                            # 获取创建时间和页数（从 span.info 中提取）
-                            updated_at = None
-                            page_count = None
-                            try:
-                                info_span = item.find_element(By.CSS_SELECTOR, "span.info")
-                                info_text = info_span.text
-                                
-                                # 提取日期：创建于2024-09-21 01:45:25
-                                date_match = re.search(r'创建于(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2}:\d{2})', info_text)
-                                if date_match:
-                                    date_str = f"{date_match.group(1)} {date_match.group(2)}"
-                                    updated_at = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-                                else:
-                                    # 尝试只提取日期
-                                    date_match = re.search(r'创建于(\d{4}-\d{2}-\d{2})', info_text)
-                                    if date_match:
-                                        date_str = date_match.group(1)
-                                        updated_at = datetime.strptime(date_str, '%Y-%m-%d')
-                                
-                                # 提取页数：55张图片
-                                page_match = re.search(r'(\d+)张图片', info_text)
-                                if page_match:
-                                    page_count = int(page_match.group(1))
-                            except:
-                                pass
-                            
-                            # 获取封面图片URL
-                            cover_image_url = None
-                            try:
-                                img = item.find_element(By.CSS_SELECTOR, "img[src*='wnimg'], img[src*='qy0']")
-                                cover_image_url = img.get_attribute('src')
-                                if cover_image_url:
-                                    if cover_image_url.startswith('//'):
-                                        cover_image_url = f"https:{cover_image_url}"
-                                    elif cover_image_url.startswith('/'):
-                                        cover_image_url = f"{base}{cover_image_url}"
-                                    elif not cover_image_url.startswith('http'):
-                                        cover_image_url = f"{base}/{cover_image_url}"
-                            except:
-                                pass
-                            
-                            manga_info_list.append({
-                                'url': manga_url,
-                                'title': title,
-                                'updated_at': updated_at,
-                                'page_count': page_count,
-                                'cover_image_url': cover_image_url
-                            })
-                        except Exception as e:
-                            logger.warning(f"    提取漫画信息失败: {get_error_message(e)}")
-                            continue
-                except Exception as e:
-                    logger.warning(f"    查找漫画列表失败: {get_error_message(e)}")
-                    # 备用方法：直接查找所有漫画链接
-                    manga_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='photos-index-aid-']")
-                    logger.info(f"    备用方法找到 {len(manga_links)} 个漫画链接")
-                    for manga_link in manga_links:
-                        try:
-                            manga_url = manga_link.get_attribute('href')
-                            title = manga_link.text.strip()
-                            if manga_url and title:
-                                if manga_url.startswith('/'):
-                                    manga_url = f"{base}{manga_url}"
-                                manga_info_list.append({
-                                    'url': manga_url,
-                                    'title': title,
-                                    'updated_at': None,
-                                    'page_count': None,
-                                    'cover_image_url': None
-                                })
-                        except:
-                            continue
-                
-                if len(manga_info_list) == 0:
-                    logger.info(f"    第 {page_num} 页没有找到漫画，停止翻页")
-                    break
-                
-                # 筛选出晚于截止日期的漫画，同时检查是否遇到早于截止日期的漫画
-                # 由于搜索结果按时间倒序排列，一旦遇到早于截止日期的漫画，后面的都是更旧的，可以停止翻页
-                should_stop = False
-                for manga_info in manga_info_list:
-                    if manga_info['updated_at']:
-                        if manga_info['updated_at'] > since_date:
-                            # 晚于截止日期，添加到结果
-                            all_mangas.append({
-                                'title': manga_info['title'],
-                                'manga_url': manga_info['url'],
-                                'updated_at': manga_info['updated_at'],
-                                'page_count': manga_info['page_count'],
-                                'cover_image_url': manga_info['cover_image_url'],
-                                'author': author_name
-                            })
-                        else:
-                            # 早于或等于截止日期，由于结果按时间倒序，后面的都是更旧的，可以停止翻页
-                            logger.info(f"    遇到早于截止日期的漫画（{manga_info['updated_at']} <= {since_date}），停止翻页")
-                            should_stop = True
-                            break
-                
-                # 如果遇到早于截止日期的漫画，停止翻页
-                if should_stop:
-                    break
-                
-                # 🔥 搜索结果页只有数字分页，通过记录当前页码，查找页码为"当前页+1"的链接
-                next_page_url = None
-                try:
-                    # 根据MCP确认的结构：分页器有class "paginator"
-                    paginator = self.driver.find_element(By.CSS_SELECTOR, ".paginator")
-                    if paginator:
-                        # 获取当前页页码
-                        current_page_num = page_num  # 使用临时变量page_num作为当前页
-                        try:
-                            # 尝试从.thispage元素获取当前页（更准确）
-                            thispage_elem = paginator.find_element(By.CSS_SELECTOR, ".thispage")
-                            if thispage_elem:
-                                current_page_num = int(thispage_elem.text.strip())
-                        except:
-                            # 如果找不到.thispage，使用page_num变量
-                            pass
-                        
-                        # 计算下一页页码
-                        next_page_num = current_page_num + 1
-                        logger.debug(f"    当前页: {current_page_num}, 查找页码为 {next_page_num} 的链接")
-                        
-                        # 在分页器中查找所有链接，找到页码等于"当前页+1"的链接
-                        page_links = paginator.find_elements(By.CSS_SELECTOR, "a")
-                        
-                        for link in page_links:
-                            href = link.get_attribute('href')
-                            if not href:
-                                continue
-                            
-                            # 处理相对路径
-                            if href.startswith('/'):
-                                full_url = f"{base}{href}"
-                            elif not href.startswith('http'):
-                                full_url = f"{base}/{href}"
-                            else:
-                                full_url = href
-                            
-                            # 从URL中提取页码参数（格式：p=2 或 &p=2）
-                            page_match = re.search(r'[&?]p=(\d+)', full_url)
-                            if page_match:
-                                link_page_num = int(page_match.group(1))
-                                # 找到页码等于"当前页+1"且未访问过的链接
-                                if (link_page_num == next_page_num and 
-                                    full_url not in visited_urls and
-                                    'q=' in full_url):
-                                    next_page_url = full_url
-                                    logger.info(f"    ✓ 找到页码为 {next_page_num} 的链接: {next_page_url[:80]}")
-                                    break
-                except Exception as e:
-                    logger.debug(f"    查找分页器失败: {get_error_message(e)}")
-                    pass
-                
-                # 如果找不到下一页链接，说明已经到最后一页，遍历完当前页后结束
-                if not next_page_url:
-                    logger.info(f"    ⚠️  未找到下一页链接，这是最后一页，停止翻页")
-                    break
-                
-                # next_page_url已经在前面处理过，直接使用
-                current_url = next_page_url
-                page_num += 1
-                
-                if page_num > 100:  # 限制最大页数
-                    logger.warning(f"    已达到最大页数限制(100页)，停止翻页")
-                    break
-            
-            logger.info(f"  作者 {author_name} 共找到 {len(all_mangas)} 个新更新")
-            return all_mangas
-            
+            return self._search_author(author_name, since_date, lambda url: self.browser.snapshot(url, wait=2))
         except Exception as e:
             logger.error(f"搜索作者 {author_name} 失败: {get_error_message(e)}")
             return []
-
+    
+    def search_author_updates_http(self, author_name: str, since_date: datetime) -> List[Dict]:
+        """
+        通过HTTP搜索作者并获取更新（不使用浏览器，可在工作线程中并发调用）
+        
+        与 search_author_updates 不同，失败时抛出异常，由调用方决定是否使用浏览器重试
+        
+        Returns:
+            漫画列表，格式同 search_author_updates
+        """
+        if not self.base_url:
+            raise RuntimeError("base_url未设置，无法搜索作者更新")
+        return self._search_author(author_name, since_date, self._fetch_search_page)
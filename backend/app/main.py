@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,8 +7,12 @@ from app.routers import manga, sync, download, recent_updates, tasks
 from app.database import Base, engine, SessionLocal
 from app.utils.logger import logger
 from app import models  # 🔥 必须导入models，否则Base.metadata找不到表
-from app.services.task_manager import TaskManager
+from app.services.task_manager import TaskManager, sse_manager
+from app.services.task_retention import retention_scheduler
+from app.crawler.mirrors import mirror_selector
 from app.utils.migration import run_migrations
+from app.utils.compression import CompressionMiddleware
+from app.utils.serialization import DefaultJSONResponse
 
 # 启动日志
 logger.info("=" * 60)
@@ -16,8 +21,16 @@ logger.info(f"数据库: {settings.database_url}")
 logger.info("=" * 60)
 
 
+_startup_done = False
+
+
 def init_on_startup():
-    """启动时初始化操作"""
+    """启动时初始化操作（lifespan和startup事件都可能调用，只执行一次）"""
+    global _startup_done
+    if _startup_done:
+        return
+    _startup_done = True
+    
     logger.info("执行启动初始化...")
     
     # 1. 首先运行数据库自动迁移（类似于 JPA 的自动迁移）
@@ -39,31 +52,83 @@ def init_on_startup():
     finally:
         db.close()
     
+    # 3. 恢复被中断的同步任务（从检查点继续）
+    if settings.resume_tasks_on_startup:
+        try:
+            resume_interrupted_tasks()
+        except Exception as e:
+            logger.error(f"恢复中断任务时出错: {e}")
+    
+    # 4. 启动任务历史归档调度
+    if settings.task_retention_enabled:
+        retention_scheduler.start()
+    
+    # 5. 启动镜像定期探测
+    if settings.mirror_refresh_enabled:
+        mirror_selector.start()
+    
     logger.info("启动初始化完成")
 
 
+def resume_interrupted_tasks():
+    """为留有检查点的 sync / sync_recent_updates 任务创建新任务，并在后台线程中继续执行"""
+    import threading
+    from app.services.sync_service import SyncService
+    from app.services.recent_updates_service import RecentUpdatesService
+    
+    runners = {
+        "sync": lambda task_id, checkpoint: SyncService.execute_sync_task(task_id, None, False, checkpoint),
+        "sync_recent_updates": lambda task_id, checkpoint: RecentUpdatesService.execute_sync_recent_updates_task(
+            task_id, None, False, checkpoint
+        ),
+    }
+    
+    db = SessionLocal()
+    try:
+        for task_type, runner in runners.items():
+            checkpoint = TaskManager.take_checkpoint(db, task_type)
+            if not checkpoint:
+                continue
+            
+            task = TaskManager.create_task(db, task_type=task_type)
+            logger.info(f"从检查点恢复中断的任务: {task.id} ({task_type})")
+            threading.Thread(
+                target=runner, args=(task.id, checkpoint),
+                name=f"resume-{task_type}", daemon=True
+            ).start()
+    finally:
+        db.close()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时的初始化操作
+    # 绑定事件循环，后台线程通过它推送SSE消息
+    sse_manager.bind_loop(asyncio.get_running_loop())
     init_on_startup()
     
     yield  # 应用运行
     
     # 关闭时的清理操作（如果需要）
     logger.info("应用正在关闭...")
+    retention_scheduler.stop()
+    mirror_selector.stop()
 
 
 app = FastAPI(
     title="漫画下载管理器API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse  # 安装了orjson时使用orjson序列化
 )
 
 # 如果lifespan没有执行，使用startup事件作为备用
 @app.on_event("startup")
 async def startup_event():
     """启动事件（备用方案）"""
+    # 绑定事件循环，后台线程通过它推送SSE消息
+    sse_manager.bind_loop(asyncio.get_running_loop())
     init_on_startup()
 
 # CORS配置 - 允许所有来源
@@ -73,8 +138,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],  # 漫画列表分页信息
 )
 
+# 响应压缩（brotli/gzip，SSE等流式响应不压缩）
+if settings.api_compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.api_compression_min_size)
+
 # 注册路由
 app.include_router(manga.router)
 app.include_router(sync.router)
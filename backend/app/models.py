@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, BigInteger
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, BigInteger, Float, Index
+from sqlalchemy.sql import func, text
 from app.database import Base
 import uuid
 
@@ -31,8 +31,22 @@ class Manga(Base):
     # 收藏状态
     is_favorited = Column(Boolean, default=False, index=True)  # 是否已收藏到网站（对应作者文件夹）
     
+    # 详情页元数据（同步和下载时写入，标签见 manga_tags 表）
+    category = Column(String, nullable=True, index=True)  # 分类
+    uploader = Column(String, nullable=True, index=True)  # 上传者
+    
     created_at = Column(DateTime, server_default=func.now())
     updated_at_db = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # 漫画列表的游标分页（按作者、标题排序，或按更新日期排序）
+        Index('ix_mangas_author_title_id', 'author', 'title', 'id'),
+        # 与排序方向一致（updated_at DESC NULLS LAST, id DESC），反向扫描升序索引得到的是 NULLS FIRST，无法避免排序
+        Index('ix_mangas_updated_at_desc_id', updated_at.desc().nulls_last(), id.desc()),
+        # 搜索：pg_trgm 三元组索引（支持 ILIKE 子串匹配和相似度匹配），其他数据库忽略
+        Index('ix_mangas_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_mangas_author_trgm', 'author', postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}),
+    )
 
 
 class RecentUpdate(Base):
@@ -60,13 +74,82 @@ class RecentUpdate(Base):
     updated_at_db = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
+class CollectionCategory(Base):
+    """收藏夹分类同步状态表 - 记录每个作者分类的增量同步高水位"""
+    __tablename__ = "collection_categories"
+
+    category_id = Column(String, primary_key=True)  # 网站上的收藏夹分类ID
+    name = Column(String, nullable=False)  # 分类名（作者名）
+    newest_manga_url = Column(String, nullable=True)  # 高水位：上次同步时分类第一页的第一个漫画（按 manga_key 比较，与镜像无关）
+    last_synced_at = Column(DateTime, nullable=True)  # 最近一次同步时间
+    last_full_sync_at = Column(DateTime, nullable=True)  # 最近一次完整遍历时间
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at_db = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class AuthorWatch(Base):
+    """作者更新检查表 - 记录每个作者的检查时间、最新作品和自适应的检查间隔"""
+    __tablename__ = "author_watch"
+
+    author = Column(String, primary_key=True)  # 作者名
+    last_checked_at = Column(DateTime, nullable=True)  # 最近一次搜索时间
+    next_check_at = Column(DateTime, nullable=True, index=True)  # 下次需要搜索的时间
+    check_interval_hours = Column(Float, nullable=True)  # 当前检查间隔（小时），根据作者发布频率调整
+    newest_manga_url = Column(String, nullable=True)  # 搜索结果中最新的漫画URL
+    newest_updated_at = Column(DateTime, nullable=True)  # 搜索结果中最新漫画的创建时间
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at_db = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class MangaDetailsCache(Base):
+    """漫画详情缓存表 - 保存详情页解析结果，同步、下载和API共用"""
+    __tablename__ = "manga_details_cache"
+
+    aid = Column(String, primary_key=True)  # 网站上的漫画ID（URL中的 aid-xxx）
+    manga_url = Column(String, nullable=False)
+    title = Column(String, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, nullable=True)  # 上传日期
+    cover_image_url = Column(String, nullable=True)
+    category = Column(String, nullable=True)  # 分类
+    tags = Column(String, nullable=True)  # JSON格式的标签列表
+    uploader = Column(String, nullable=True)  # 上传者
+    summary = Column(String, nullable=True)  # 简介
+    fetched_at = Column(DateTime, nullable=False, index=True)  # 抓取时间（用于判断缓存是否过期）
+
+
+class Tag(Base):
+    """标签表"""
+    __tablename__ = "tags"
+
+    id = Column(String, primary_key=True, default=generate_id)
+    name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        # 按标签搜索（pg_trgm 三元组索引）
+        Index('ix_tags_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
+
+class MangaTag(Base):
+    """漫画-标签关联表"""
+    __tablename__ = "manga_tags"
+
+    manga_id = Column(String, primary_key=True)
+    tag_id = Column(String, primary_key=True, index=True)  # 按标签筛选和统计标签数量
+
+
 class Task(Base):
     """任务状态表 - 存储同步和下载任务的状态"""
     __tablename__ = "tasks"
 
     id = Column(String, primary_key=True, default=generate_id)
-    task_type = Column(String, nullable=False, index=True)  # sync, download, batch_download
-    status = Column(String, nullable=False, index=True)  # pending, running, completed, failed
+    # task_type/status 不单独建索引，由下面以它们开头的复合索引和部分索引覆盖
+    task_type = Column(String, nullable=False)  # sync, download, batch_download
+    status = Column(String, nullable=False)  # pending, running, completed, failed
     progress = Column(Integer, default=0)  # 进度百分比 0-100
     total_items = Column(Integer, nullable=True)  # 总项目数
     completed_items = Column(Integer, default=0)  # 已完成项目数
@@ -80,6 +163,41 @@ class Task(Base):
     # 任务结果数据（JSON格式）
     result_data = Column(String, nullable=True)  # JSON格式的结果数据
     
+    # 爬取检查点（JSON格式，用于sync和sync_recent_updates中断后继续）
+    checkpoint = Column(String, nullable=True)
+    
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime, nullable=True)  # 完成时间
+    
+    __table_args__ = (
+        # 下载队列：取下一个待执行任务、列出队列（task_type + status，按创建时间）
+        # 只索引未完成的任务，历史任务再多也不影响队列轮询
+        Index('ix_tasks_active_type_created', 'task_type', 'created_at',
+              postgresql_where=text("status IN ('pending', 'running')")),
+        # 加入队列前检查同一漫画是否已有未完成的下载任务
+        Index('ix_tasks_active_type_manga', 'task_type', 'manga_id',
+              postgresql_where=text("status IN ('pending', 'running')")),
+        # 按类型（和状态）查询最新任务：/api/tasks、最新任务、中断任务的检查点
+        Index('ix_tasks_type_status_created', 'task_type', 'status', 'created_at'),
+        Index('ix_tasks_type_created', 'task_type', 'created_at'),
+        # 不带筛选的任务列表（按创建时间倒序）
+        Index('ix_tasks_created_at', 'created_at'),
+    )
+
+
+class TaskArchive(Base):
+    """任务归档表 - 超过保留期的已完成/失败任务（只保留结果，不含进度和检查点）"""
+    __tablename__ = "task_archive"
+
+    id = Column(String, primary_key=True)  # 原任务ID
+    task_type = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False)  # completed, failed
+    message = Column(String, nullable=True)
+    error_message = Column(String, nullable=True)
+    manga_id = Column(String, nullable=True, index=True)
+    manga_ids = Column(String, nullable=True)
+    result_data = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True, index=True)
+    completed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now())
@@ -1,24 +1,102 @@
 """漫画基础CRUD路由"""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 import time
 from app.database import get_db
 from app.models import Manga
-from app.schemas import MangaResponse
+from app.schemas import MangaResponse, MangaDetailsResponse, MangaSearchResult, FacetsResponse
 from app.crawler.base import MangaCrawler
 from app.config import settings
+from app.services.details_cache import DetailsCacheService
+from app.services.manga_list_service import MangaListService
+from app.services.search_service import MangaSearchService
+from app.services.tag_service import TagService
+from app.utils.serialization import json_response
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/api", tags=["manga"])
 
 
 @router.get("/mangas", response_model=List[MangaResponse])
-def get_mangas(db: Session = Depends(get_db)):
-    """获取所有漫画"""
-    mangas = db.query(Manga).all()
-    return [MangaResponse.from_orm(manga) for manga in mangas]
+def get_mangas(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="每页数量，不传时返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    sort: str = Query("author", description="排序方式：author（作者、标题）或 updated_at（更新日期倒序）"),
+    author: Optional[str] = None,
+    download_status: Optional[str] = None,
+    is_downloaded: Optional[bool] = None,
+    is_favorited: Optional[bool] = None,
+    q: Optional[str] = Query(None, description="按标题或作者模糊搜索"),
+    tag: Optional[str] = None,
+    category: Optional[str] = None,
+    uploader: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """获取漫画列表
+    
+    支持筛选和游标分页：传入 limit 时只返回一页，响应头 X-Next-Cursor 为下一页游标（没有更多时不返回），
+    X-Total-Count 为符合条件的总数
+    """
+    try:
+        items, next_cursor, total = MangaListService.list_mangas(
+            db, sort=sort, limit=limit, cursor=cursor, author=author, download_status=download_status,
+            is_downloaded=is_downloaded, is_favorited=is_favorited, q=q,
+            tag=tag, category=category, uploader=uploader
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # 查询行已经是响应需要的字段，直接序列化
+    return json_response(items, headers=headers)
+
+
+@router.get("/facets", response_model=FacetsResponse)
+def get_facets(limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """标签、分类、上传者及对应的漫画数量（用于筛选，数据来自同步和下载时保存的详情）"""
+    return FacetsResponse(
+        tags=TagService.tag_counts(db, limit),
+        categories=TagService.field_counts(db, Manga.category, limit),
+        uploaders=TagService.field_counts(db, Manga.uploader, limit)
+    )
+
+
+@router.get("/search", response_model=List[MangaSearchResult])
+def search_mangas(
+    q: str = Query(..., min_length=1, description="关键词（匹配标题、作者和标签）"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """搜索漫画，按相关度排序并分页，响应头 X-Total-Count 为匹配总数"""
+    items, total = MangaSearchService.search(db, q, limit=limit, offset=offset)
+    return json_response(items, headers={"X-Total-Count": str(total)})
+
+
+@router.get("/manga/{manga_id}/details", response_model=MangaDetailsResponse)
+def get_manga_details(manga_id: str, db: Session = Depends(get_db)):
+    """获取漫画详情（分类、标签、上传者、简介等）
+    
+    从详情缓存读取（同步和下载时写入），不会访问网站；缓存过期时仍返回并标记 is_stale
+    """
+    manga = db.query(Manga).filter(Manga.id == manga_id).first()
+    if not manga:
+        raise HTTPException(status_code=404, detail="漫画不存在")
+    
+    entry = DetailsCacheService.get_entry(db, manga.manga_url)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="尚未获取该漫画的详情")
+    
+    return MangaDetailsResponse(
+        manga_id=manga.id,
+        fetched_at=entry.fetched_at,
+        is_stale=not DetailsCacheService.is_fresh(entry),
+        **DetailsCacheService.to_dict(entry)
+    )
 
 
 @router.delete("/manga/{manga_id}")
@@ -34,6 +112,8 @@ def delete_manga(manga_id: str, db: Session = Depends(get_db)):
     if manga.cover_image_path and os.path.exists(manga.cover_image_path):
         os.remove(manga.cover_image_path)
     
+    # manga_tags 没有外键，标签关联需要单独删除
+    TagService.delete_manga_tags(db, manga.id)
     db.delete(manga)
     db.commit()
     
@@ -11,26 +11,42 @@ from app.services.recent_updates_service import RecentUpdatesService
 from app.services.download_queue import download_queue_manager
 from app.services.download_service import DownloadService
 from app.utils.logger import logger
+from app.utils.serialization import json_response
 
 router = APIRouter(prefix="/api", tags=["recent-updates"])
 
 
 @router.get("/recent-updates", response_model=List[MangaResponse])
 def get_recent_updates(db: Session = Depends(get_db)):
-    """获取最近更新（从RecentUpdate表读取）"""
-    recent_updates = db.query(RecentUpdate).order_by(RecentUpdate.updated_at.desc()).all()
-    return [MangaResponse.from_orm(update) for update in recent_updates]
+    """获取最近更新（从RecentUpdate表读取，只查询响应需要的列并直接序列化）"""
+    rows = db.query(
+        RecentUpdate.id, RecentUpdate.title, RecentUpdate.author, RecentUpdate.manga_url, RecentUpdate.file_size,
+        RecentUpdate.page_count, RecentUpdate.updated_at, RecentUpdate.is_downloaded, RecentUpdate.downloaded_at,
+        RecentUpdate.cover_image_url, RecentUpdate.cover_image_path
+    ).order_by(RecentUpdate.updated_at.desc()).all()
+    
+    items = []
+    for row in rows:
+        item = dict(row._mapping)
+        item['is_downloaded'] = item['is_downloaded'] or False
+        item['preview_image_url'] = item['cover_image_url']  # 使用cover_image_url作为预览图
+        item['is_favorited'] = False  # RecentUpdate 没有收藏状态
+        items.append(item)
+    return json_response(items)
 
 
 @router.post("/sync-recent-updates", response_model=TaskCreateResponse)
-def sync_recent_updates(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def sync_recent_updates(background_tasks: BackgroundTasks, force: bool = False, db: Session = Depends(get_db)):
     """
     同步最近更新（异步任务模式，单例模式）
-    1. 获取所有已收藏的作者
+    1. 获取所有已收藏的作者，只保留到达检查时间的作者（force=true 时搜索所有作者）
     2. 对每个作者，找到收藏夹中最新的漫画的更新时间
     3. 搜索该作者，获取晚于该时间的所有漫画
     4. 保存新更新到RecentUpdate表
     5. 删除早于该时间的记录（仅从RecentUpdate表删除）
+    6. 记录检查时间，按作者发布频率调整下次检查时间
+    
+    上次任务被中断时，跳过中断前已处理的作者
     """
     # 使用单例管理器检查是否有正在运行的任务
     if recent_updates_singleton.is_running():
@@ -40,8 +56,11 @@ def sync_recent_updates(background_tasks: BackgroundTasks, db: Session = Depends
     # 创建任务
     task = TaskManager.create_task(db, task_type="sync_recent_updates")
     
+    # 上次任务中断时留下的检查点（从中断的位置继续）
+    checkpoint = TaskManager.take_checkpoint(db, "sync_recent_updates")
+    
     # 在后台执行同步任务
-    background_tasks.add_task(RecentUpdatesService.execute_sync_recent_updates_task, task.id, db)
+    background_tasks.add_task(RecentUpdatesService.execute_sync_recent_updates_task, task.id, db, force, checkpoint)
     
     return TaskCreateResponse(
         success=True,
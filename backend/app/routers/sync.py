@@ -54,8 +54,12 @@ def verify_files(db: Session = Depends(get_db)):
 
 
 @router.post("/sync", response_model=TaskCreateResponse)
-def sync_collection(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """同步收藏夹（异步任务模式，单例模式）"""
+def sync_collection(background_tasks: BackgroundTasks, full: bool = False, db: Session = Depends(get_db)):
+    """同步收藏夹（异步任务模式，单例模式）
+    
+    默认按分类增量同步（只爬取到上次同步的位置），full=true 时完整遍历所有分类
+    上次同步任务被中断时，跳过已完成的分类并从中断的页面继续
+    """
     # 使用单例管理器检查是否有正在运行的任务
     if sync_singleton.is_running():
         running_task_id = sync_singleton.get_running_task_id()
@@ -64,8 +68,11 @@ def sync_collection(background_tasks: BackgroundTasks, db: Session = Depends(get
     # 创建任务
     task = TaskManager.create_task(db, task_type="sync")
     
+    # 上次任务中断时留下的检查点（从中断的位置继续）
+    checkpoint = TaskManager.take_checkpoint(db, "sync")
+    
     # 在后台执行同步任务
-    background_tasks.add_task(SyncService.execute_sync_task, task.id, db)
+    background_tasks.add_task(SyncService.execute_sync_task, task.id, db, full, checkpoint)
     
     return TaskCreateResponse(
         success=True,
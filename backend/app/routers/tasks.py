@@ -6,9 +6,10 @@ from typing import Optional
 import asyncio
 import json
 from app.database import get_db
-from app.models import Task
-from app.schemas import TaskResponse, TaskCreateResponse
+from app.models import Task, TaskArchive
+from app.schemas import TaskResponse, TaskCreateResponse, TaskArchiveResponse
 from app.services.task_manager import TaskManager, sse_manager
+from app.services.task_retention import retention_scheduler
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/api", tags=["tasks"])
@@ -73,6 +74,40 @@ def cleanup_stale_tasks(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"清理任务失败: {str(e)}")
 
 
+@router.post("/tasks/compact")
+def compact_tasks():
+    """立即归档超过保留期的已完成/失败任务（按任务类型的保留天数，平时由后台定期执行）"""
+    try:
+        archived = retention_scheduler.run_once()
+        total = sum(archived.values())
+        return {
+            "success": True,
+            "message": f"已归档 {total} 个任务",
+            "archived": archived
+        }
+    except Exception as e:
+        logger.error(f"归档任务失败: {e}")
+        raise HTTPException(status_code=500, detail=f"归档任务失败: {str(e)}")
+
+
+@router.get("/task-archive", response_model=list[TaskArchiveResponse])
+def get_archived_tasks(
+    task_type: Optional[str] = None,
+    manga_id: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """查询已归档的任务"""
+    query = db.query(TaskArchive)
+    if task_type:
+        query = query.filter(TaskArchive.task_type == task_type)
+    if manga_id:
+        query = query.filter(TaskArchive.manga_id == manga_id)
+    
+    tasks = query.order_by(TaskArchive.created_at.desc()).limit(limit).all()
+    return [TaskArchiveResponse.model_validate(task) for task in tasks]
+
+
 @router.get("/events")
 async def stream_events():
     """
@@ -80,8 +115,8 @@ async def stream_events():
     用于实时推送任务状态更新
     """
     async def event_generator():
-        # 创建消息队列
-        queue = asyncio.Queue()
+        # 创建消息队列（有上限，由SSE管理器在事件循环中写入）
+        queue = sse_manager.create_queue()
         
         # 添加到SSE管理器
         await sse_manager.add_connection(queue)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 
 class MangaBase(BaseModel):
@@ -34,6 +34,8 @@ class MangaResponse(MangaBase):
     cover_image_path: Optional[str] = None
     preview_image_url: Optional[str] = None  # 前端期望的字段名
     is_favorited: bool = False  # 是否已收藏到网站
+    category: Optional[str] = None  # 分类（详情页）
+    uploader: Optional[str] = None  # 上传者（详情页）
     
     class Config:
         from_attributes = True
@@ -61,6 +63,8 @@ class MangaResponse(MangaBase):
                 'cover_image_path': getattr(obj, 'cover_image_path', None),
                 'preview_image_url': obj.cover_image_url,  # 使用cover_image_url作为预览图
                 'is_favorited': is_favorited,
+                'category': getattr(obj, 'category', None),
+                'uploader': getattr(obj, 'uploader', None),
             })
         except AttributeError:
             # 回退到直接构造
@@ -78,9 +82,45 @@ class MangaResponse(MangaBase):
                 cover_image_path=getattr(obj, 'cover_image_path', None),
                 preview_image_url=obj.cover_image_url,
                 is_favorited=is_favorited,
+                category=getattr(obj, 'category', None),
+                uploader=getattr(obj, 'uploader', None),
             )
 
 
+class FacetCount(BaseModel):
+    """筛选项统计"""
+    name: str
+    count: int
+
+
+class FacetsResponse(BaseModel):
+    """标签、分类、上传者统计"""
+    tags: List[FacetCount]
+    categories: List[FacetCount]
+    uploaders: List[FacetCount]
+
+
+class MangaSearchResult(MangaResponse):
+    """搜索结果（带相关度）"""
+    score: float = 0
+
+
+class MangaDetailsResponse(BaseModel):
+    """漫画详情（来自详情缓存）"""
+    manga_id: str
+    manga_url: str
+    title: Optional[str] = None
+    page_count: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    cover_image_url: Optional[str] = None
+    category: Optional[str] = None
+    tags: List[str] = []
+    uploader: Optional[str] = None
+    summary: Optional[str] = None
+    fetched_at: datetime
+    is_stale: bool = False  # 缓存是否已超过有效期
+
+
 class SyncResponse(BaseModel):
     success: bool
     message: str
@@ -124,6 +164,23 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class TaskArchiveResponse(BaseModel):
+    """归档任务响应"""
+    id: str
+    task_type: str
+    status: str
+    message: Optional[str] = None
+    error_message: Optional[str] = None
+    manga_id: Optional[str] = None
+    result_data: Optional[str] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    archived_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
 class TaskCreateResponse(BaseModel):
     """创建任务响应"""
     success: bool
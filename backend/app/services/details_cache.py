@@ -0,0 +1,117 @@
+"""漫画详情缓存服务 - 按 aid 缓存详情页解析结果"""
+import re
+import json
+from typing import Optional, Dict, Callable
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.models import MangaDetailsCache
+from app.config import settings
+from app.utils.logger import logger, get_error_message
+
+# 从漫画URL中提取 aid（例如 photos-index-aid-12345.html）
+AID_PATTERN = re.compile(r'aid-(\d+)')
+
+
+class DetailsCacheService:
+    """漫画详情缓存服务类
+    
+    缓存以 aid 为键，不同镜像的同一漫画共用一条缓存。
+    超过 details_cache_ttl_hours 的缓存视为过期，读取时重新抓取。
+    """
+    
+    @staticmethod
+    def extract_aid(manga_url: str) -> Optional[str]:
+        """从漫画URL中提取 aid"""
+        match = AID_PATTERN.search(manga_url or "")
+        return match.group(1) if match else None
+    
+    @staticmethod
+    def to_dict(entry: MangaDetailsCache) -> Dict:
+        """缓存记录转换为详情字典（与 parse_manga_details 的返回格式一致）"""
+        try:
+            tags = json.loads(entry.tags) if entry.tags else []
+        except (TypeError, ValueError):
+            tags = []
+        return {
+            'title': entry.title,
+            'manga_url': entry.manga_url,
+            'page_count': entry.page_count,
+            'updated_at': entry.updated_at,
+            'cover_image_url': entry.cover_image_url,
+            'category': entry.category,
+            'tags': tags,
+            'uploader': entry.uploader,
+            'summary': entry.summary
+        }
+    
+    @staticmethod
+    def is_fresh(entry: Optional[MangaDetailsCache]) -> bool:
+        """缓存是否在有效期内"""
+        if entry is None or entry.fetched_at is None:
+            return False
+        return datetime.now() - entry.fetched_at < timedelta(hours=settings.details_cache_ttl_hours)
+    
+    @staticmethod
+    def get_entry(db: Session, manga_url: str) -> Optional[MangaDetailsCache]:
+        """获取缓存记录（不检查是否过期）"""
+        aid = DetailsCacheService.extract_aid(manga_url)
+        if not aid:
+            return None
+        return db.query(MangaDetailsCache).filter(MangaDetailsCache.aid == aid).first()
+    
+    @staticmethod
+    def get(db: Session, manga_url: str) -> Optional[Dict]:
+        """获取未过期的缓存详情，没有或已过期返回None"""
+        entry = DetailsCacheService.get_entry(db, manga_url)
+        if not DetailsCacheService.is_fresh(entry):
+            return None
+        return DetailsCacheService.to_dict(entry)
+    
+    @staticmethod
+    def put(db: Session, manga_url: str, details: Dict, commit: bool = True):
+        """写入缓存（commit为False时由调用方批量提交）"""
+        aid = DetailsCacheService.extract_aid(manga_url)
+        if not aid or not details:
+            return
+        
+        entry = db.query(MangaDetailsCache).filter(MangaDetailsCache.aid == aid).first()
+        if entry is None:
+            entry = MangaDetailsCache(aid=aid)
+            db.add(entry)
+        
+        entry.manga_url = manga_url
+        entry.title = details.get('title')
+        entry.page_count = details.get('page_count')
+        entry.updated_at = details.get('updated_at')
+        entry.cover_image_url = details.get('cover_image_url')
+        entry.category = details.get('category')
+        entry.tags = json.dumps(details.get('tags') or [], ensure_ascii=False)
+        entry.uploader = details.get('uploader')
+        entry.summary = details.get('summary')
+        entry.fetched_at = datetime.now()
+        
+        if commit:
+            db.commit()
+    
+    @staticmethod
+    def get_or_fetch(db: Session, manga_url: str, fetch: Callable[[str], Optional[Dict]]) -> Optional[Dict]:
+        """读取缓存，没有或已过期时调用 fetch 抓取并写入缓存
+        
+        抓取失败时返回过期的缓存（如果有）
+        """
+        entry = DetailsCacheService.get_entry(db, manga_url)
+        if DetailsCacheService.is_fresh(entry):
+            logger.debug(f"使用缓存的漫画详情: {manga_url}")
+            return DetailsCacheService.to_dict(entry)
+        
+        try:
+            details = fetch(manga_url)
+        except Exception as e:
+            logger.warning(f"获取漫画详情失败: {get_error_message(e)}")
+            details = None
+        
+        if details:
+            DetailsCacheService.put(db, manga_url, details)
+            return details
+        
+        return DetailsCacheService.to_dict(entry) if entry is not None else None
@@ -3,8 +3,9 @@ import os
 import requests
 import zipfile
 import time
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
@@ -12,8 +13,12 @@ from app.models import Manga
 from app.crawler.base import MangaCrawler
 from app.config import settings
 from app.utils.logger import logger, get_error_message
-from app.services.task_manager import TaskManager
+from app.services.task_manager import TaskManager, ProgressTracker
 from app.services.download_queue import download_queue_manager
+from app.services.image_hosts import image_host_scorer
+from app.services.details_cache import DetailsCacheService
+from app.services.tag_service import TagService
+from app.utils.pipeline import iter_in_background
 
 # 可选的PIL导入
 try:
@@ -34,38 +39,55 @@ class MangaDownloader:
         self.cover_dir.mkdir(parents=True, exist_ok=True)
     
     def download_image(self, url: str, save_path: Path) -> bool:
-        """下载单张图片"""
+        """下载单张图片（优先使用评分最高的等价图片服务器，失败时回退到原始地址）"""
+        target_url = image_host_scorer.select(url)
+        if self._fetch_image(target_url, save_path):
+            return True
+        
+        if target_url != url:
+            logger.debug(f"等价服务器下载失败，回退到原始地址: {url}")
+            return self._fetch_image(url, save_path)
+        return False
+    
+    def _fetch_image(self, url: str, save_path: Path) -> bool:
+        """请求并保存图片，同时记录服务器的吞吐量和错误率"""
+        start = time.monotonic()
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             response = requests.get(url, headers=headers, timeout=30)
             response.raise_for_status()
+            content = response.content
+            image_host_scorer.record(url, True, len(content), time.monotonic() - start)
             
             # 确保目录存在
             save_path.parent.mkdir(parents=True, exist_ok=True)
             
             # 保存图片
             with open(save_path, 'wb') as f:
-                f.write(response.content)
+                f.write(content)
             
             return True
         except Exception as e:
+            image_host_scorer.record(url, False)
             logger.error(f"下载图片失败 {url}: {e}")
             return False
     
-    def download_manga_stream(self, manga_title: str, images: List[Dict], 
+    def download_manga_stream(self, manga_title: str, images: Iterable[Dict], 
                              author: str = "", resume: bool = True, progress_callback=None,
-                             manga_metadata: Optional[Dict] = None):
+                             manga_metadata: Optional[Dict] = None, total: Optional[int] = None):
         """
         下载漫画（生成器版本）- 支持断点续传和实时保存
         
         Args:
             manga_title: 漫画标题
-            images: 图片列表 [{'url': ..., 'filename': ..., 'index': ...}]
+            images: 图片列表或可迭代对象 [{'url': ..., 'filename': ..., 'index': ...}]
+                    可以是边扫描边产出的生成器，下载会在图片列表完整之前开始
             author: 作者名称（用于创建分类文件夹）
             resume: 是否断点续传（检查已下载的文件）
             progress_callback: 进度回调函数 callback(downloaded_count, total_count, status_message)
+            total: 预计图片总数（images 为生成器时用于显示进度，未知时为None）
         
         Yields:
             dict: 进度信息 {'index', 'total', 'filename', 'status', 'message'}
@@ -84,11 +106,16 @@ class MangaDownloader:
         temp_dir.mkdir(parents=True, exist_ok=True)
         
         downloaded_count = 0
+        image_count = 0  # 实际获取到的图片数量
         cover_path = None
+        if total is None and isinstance(images, list):
+            total = len(images)
+        total_label = total or '?'
         
         try:
             # 边下载边保存，每张图片立即写入磁盘
             for img_info in images:
+                image_count += 1
                 img_url = img_info['url']
                 filename = img_info['filename']
                 img_index = img_info.get('index', 0)
@@ -97,11 +124,11 @@ class MangaDownloader:
                 # 🔥 断点续传：检查文件是否已存在
                 if resume and file_path.exists() and file_path.stat().st_size > 0:
                     downloaded_count += 1
-                    logger.debug(f"  [{img_index}/{len(images)}] ⏭️  跳过（已存在）: {filename}")
+                    logger.debug(f"  [{img_index}/{total_label}] ⏭️  跳过（已存在）: {filename}")
                     
                     yield {
                         'index': img_index,
-                        'total': len(images),
+                        'total': total,
                         'filename': filename,
                         'status': 'skipped',
                         'message': f'跳过已下载: {filename}'
@@ -118,15 +145,15 @@ class MangaDownloader:
                     continue
                 
                 # 下载图片
-                logger.debug(f"  [{img_index}/{len(images)}] ⬇️  下载: {filename}")
+                logger.debug(f"  [{img_index}/{total_label}] ⬇️  下载: {filename}")
                 
                 if self.download_image(img_url, file_path):
                     downloaded_count += 1
-                    logger.debug(f"  [{img_index}/{len(images)}] ✅ 完成: {filename}")
+                    logger.debug(f"  [{img_index}/{total_label}] ✅ 完成: {filename}")
                     
                     yield {
                         'index': img_index,
-                        'total': len(images),
+                        'total': total,
                         'filename': filename,
                         'status': 'success',
                         'message': f'下载成功: {filename}',
@@ -142,18 +169,26 @@ class MangaDownloader:
                     
                     # 调用进度回调
                     if progress_callback:
-                        progress_callback(downloaded_count, len(images), f"已下载 {downloaded_count}/{len(images)}")
+                        progress_callback(downloaded_count, total, f"已下载 {downloaded_count}/{total_label}")
                 else:
-                    logger.error(f"  [{img_index}/{len(images)}] ❌ 失败: {filename}")
+                    logger.error(f"  [{img_index}/{total_label}] ❌ 失败: {filename}")
                     
                     yield {
                         'index': img_index,
-                        'total': len(images),
+                        'total': total,
                         'filename': filename,
                         'status': 'failed',
                         'message': f'下载失败: {filename}'
                     }
             
+            # 没有获取到任何图片时不打包（避免把上次残留的文件打包）
+            if image_count == 0:
+                yield {
+                    'status': 'error',
+                    'message': '无法获取图片列表'
+                }
+                return
+            
             # 所有图片下载完成，打包CBZ
             logger.info(f"开始打包 CBZ 文件...")
             # CBZ文件保存在作者文件夹下
@@ -230,7 +265,7 @@ class MangaDownloader:
                     comic_info_xml = generate_comic_info_xml(
                         title=manga_title,
                         author=author,
-                        page_count=len(images),
+                        page_count=image_count,
                         updated_at=updated_at,
                         manga_url=manga_url,
                         is_manga=True,  # 默认是漫画，从右到左阅读
@@ -256,7 +291,8 @@ class MangaDownloader:
                 'cbz_path': str(cbz_path),
                 'cover_path': str(cover_path) if cover_path else None,
                 'file_size': file_size,
-                'downloaded_count': downloaded_count
+                'downloaded_count': downloaded_count,
+                'image_count': image_count
             }
             
             # 清理临时目录
@@ -372,6 +408,7 @@ class DownloadService:
             
             crawler = MangaCrawler()
             downloader = MangaDownloader()
+            images = None
             
             try:
                 # 登录
@@ -384,43 +421,47 @@ class DownloadService:
                 manga.downloaded_pages = manga.downloaded_pages or 0
                 db.commit()
                 
-                # 获取漫画详情
-                details = None
-                if not manga.page_count or not manga.cover_image_url:
-                    TaskManager.update_task(db, task_id, message="获取漫画详情...")
-                    details = crawler.get_manga_details(manga.manga_url)
-                    if details:
-                        if details.get('page_count'):
-                            manga.page_count = details['page_count']
-                        if details.get('updated_at'):
-                            manga.updated_at = details['updated_at']
-                        if details.get('cover_image_url'):
-                            manga.cover_image_url = details['cover_image_url']
-                        db.commit()
-                else:
-                    # 即使已有基本信息，也获取完整详情以用于 ComicInfo.xml
-                    TaskManager.update_task(db, task_id, message="获取漫画详情...")
-                    details = crawler.get_manga_details(manga.manga_url)
+                # 获取漫画详情（用于 ComicInfo.xml），优先使用缓存，缓存过期时才访问详情页
+                TaskManager.update_task(db, task_id, message="获取漫画详情...")
+                details = DetailsCacheService.get_or_fetch(db, manga.manga_url, crawler.get_manga_details)
+                if details and (not manga.page_count or not manga.cover_image_url):
+                    if details.get('page_count'):
+                        manga.page_count = details['page_count']
+                    if details.get('updated_at'):
+                        manga.updated_at = details['updated_at']
+                    if details.get('cover_image_url'):
+                        manga.cover_image_url = details['cover_image_url']
+                    db.commit()
+                if details:
+                    # 保存标签、分类和上传者
+                    TagService.save_metadata(db, {manga.manga_url: details})
+                    db.commit()
                 
-                # 获取图片列表
+                # 获取图片列表：发现和下载流水线并行
+                # 图片地址在后台线程中边扫描边产出，经有界队列交给下载，前几张图片在扫描完成前就开始下载
                 TaskManager.update_task(db, task_id, message="获取图片列表...")
-                images = crawler.get_manga_images(manga.manga_url)
-                
-                if not images:
-                    manga.download_status = "failed"
-                    db.commit()
-                    TaskManager.update_task(db, task_id, status="failed", error_message="无法获取图片列表")
-                    return
+                expected_count = (details or {}).get('page_count') or manga.page_count
+                # 发现线程在每次使用浏览器前检查停止事件，关闭流水线时等待它真正退出后才关闭浏览器
+                discovery_stop = threading.Event()
+                images = iter_in_background(
+                    crawler.get_manga_images(manga.manga_url, expected_count, stop_event=discovery_stop),
+                    maxsize=settings.image_pipeline_queue_size,
+                    name="image-discovery",
+                    stop_event=discovery_stop
+                )
                 
-                total_images = len(images)
+                total_images = expected_count or 0
                 TaskManager.update_task(
                     db, task_id,
-                    total_items=total_images,
-                    message=f"开始下载 {total_images} 张图片..."
+                    total_items=expected_count,
+                    message=f"开始下载 {expected_count} 张图片..." if expected_count else "开始下载图片..."
                 )
                 
                 cbz_path = None
                 cover_path = None
+                downloaded_count = 0  # 续传时所有图片都已存在则不会有下载进度事件
+                # 每页的进度立即推送，数据库按间隔合并写入（已下载页数随进度一起提交）
+                tracker = ProgressTracker(db, task_id, "download")
                 
                 # 准备元数据（用于 ComicInfo.xml）
                 manga_metadata = details if details else {}
@@ -432,7 +473,8 @@ class DownloadService:
                     manga.title, images, 
                     author=manga.author, 
                     resume=True,
-                    manga_metadata=manga_metadata
+                    manga_metadata=manga_metadata,
+                    total=expected_count
                 ):
                     status = progress.get('status')
                     
@@ -440,15 +482,14 @@ class DownloadService:
                     if 'downloaded_count' in progress:
                         downloaded_count = progress['downloaded_count']
                         manga.downloaded_pages = downloaded_count
-                        db.commit()
                         
-                        # 更新任务进度
-                        progress_percent = int((downloaded_count / total_images) * 90)  # 90%用于下载，10%用于打包
-                        TaskManager.update_task(
-                            db, task_id,
+                        # 更新任务进度（图片总数未知时按已下载数量估算）
+                        progress_total = max(total_images, progress.get('index') or 0, downloaded_count, 1)
+                        progress_percent = int((downloaded_count / progress_total) * 90)  # 90%用于下载，10%用于打包
+                        tracker.update(
                             progress=progress_percent,
                             completed_items=downloaded_count,
-                            message=f"已下载 {downloaded_count}/{total_images} 张图片"
+                            message=f"已下载 {downloaded_count}/{total_images or '?'} 张图片"
                         )
                     
                     # 下载完成
@@ -464,12 +505,11 @@ class DownloadService:
                         manga.cbz_file_path = cbz_path
                         manga.cover_image_path = cover_path
                         manga.file_size = file_size
-                        manga.downloaded_pages = total_images
+                        manga.downloaded_pages = progress.get('image_count', downloaded_count)
                         db.commit()
                         
-                        TaskManager.update_task(
-                            db, task_id,
-                            status="completed",
+                        tracker.finish(
+                            "completed",
                             progress=100,
                             message=f"下载完成: {manga.title}",
                             result_data=f'{{"file_path": "{cbz_path}", "file_size": {file_size}}}'
@@ -481,11 +521,7 @@ class DownloadService:
                     elif status == 'error':
                         manga.download_status = "failed"
                         db.commit()
-                        TaskManager.update_task(
-                            db, task_id,
-                            status="failed",
-                            error_message=progress.get('message', '下载失败')
-                        )
+                        tracker.finish("failed", error_message=progress.get('message', '下载失败'))
                         return
                 
                 if not cbz_path:
@@ -499,6 +535,9 @@ class DownloadService:
                 db.commit()
                 TaskManager.update_task(db, task_id, status="failed", error_message=str(e))
             finally:
+                # 先停止图片发现线程（等待其退出），再关闭浏览器
+                if images is not None:
+                    images.close()
                 crawler.close()
         finally:
             if db:
@@ -0,0 +1,141 @@
+"""图片服务器评分模块 - 根据真实下载记录选择最快的等价图片服务器"""
+import re
+import time
+from typing import Dict, Optional, Set
+from urllib.parse import urlparse
+from threading import Lock
+from app.config import settings
+from app.utils.logger import logger
+
+# 图片服务器主机名格式：img1.wnimg.ru、img4.qy0.ru 等（同一域名下的编号服务器提供相同路径）
+IMAGE_HOST_PATTERN = re.compile(r'^img\d*\.(.+)$')
+
+# 指数加权平均的平滑系数（越大越偏向最近的下载）
+EWMA_ALPHA = 0.3
+
+
+class HostStats:
+    """单个图片服务器的统计信息"""
+    
+    def __init__(self):
+        self.throughput = 0.0  # 吞吐量（字节/秒，指数加权平均）
+        self.error_rate = 0.0  # 错误率（0~1，指数加权平均）
+        self.samples = 0  # 下载次数
+        self.last_sample = 0.0  # 最近一次下载完成的时间
+        self.last_explored = 0.0  # 最近一次被安排探测的时间
+    
+    @property
+    def score(self) -> float:
+        """评分：吞吐量按错误率折算"""
+        return self.throughput * (1.0 - self.error_rate)
+    
+    def record(self, ok: bool, throughput: float = 0.0):
+        """记录一次下载结果"""
+        if self.samples == 0:
+            self.error_rate = 0.0 if ok else 1.0
+            self.throughput = throughput if ok else 0.0
+        else:
+            self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+            if ok:
+                self.throughput = (1 - EWMA_ALPHA) * self.throughput + EWMA_ALPHA * throughput
+        self.samples += 1
+        self.last_sample = time.monotonic()
+
+
+class ImageHostScorer:
+    """图片服务器评分器（单例）
+    
+    - 按下载结果记录每个服务器的吞吐量和错误率
+    - 同一组的等价服务器（同域名下的 imgN 服务器，或配置为等价的域名）提供相同路径，
+      下载时把URL改写到当前评分最高的服务器
+    - 样本不足或超过 image_host_reevaluate_interval 秒未使用的服务器会被安排一次探测，定期重新评估
+    """
+    
+    _instance = None
+    _lock = Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(ImageHostScorer, cls).__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self._state_lock = Lock()
+        self._stats: Dict[str, HostStats] = {}
+        self._groups: Dict[str, Set[str]] = {}  # 分组 -> 已见过的服务器
+        self._initialized = True
+    
+    @staticmethod
+    def _group_of(host: str) -> Optional[str]:
+        """获取服务器所属的等价分组，不属于任何分组返回None"""
+        match = IMAGE_HOST_PATTERN.match(host or "")
+        if not match:
+            return None
+        domain = match.group(1)
+        # 配置为等价的域名合并为同一分组
+        if domain in settings.image_host_equivalent_domains:
+            return "|".join(settings.image_host_equivalent_domains)
+        return domain
+    
+    def _needs_sample(self, stats: HostStats, now: float) -> bool:
+        """是否需要（重新）探测该服务器"""
+        if stats.samples >= settings.image_host_min_samples and now - stats.last_sample < settings.image_host_reevaluate_interval:
+            return False
+        # 同一时间只安排一次探测，等待结果返回
+        return now - stats.last_explored >= settings.image_host_reevaluate_interval / 10
+    
+    def select(self, url: str) -> str:
+        """选择下载该图片使用的URL（可能改写到更快的等价服务器）"""
+        if not settings.image_host_selection:
+            return url
+        
+        parsed = urlparse(url)
+        host = parsed.netloc
+        group = self._group_of(host)
+        if not group:
+            return url
+        
+        now = time.monotonic()
+        with self._state_lock:
+            hosts = self._groups.setdefault(group, set())
+            hosts.add(host)
+            for candidate in hosts:
+                self._stats.setdefault(candidate, HostStats())
+            
+            if len(hosts) < 2:
+                return url
+            
+            # 优先安排需要重新评估的服务器（原始服务器优先），否则选择评分最高的
+            ordered = sorted(hosts, key=lambda h: (h != host, h))
+            chosen = next((h for h in ordered if self._needs_sample(self._stats[h], now)), None)
+            if chosen:
+                self._stats[chosen].last_explored = now
+            else:
+                chosen = max(ordered, key=lambda h: self._stats[h].score)
+        
+        if chosen == host:
+            return url
+        return parsed._replace(netloc=chosen).geturl()
+    
+    def record(self, url: str, ok: bool, size: int = 0, elapsed: float = 0.0):
+        """记录一次真实下载的结果"""
+        host = urlparse(url).netloc
+        if not self._group_of(host):
+            return
+        
+        throughput = size / elapsed if ok and elapsed > 0 else 0.0
+        with self._state_lock:
+            self._stats.setdefault(host, HostStats()).record(ok, throughput)
+        
+        if not ok:
+            logger.debug(f"图片服务器下载失败: {host}")
+
+
+# 全局图片服务器评分器实例
+image_host_scorer = ImageHostScorer()
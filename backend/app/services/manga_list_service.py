@@ -0,0 +1,149 @@
+"""漫画列表查询服务 - 游标分页、服务端筛选、只查询列表需要的列"""
+import json
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session
+from app.models import Manga, Tag, MangaTag
+
+# 列表需要的列（不加载整个ORM对象）
+LIST_COLUMNS = (
+    Manga.id, Manga.title, Manga.author, Manga.manga_url, Manga.file_size, Manga.page_count,
+    Manga.updated_at, Manga.is_downloaded, Manga.downloaded_at, Manga.cover_image_url,
+    Manga.cover_image_path, Manga.is_favorited, Manga.category, Manga.uploader
+)
+
+# 支持的排序方式
+SORT_AUTHOR = "author"  # 作者、标题（升序）
+SORT_UPDATED = "updated_at"  # 更新日期（降序，没有日期的排在最后）
+SORT_OPTIONS = (SORT_AUTHOR, SORT_UPDATED)
+
+
+class MangaListService:
+    """漫画列表查询服务类"""
+    
+    @staticmethod
+    def row_to_item(row) -> Dict:
+        """将 LIST_COLUMNS 查询行转换为响应字典（与 MangaResponse 字段一致）"""
+        item = dict(row._mapping)
+        item['is_downloaded'] = item['is_downloaded'] or False
+        item['is_favorited'] = item['is_favorited'] or False
+        item['preview_image_url'] = item['cover_image_url']  # 使用cover_image_url作为预览图
+        return item
+    
+    @staticmethod
+    def encode_cursor(values: List) -> str:
+        """将最后一行的排序键编码为游标"""
+        raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str, sort: str) -> List:
+        """解码游标，格式错误时抛出 ValueError"""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except Exception:
+            raise ValueError("无效的游标")
+        
+        expected = 3 if sort == SORT_AUTHOR else 2
+        if not isinstance(values, list) or len(values) != expected:
+            raise ValueError("无效的游标")
+        if sort == SORT_UPDATED and values[0] is not None:
+            values[0] = datetime.fromisoformat(values[0])
+        return values
+    
+    @staticmethod
+    def _filtered_query(db: Session, columns, author: Optional[str], download_status: Optional[str],
+                        is_downloaded: Optional[bool], is_favorited: Optional[bool], q: Optional[str],
+                        tag: Optional[str], category: Optional[str], uploader: Optional[str]):
+        """应用筛选条件"""
+        query = db.query(*columns)
+        if author:
+            query = query.filter(Manga.author == author)
+        if download_status:
+            query = query.filter(Manga.download_status == download_status)
+        if is_downloaded is not None:
+            query = query.filter(Manga.is_downloaded == is_downloaded)
+        if is_favorited is not None:
+            query = query.filter(Manga.is_favorited == is_favorited)
+        if q:
+            pattern = f"%{q}%"
+            query = query.filter(or_(Manga.title.ilike(pattern), Manga.author.ilike(pattern)))
+        if tag:
+            tagged = db.query(MangaTag.manga_id).join(Tag, Tag.id == MangaTag.tag_id).filter(Tag.name == tag)
+            query = query.filter(Manga.id.in_(tagged))
+        if category:
+            query = query.filter(Manga.category == category)
+        if uploader:
+            query = query.filter(Manga.uploader == uploader)
+        return query
+    
+    @staticmethod
+    def _after_cursor(sort: str, values: List):
+        """游标之后的行（与排序顺序一致的键集条件）"""
+        if sort == SORT_AUTHOR:
+            author, title, manga_id = values
+            return or_(
+                Manga.author > author,
+                and_(Manga.author == author, Manga.title > title),
+                and_(Manga.author == author, Manga.title == title, Manga.id > manga_id)
+            )
+        
+        updated_at, manga_id = values
+        if updated_at is None:
+            # 已经翻到没有日期的部分
+            return and_(Manga.updated_at.is_(None), Manga.id < manga_id)
+        return or_(
+            Manga.updated_at < updated_at,
+            and_(Manga.updated_at == updated_at, Manga.id < manga_id),
+            Manga.updated_at.is_(None)
+        )
+    
+    @staticmethod
+    def list_mangas(db: Session, sort: str = SORT_AUTHOR, limit: Optional[int] = None, cursor: Optional[str] = None,
+                    author: Optional[str] = None, download_status: Optional[str] = None,
+                    is_downloaded: Optional[bool] = None, is_favorited: Optional[bool] = None,
+                    q: Optional[str] = None, tag: Optional[str] = None, category: Optional[str] = None,
+                    uploader: Optional[str] = None) -> Tuple[List[Dict], Optional[str], int]:
+        """
+        查询漫画列表
+        
+        Args:
+            sort: 排序方式（author / updated_at）
+            limit: 每页数量，为None时返回全部
+            cursor: 上一页返回的游标
+        
+        Returns:
+            tuple: (漫画列表, 下一页游标（没有更多时为None）, 符合条件的总数)
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"不支持的排序方式: {sort}")
+        
+        filters = (author, download_status, is_downloaded, is_favorited, q, tag, category, uploader)
+        query = MangaListService._filtered_query(db, LIST_COLUMNS, *filters)
+        
+        if cursor:
+            query = query.filter(MangaListService._after_cursor(sort, MangaListService.decode_cursor(cursor, sort)))
+        
+        if sort == SORT_AUTHOR:
+            query = query.order_by(Manga.author, Manga.title, Manga.id)
+        else:
+            query = query.order_by(Manga.updated_at.desc().nulls_last(), Manga.id.desc())
+        
+        # 多取一行，判断是否还有下一页
+        rows = query.limit(limit + 1).all() if limit else query.all()
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            key = [last.author, last.title, last.id] if sort == SORT_AUTHOR else [last.updated_at, last.id]
+            next_cursor = MangaListService.encode_cursor(key)
+        
+        # 分页时单独统计总数（只查询数量），不分页时就是返回的行数
+        if limit or cursor:
+            total = MangaListService._filtered_query(db, (func.count(Manga.id),), *filters).scalar() or 0
+        else:
+            total = len(rows)
+        
+        return [MangaListService.row_to_item(row) for row in rows], next_cursor, total
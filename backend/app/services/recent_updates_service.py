@@ -1,26 +1,144 @@
 """最近更新业务服务"""
+from sqlalchemy import func, and_, or_
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.database import SessionLocal
-from app.models import Manga, RecentUpdate
+from app.models import Manga, RecentUpdate, AuthorWatch
 from app.crawler.base import MangaCrawler
+from app.crawler.parser import manga_key
 from app.config import settings
 from app.utils.logger import logger, get_error_message
 from app.services.task_manager import TaskManager
 from app.services.recent_updates_singleton import recent_updates_singleton
+from app.utils.bulk import bulk_upsert
 
 
 class RecentUpdatesService:
     """最近更新业务服务类"""
     
     @staticmethod
-    def execute_sync_recent_updates_task(task_id: str, db: Session = None):
-        """执行同步最近更新任务（后台任务）"""
+    def save_author_updates(db: Session, author: str, new_mangas: List[Dict]) -> int:
+        """
+        批量写入作者的搜索结果（不提交），已存在的记录（按manga_url）更新标题、日期、页数和封面
+        
+        Returns:
+            写入的记录数
+        """
+        if not new_mangas:
+            logger.info(f"  作者 {author} 没有找到新更新")
+            return 0
+        
+        logger.info(f"  作者 {author} 找到 {len(new_mangas)} 个新更新")
+        
+        # 镜像切换后同一漫画的主机名不同：沿用已保存的URL（最近更新优先，其次收藏的漫画），
+        # 避免按 manga_url 合并时重复插入，也保证与 Manga 表按URL关联
+        stored_urls = {}
+        for model in (Manga, RecentUpdate):
+            for (url,) in db.query(model.manga_url).filter(model.author == author).all():
+                stored_urls[manga_key(url)] = url
+        
+        # 同一批中URL不能重复
+        rows = {}
+        for manga_data in new_mangas:
+            manga_url = stored_urls.get(manga_key(manga_data['manga_url']), manga_data['manga_url'])
+            rows[manga_url] = {
+                'title': manga_data['title'],
+                'author': manga_data['author'],
+                'manga_url': manga_url,
+                'updated_at': manga_data['updated_at'],
+                'page_count': manga_data.get('page_count'),
+                'cover_image_url': manga_data.get('cover_image_url')
+            }
+        return bulk_upsert(db, RecentUpdate, list(rows.values()), 'manga_url',
+                           ['title', 'updated_at', 'page_count', 'cover_image_url'])
+    
+    @staticmethod
+    def delete_stale_updates(db: Session, cutoffs: Dict[str, datetime]) -> int:
+        """
+        删除各作者早于截止日期的记录（一条语句，提交）
+        
+        Args:
+            cutoffs: {作者: 截止日期}
+        """
+        if not cutoffs:
+            return 0
+        
+        deleted_count = db.query(RecentUpdate).filter(or_(*[
+            and_(RecentUpdate.author == author, RecentUpdate.updated_at < since_date)
+            for author, since_date in cutoffs.items()
+        ])).delete(synchronize_session=False)
+        db.commit()
+        
+        if deleted_count > 0:
+            logger.info(f"删除了 {deleted_count} 条旧记录（{len(cutoffs)} 个作者）")
+        return deleted_count
+    
+    @staticmethod
+    def update_author_watch(db: Session, watch: Optional[AuthorWatch], author: str,
+                            new_mangas: List[Dict]) -> AuthorWatch:
+        """
+        记录作者的检查结果，并调整检查间隔
+        
+        有新作品时间隔减半（不低于 author_watch_min_interval_hours），
+        没有新作品时间隔延长一半（不超过 author_watch_max_interval_hours）。
+        搜索的停止日期回退了一天，上次看到的最新作品和收藏之外的较新作品每次都会再出现，
+        因此只有晚于上次记录的最新作品、且不是同一漫画的结果才算新作品。
+        """
+        if watch is None:
+            watch = AuthorWatch(author=author)
+            db.add(watch)
+        
+        newest_key = manga_key(watch.newest_manga_url)
+        fresh_count = sum(
+            1 for manga in new_mangas
+            if manga_key(manga['manga_url']) != newest_key
+            and (not watch.newest_updated_at or manga['updated_at'] > watch.newest_updated_at)
+        )
+        
+        interval = watch.check_interval_hours or settings.author_watch_initial_interval_hours
+        if fresh_count:
+            interval = max(settings.author_watch_min_interval_hours, interval / 2)
+        elif watch.last_checked_at:
+            interval = min(settings.author_watch_max_interval_hours, interval * 1.5)
+        
+        if new_mangas:
+            # 搜索结果按创建时间倒序，第一个即最新
+            newest = new_mangas[0]
+            if not watch.newest_updated_at or newest['updated_at'] >= watch.newest_updated_at:
+                watch.newest_manga_url = newest['manga_url']
+                watch.newest_updated_at = newest['updated_at']
+        
+        now = datetime.now()
+        watch.check_interval_hours = interval
+        watch.last_checked_at = now
+        watch.next_check_at = now + timedelta(hours=interval)
+        db.commit()
+        return watch
+    
+    @staticmethod
+    def execute_sync_recent_updates_task(task_id: str, db: Session = None, force: bool = False,
+                                         checkpoint: Optional[Dict] = None):
+        """执行同步最近更新任务（后台任务）
+        
+        Args:
+            task_id: 任务ID
+            db: 数据库会话
+            force: 是否忽略检查间隔，搜索所有作者
+            checkpoint: 中断任务的检查点，跳过中断前已处理的作者
+        """
         if not db:
             db = SessionLocal()
         
         try:
+            # 先把检查点转存到当前任务，即使本次任务没能执行，下次仍可恢复
+            checkpoint = checkpoint or {}
+            force = force or bool(checkpoint.get('force'))
+            completed_authors = list(checkpoint.get('completed_authors') or [])
+            if checkpoint:
+                TaskManager.save_checkpoint(db, task_id, checkpoint)
+            
             # 使用单例管理器检查并启动任务
             if not recent_updates_singleton.start_task(task_id):
                 TaskManager.update_task(db, task_id, status="failed", error_message="已有同步最近更新任务正在运行")
@@ -36,117 +154,125 @@ class RecentUpdatesService:
             excluded_categories = settings.excluded_categories
             author_list = [author for author in author_list if author not in excluded_categories]
             
+            # 从检查点恢复：跳过中断前已处理的作者
+            if completed_authors:
+                done = set(completed_authors)
+                author_list = [author for author in author_list if author not in done]
+                logger.info(f"从检查点恢复：跳过 {len(done)} 个已处理的作者")
+            
             if not author_list:
+                TaskManager.save_checkpoint(db, task_id, None, commit=False)
                 TaskManager.update_task(db, task_id, status="completed", message="没有找到已收藏的作者（已排除自定义分类）", progress=100)
                 return
             
+            # 只搜索到期的作者（从未检查过，或已超过检查间隔）
+            now = datetime.now()
+            watches = {watch.author: watch for watch in db.query(AuthorWatch).filter(AuthorWatch.author.in_(author_list)).all()}
+            skipped_authors = 0
+            if not force:
+                due_authors = [
+                    author for author in author_list
+                    if author not in watches or not watches[author].next_check_at or watches[author].next_check_at <= now
+                ]
+                skipped_authors = len(author_list) - len(due_authors)
+                author_list = due_authors
+            
+            if not author_list:
+                TaskManager.save_checkpoint(db, task_id, None, commit=False)
+                TaskManager.update_task(
+                    db, task_id, status="completed", progress=100,
+                    message=f"所有作者都在检查间隔内，无需搜索（跳过 {skipped_authors} 个作者）"
+                )
+                return
+            
             total_authors = len(author_list)
-            TaskManager.update_task(db, task_id, total_items=total_authors, message=f"找到 {total_authors} 个已收藏的作者，开始搜索更新...")
+            TaskManager.update_task(
+                db, task_id, total_items=total_authors,
+                message=f"找到 {total_authors} 个需要检查的作者（跳过 {skipped_authors} 个未到期的作者），开始搜索更新..."
+            )
             
-            # 获取每个作者收藏夹中最新的漫画的更新日期
-            author_latest_dates = {}
+            # 获取每个作者收藏夹中最新的漫画的更新日期（一次 GROUP BY 查询）
+            latest_dates = dict(
+                db.query(Manga.author, func.max(Manga.updated_at))
+                .filter(Manga.author.in_(author_list))
+                .group_by(Manga.author)
+                .all()
+            )
+            author_latest_dates = {
+                author: latest_dates.get(author) or datetime(2000, 1, 1)
+                for author in author_list
+            }
+            
+            # 搜索的停止日期：上次看到的最新作品之前的结果已经保存过，无需再翻页
+            # （日期只精确到天，回退一天以免漏掉同一天发布的作品）
+            author_stop_dates = {}
             for author in author_list:
-                latest_manga = db.query(Manga).filter(
-                    Manga.author == author
-                ).order_by(Manga.updated_at.desc()).first()
-                
-                if latest_manga and latest_manga.updated_at:
-                    author_latest_dates[author] = latest_manga.updated_at
-                else:
-                    author_latest_dates[author] = datetime(2000, 1, 1)
+                stop_date = author_latest_dates[author]
+                watch = watches.get(author)
+                if watch and watch.newest_updated_at:
+                    stop_date = max(stop_date, watch.newest_updated_at - timedelta(days=1))
+                author_stop_dates[author] = stop_date
             
             # 初始化爬虫
             crawler = MangaCrawler()
             if not crawler.login(settings.manga_username, settings.manga_password):
+                crawler.close()
                 TaskManager.update_task(db, task_id, status="failed", error_message="登录失败")
                 return
             
             total_added = 0
-            total_deleted = 0
             processed_authors = 0
+            stale_cutoffs: Dict[str, datetime] = {}  # 有新结果的作者，任务结束时统一删除早于截止日期的记录
             
-            # 对每个作者进行搜索和更新
-            for idx, author in enumerate(author_list, 1):
-                try:
-                    since_date = author_latest_dates.get(author, datetime(2000, 1, 1))
-                    logger.info(f"搜索作者: {author}, 截止日期: {since_date}")
+            # 作者搜索并发执行（通过HTTP，受全局限速器约束），每个作者完成后立即在当前线程保存结果
+            workers = max(1, min(settings.crawler_workers, total_authors))
+            logger.info(f"使用 {workers} 个线程并发搜索 {total_authors} 个作者")
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="author-search")
+            try:
+                futures = {
+                    executor.submit(crawler.search_author_updates_http, author, author_stop_dates[author]): author
+                    for author in author_list
+                }
+                
+                for future in as_completed(futures):
+                    author = futures[future]
+                    since_date = author_latest_dates[author]
+                    try:
+                        try:
+                            new_mangas = future.result()
+                        except Exception as e:
+                            # HTTP搜索失败时使用浏览器重试（浏览器只能在当前线程使用）
+                            logger.warning(f"  作者 {author} HTTP搜索失败，使用浏览器重试: {get_error_message(e)}")
+                            new_mangas = crawler.search_author_updates(author, author_stop_dates[author])
+                        
+                        # 搜索结果和检查时间一起提交
+                        total_added += RecentUpdatesService.save_author_updates(db, author, new_mangas)
+                        if new_mangas:
+                            stale_cutoffs[author] = since_date
+                        RecentUpdatesService.update_author_watch(db, watches.get(author), author, new_mangas)
+                        # 只记录成功处理的作者，出错的作者在恢复时重新搜索
+                        completed_authors.append(author)
+                    except Exception as e:
+                        logger.error(f"处理作者 {author} 时出错: {get_error_message(e)}")
+                        db.rollback()
                     
+                    processed_authors += 1
+                    TaskManager.save_checkpoint(db, task_id, {'force': force, 'completed_authors': completed_authors}, commit=False)
                     TaskManager.update_task(
                         db, task_id,
-                        completed_items=idx - 1,
-                        progress=int((idx - 1) / total_authors * 90),
-                        message=f"正在搜索作者 {author} ({idx}/{total_authors})..."
+                        completed_items=processed_authors,
+                        progress=int(processed_authors / total_authors * 90),
+                        message=f"作者 {author} 搜索完成 ({processed_authors}/{total_authors})"
                     )
-                    
-                    # 搜索作者并获取更新
-                    new_mangas = crawler.search_author_updates(author, since_date)
-                    
-                    if not new_mangas:
-                        logger.info(f"  作者 {author} 没有找到新更新")
-                        continue
-                    
-                    logger.info(f"  作者 {author} 找到 {len(new_mangas)} 个新更新")
-                    
-                    # 保存新更新到数据库
-                    for manga_data in new_mangas:
-                        # 检查是否已存在（通过manga_url）
-                        existing = db.query(RecentUpdate).filter(
-                            RecentUpdate.manga_url == manga_data['manga_url']
-                        ).first()
-                        
-                        if existing:
-                            # 更新现有记录
-                            existing.title = manga_data['title']
-                            existing.updated_at = manga_data['updated_at']
-                            existing.page_count = manga_data.get('page_count')
-                            existing.cover_image_url = manga_data.get('cover_image_url')
-                            total_added += 1
-                        else:
-                            # 创建新记录
-                            try:
-                                new_update = RecentUpdate(
-                                    title=manga_data['title'],
-                                    author=manga_data['author'],
-                                    manga_url=manga_data['manga_url'],
-                                    updated_at=manga_data['updated_at'],
-                                    page_count=manga_data.get('page_count'),
-                                    cover_image_url=manga_data.get('cover_image_url'),
-                                    is_downloaded=False
-                                )
-                                db.add(new_update)
-                                total_added += 1
-                            except Exception as e:
-                                # 处理可能的唯一约束冲突（并发情况下可能发生）
-                                db.rollback()
-                                if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
-                                    logger.warning(f"  并发冲突，跳过: {manga_data.get('title', 'Unknown')[:50]}")
-                                    continue
-                                else:
-                                    raise
-                    
-                    db.commit()
-                    
-                    # 删除早于截止日期的记录（仅限该作者）
-                    deleted_count = db.query(RecentUpdate).filter(
-                        RecentUpdate.author == author,
-                        RecentUpdate.updated_at < since_date
-                    ).delete()
-                    
-                    if deleted_count > 0:
-                        db.commit()
-                        total_deleted += deleted_count
-                        logger.info(f"  作者 {author} 删除了 {deleted_count} 条旧记录")
-                    
-                    processed_authors += 1
-                    
-                except Exception as e:
-                    logger.error(f"处理作者 {author} 时出错: {get_error_message(e)}")
-                    db.rollback()
-                    continue
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+                crawler.close()
             
-            crawler.close()
+            # 删除早于截止日期的旧记录（一条语句）
+            total_deleted = RecentUpdatesService.delete_stale_updates(db, stale_cutoffs)
             
-            # 任务完成
+            # 任务完成，清除检查点
+            TaskManager.save_checkpoint(db, task_id, None)
             TaskManager.update_task(
                 db, task_id,
                 status="completed",
@@ -0,0 +1,89 @@
+"""漫画搜索服务 - 按标题、作者和标签搜索，PostgreSQL 使用 pg_trgm 三元组索引排序"""
+from typing import Dict, List, Tuple
+from sqlalchemy import case, func, literal, or_
+from sqlalchemy.orm import Session
+from app.models import Manga, Tag, MangaTag
+from app.services.manga_list_service import LIST_COLUMNS, MangaListService
+
+# 各字段相似度的权重（标题最重要，标签最低）
+TITLE_WEIGHT = 1.0
+AUTHOR_WEIGHT = 0.9
+TAGS_WEIGHT = 0.7
+
+# 包含完整关键词时的额外加分（保证子串匹配排在仅相似的结果前面）
+CONTAINS_BONUS = 0.5
+
+
+class MangaSearchService:
+    """漫画搜索服务类"""
+    
+    @staticmethod
+    def _escape_like(keyword: str) -> str:
+        """转义LIKE通配符"""
+        return keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    
+    @staticmethod
+    def search(db: Session, keyword: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        搜索漫画（标题、作者、标签）
+        
+        - PostgreSQL：子串匹配（ILIKE）或三元组相似（%）的漫画，按加权相似度排序，
+          两者都由 gin_trgm_ops 索引支持，中文等非拉丁文字同样适用
+        - 其他数据库：只做子串匹配，按匹配字段排序
+        
+        标签按 tags/manga_tags 表中的单个标签名匹配（同步和下载时写入）。
+        
+        Returns:
+            tuple: (结果列表（带 score）, 匹配总数)
+        """
+        keyword = keyword.strip()
+        if not keyword:
+            return [], 0
+        
+        pattern = f"%{MangaSearchService._escape_like(keyword)}%"
+        title_contains = Manga.title.ilike(pattern, escape='\\')
+        author_contains = Manga.author.ilike(pattern, escape='\\')
+        tag_contains = Tag.name.ilike(pattern, escape='\\')
+        is_postgresql = db.get_bind().dialect.name == "postgresql"
+        
+        # 标签匹配的漫画（先在标签表中按索引找到标签，再取关联的漫画）
+        tag_condition = or_(tag_contains, Tag.name.op('%')(keyword)) if is_postgresql else tag_contains
+        tagged = db.query(MangaTag.manga_id).join(Tag, Tag.id == MangaTag.tag_id).filter(tag_condition)
+        tag_match = Manga.id.in_(tagged)
+        
+        if is_postgresql:
+            condition = or_(
+                title_contains, author_contains, tag_match,
+                Manga.title.op('%')(keyword), Manga.author.op('%')(keyword)
+            )
+            # 漫画标签中与关键词最相似的一个
+            tag_similarity = db.query(func.max(func.similarity(Tag.name, keyword))).join(
+                MangaTag, MangaTag.tag_id == Tag.id
+            ).filter(MangaTag.manga_id == Manga.id).correlate(Manga).scalar_subquery()
+            score = func.greatest(
+                func.similarity(Manga.title, keyword) * TITLE_WEIGHT,
+                func.similarity(Manga.author, keyword) * AUTHOR_WEIGHT,
+                func.coalesce(tag_similarity, 0) * TAGS_WEIGHT
+            ) + case(
+                (or_(title_contains, author_contains), CONTAINS_BONUS),
+                else_=0
+            )
+        else:
+            condition = or_(title_contains, author_contains, tag_match)
+            score = case(
+                (title_contains, literal(TITLE_WEIGHT)),
+                (author_contains, literal(AUTHOR_WEIGHT)),
+                else_=literal(TAGS_WEIGHT)
+            )
+        
+        base = db.query(*LIST_COLUMNS, score.label('score')).filter(condition)
+        
+        total = base.with_entities(func.count(Manga.id)).scalar() or 0
+        rows = base.order_by(score.desc(), Manga.id).offset(offset).limit(limit).all()
+        
+        items = []
+        for row in rows:
+            item = MangaListService.row_to_item(row)
+            item['score'] = round(float(item['score'] or 0), 4)
+            items.append(item)
+        return items, total
@@ -1,14 +1,21 @@
 """同步业务服务"""
+import time
 from sqlalchemy.orm import Session
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Dict, Optional
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
 from app.database import SessionLocal
-from app.models import Manga
+from app.models import Manga, CollectionCategory
 from app.crawler.base import MangaCrawler
+from app.crawler.parser import manga_key
 from app.config import settings
-from app.utils.logger import logger
-from app.services.task_manager import TaskManager
+from app.utils.logger import logger, get_error_message
+from app.services.task_manager import TaskManager, ProgressTracker
 from app.services.sync_singleton import sync_singleton
+from app.services.details_cache import DetailsCacheService
+from app.services.tag_service import TagService
+from app.utils.bulk import bulk_upsert
 
 
 class SyncService:
@@ -93,12 +100,85 @@ class SyncService:
         return verified_count, fixed_count, missing_files
     
     @staticmethod
-    def execute_sync_task(task_id: str, db: Session = None):
-        """执行同步任务（后台任务）"""
+    def load_high_water_marks(db: Session, full: bool = False) -> Dict[str, Optional[str]]:
+        """
+        获取可以增量同步的分类及其高水位
+        
+        从未同步过、或超过 collection_full_sync_days 天未完整遍历的分类不在结果中（将完整遍历）
+        
+        Returns:
+            dict: {分类ID: 上次同步时的第一个漫画URL}
+        """
+        if full or not settings.collection_incremental_sync:
+            return {}
+        
+        full_sync_before = datetime.now() - timedelta(days=settings.collection_full_sync_days)
+        categories = db.query(CollectionCategory).filter(
+            CollectionCategory.last_full_sync_at >= full_sync_before
+        ).all()
+        return {category.category_id: category.newest_manga_url for category in categories}
+    
+    @staticmethod
+    def save_category_state(db: Session, category_id: str, name: str,
+                            newest_manga_url: Optional[str], full: bool):
+        """保存分类的同步状态（高水位）"""
+        category = db.query(CollectionCategory).filter(CollectionCategory.category_id == category_id).first()
+        if not category:
+            category = CollectionCategory(category_id=category_id, name=name)
+            db.add(category)
+        
+        now = datetime.now()
+        category.name = name
+        if newest_manga_url:
+            category.newest_manga_url = newest_manga_url
+        category.last_synced_at = now
+        if full:
+            category.last_full_sync_at = now
+        db.commit()
+    
+    @staticmethod
+    def upsert_mangas(db: Session, rows: List[Dict]) -> int:
+        """
+        批量写入同步结果（不提交）：新漫画插入，已存在的漫画只用非空的新值更新页数、更新日期和封面
+        
+        PostgreSQL 使用 INSERT ... ON CONFLICT (manga_url) DO UPDATE，并发同步产生的冲突也会合并而不是失败
+        """
+        return bulk_upsert(db, Manga, rows, 'manga_url', ['page_count', 'updated_at', 'cover_image_url'])
+    
+    @staticmethod
+    def apply_details(row: Dict, details: Optional[Dict]):
+        """将详情页信息合并到待写入的记录"""
+        if not details:
+            return
+        if details.get('page_count'):
+            row['page_count'] = details['page_count']
+        if details.get('updated_at'):
+            row['updated_at'] = details['updated_at']
+        if details.get('cover_image_url'):
+            row['cover_image_url'] = details['cover_image_url']
+    
+    @staticmethod
+    def execute_sync_task(task_id: str, db: Session = None, full: bool = False, checkpoint: Optional[Dict] = None):
+        """执行同步任务（后台任务）
+        
+        Args:
+            task_id: 任务ID
+            db: 数据库会话
+            full: 是否强制完整遍历所有分类（默认按分类增量同步）
+            checkpoint: 中断任务的检查点，跳过已完成的分类，进行中的分类从记录的页面继续
+        """
         if not db:
             db = SessionLocal()
         
         try:
+            # 先把检查点转存到当前任务，即使本次任务没能执行，下次仍可恢复
+            checkpoint = checkpoint or {}
+            full = full or bool(checkpoint.get('full'))
+            completed_categories = list(checkpoint.get('completed_categories') or [])
+            category_cursors: Dict[str, Dict] = dict(checkpoint.get('cursors') or {})
+            if checkpoint:
+                TaskManager.save_checkpoint(db, task_id, checkpoint)
+            
             # 使用单例管理器检查并启动任务
             if not sync_singleton.start_task(task_id):
                 TaskManager.update_task(db, task_id, status="failed", error_message="已有同步任务正在运行")
@@ -131,85 +211,201 @@ class SyncService:
                     TaskManager.update_task(db, task_id, status="failed", error_message="登录失败")
                     return
                 
-                TaskManager.update_task(db, task_id, message="登录成功，开始爬取收藏夹...")
+                TaskManager.update_task(
+                    db, task_id,
+                    message=f"登录成功，从检查点继续爬取收藏夹（已完成 {len(completed_categories)} 个分类）..." if checkpoint
+                    else "登录成功，开始爬取收藏夹..."
+                )
                 
                 added_count = 0
                 updated_count = 0
                 processed_count = 0
+                # 每个漫画的进度立即推送，数据库按间隔合并写入
+                tracker = ProgressTracker(db, task_id, "sync")
                 
-                # 生成器：每yield一个漫画，立即处理并保存
-                for item in crawler.get_collection_stream():
-                    processed_count += 1
-                    
-                    try:
-                        # 检查是否已存在
-                        existing = db.query(Manga).filter(Manga.manga_url == item['manga_url']).first()
+                # 一次性加载已有漫画（镜像无关标识 -> [数据库中的URL, 页数]），已知漫画不再逐个查询数据库
+                known_mangas: Dict[str, List] = {
+                    manga_key(url): [url, page_count]
+                    for url, page_count in db.query(Manga.manga_url, Manga.page_count).all()
+                }
+                high_water_marks = SyncService.load_high_water_marks(db, full)
+                logger.info(f"已有 {len(known_mangas)} 个漫画，{len(high_water_marks)} 个分类使用增量同步")
+                
+                # 流水线：收藏夹列表（当前线程消费）-> 详情获取（线程池并发）-> 批量写入数据库（当前线程）
+                # 待写入的记录按URL合并，新漫画、补充的页数和详情都通过一次批量 upsert 写入
+                pending_rows: Dict[str, Dict] = {}
+                pending_metadata: Dict[str, Dict] = {}  # 待写入的标签、分类和上传者（漫画写入后按URL关联）
+                detail_futures: Dict[Future, Dict] = {}
+                # HTTP获取详情失败，稍后用浏览器重试（记录在检查点中，中断后恢复时继续重试）
+                browser_retry: List[Dict] = list(checkpoint.get('detail_retry') or [])
+                max_in_flight = max(1, settings.crawler_workers) * 4
+                detail_executor = ThreadPoolExecutor(max_workers=max(1, settings.crawler_workers), thread_name_prefix="sync-details")
+                
+                def pending_row(item: Dict) -> Dict:
+                    """获取漫画的待写入记录（已写入过的漫画重新加入，冲突时合并）"""
+                    row = pending_rows.get(item['manga_url'])
+                    if row is None:
+                        row = {'title': item['title'], 'author': item['author'], 'manga_url': item['manga_url']}
+                        pending_rows[item['manga_url']] = row
+                    return row
+                
+                def flush():
+                    """批量写入待写入的记录和已获取的详情（一次提交）"""
+                    if pending_rows:
+                        SyncService.upsert_mangas(db, list(pending_rows.values()))
+                        pending_rows.clear()
+                    if pending_metadata:
+                        TagService.save_metadata(db, pending_metadata)
+                        pending_metadata.clear()
+                    db.commit()
+                
+                def collect_details(block: bool = False):
+                    """收集已完成的详情结果（block为True时至少等待一个完成）"""
+                    if not detail_futures:
+                        return
+                    if block:
+                        wait(detail_futures, return_when=FIRST_COMPLETED)
+                    for future in [f for f in detail_futures if f.done()]:
+                        item = detail_futures.pop(future)
+                        try:
+                            details = future.result()
+                            SyncService.apply_details(pending_row(item), details)
+                            if details:
+                                pending_metadata[item['manga_url']] = details
+                            DetailsCacheService.put(db, item['manga_url'], details, commit=False)
+                        except Exception as detail_error:
+                            logger.debug(f"     HTTP获取详情失败，稍后使用浏览器重试: {get_error_message(detail_error)}")
+                            browser_retry.append(item)
+                    if len(pending_rows) >= settings.sync_batch_size:
+                        flush()
+                
+                # 检查点：已完成的分类 + 进行中分类的下一页，只在已爬取的漫画（连同详情）写入数据库后保存
+                # 恢复时已写入的漫画视为已知，不会再获取详情，因此保存前必须等待进行中的详情获取完成
+                last_checkpoint_at = time.monotonic()
+                
+                def save_checkpoint():
+                    nonlocal last_checkpoint_at
+                    TaskManager.save_checkpoint(db, task_id, {
+                        'full': full,
+                        'completed_categories': completed_categories,
+                        'cursors': category_cursors,
+                        'detail_retry': browser_retry
+                    })
+                    last_checkpoint_at = time.monotonic()
+                
+                # 分类进度（分类由多个线程并发遍历，回调在当前线程执行）
+                category_progress = {'completed': 0, 'total': 0}
+                
+                def drain_details():
+                    while detail_futures:
+                        collect_details(block=True)
+                
+                def on_category_done(category_id, name, newest_manga_url, full_walk):
+                    # 先写入该分类的漫画，再保存高水位，避免中断后增量同步漏掉未写入的漫画
+                    drain_details()
+                    flush()
+                    SyncService.save_category_state(db, category_id, name, newest_manga_url, full_walk)
+                    completed_categories.append(category_id)
+                    category_cursors.pop(category_id, None)
+                    save_checkpoint()
+                
+                def on_category_page(category_id, next_page_url, newest_manga_url):
+                    category_cursors[category_id] = {'url': next_page_url, 'newest_manga_url': newest_manga_url}
+                    if time.monotonic() - last_checkpoint_at >= settings.checkpoint_interval_seconds:
+                        drain_details()
+                        flush()
+                        save_checkpoint()
+                
+                def on_category_progress(completed, total, name):
+                    category_progress.update(completed=completed, total=total)
+                    tracker.update(
+                        progress=int(completed / max(total, 1) * 90),  # 90%用于爬取，10%用于完成
+                        message=f"分类 {completed}/{total} 完成: {name}（已处理 {processed_count} 个漫画）"
+                    )
+                
+                collection_stream = crawler.get_collection_stream(
+                    known_keys=set(known_mangas),
+                    high_water_marks=high_water_marks,
+                    category_callback=on_category_done,
+                    progress_callback=on_category_progress,
+                    resume={'completed_categories': completed_categories, 'cursors': category_cursors},
+                    page_callback=on_category_page
+                )
+                
+                try:
+                    # 生成器：每yield一个漫画，立即处理；新漫画的详情交给线程池获取
+                    for item in collection_stream:
+                        processed_count += 1
                         
-                        if existing:
-                            # 已存在，仅更新基本信息（如果需要）
-                            if item.get('page_count') and not existing.page_count:
-                                existing.page_count = item['page_count']
-                                db.commit()
-                            updated_count += 1
-                            logger.info(f"[{processed_count}] ⟳ 已存在: {item['title'][:50]}")
-                        else:
-                            # 新漫画，创建记录并立即保存
-                            logger.info(f"[{processed_count}] ✚ 新增: {item['title'][:50]}")
-                            
-                            try:
-                                manga = Manga(
-                                    title=item['title'],
-                                    author=item['author'],
-                                    manga_url=item['manga_url'],
-                                    page_count=item.get('page_count')
-                                )
-                                db.add(manga)
-                                db.commit()
-                                db.refresh(manga)
-                            except Exception as e:
-                                # 处理可能的唯一约束冲突（并发情况下可能发生）
-                                db.rollback()
-                                if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
-                                    logger.warning(f"[{processed_count}] ⚠️  并发冲突，跳过: {item['title'][:50]}")
-                                    updated_count += 1
-                                    continue
+                        try:
+                            known = known_mangas.get(manga_key(item['manga_url']))
+                            if known:
+                                # 镜像切换后同一漫画的主机名不同：沿用数据库中的URL，按 manga_url 合并而不是重复插入
+                                item['manga_url'] = known[0]
+                                # 已存在，仅在缺少页数时更新（是否已存在由预加载的标识判断，不查询数据库）
+                                if item.get('page_count') and not known[1]:
+                                    pending_row(item)['page_count'] = item['page_count']
+                                    known[1] = item['page_count']
+                                updated_count += 1
+                                logger.info(f"[{processed_count}] ⟳ 已存在: {item['title'][:50]}")
+                            else:
+                                # 新漫画，加入批量写入队列，同时提交详情获取
+                                logger.info(f"[{processed_count}] ✚ 新增: {item['title'][:50]}")
+                                row = pending_row(item)
+                                row['page_count'] = item.get('page_count')
+                                known_mangas[manga_key(item['manga_url'])] = [item['manga_url'], item.get('page_count')]
+                                added_count += 1
+                                
+                                cached_details = DetailsCacheService.get(db, item['manga_url'])
+                                if cached_details:
+                                    SyncService.apply_details(row, cached_details)
+                                    pending_metadata[item['manga_url']] = cached_details
                                 else:
-                                    raise
+                                    # 详情获取队列已满时等待，避免列表爬取领先太多
+                                    while len(detail_futures) >= max_in_flight:
+                                        collect_details(block=True)
+                                    detail_futures[detail_executor.submit(crawler.get_manga_details_http, item['manga_url'])] = item
                             
-                            added_count += 1
+                            collect_details()
                             
-                            # 立即获取详细信息
-                            try:
-                                details = crawler.get_manga_details(manga.manga_url)
-                                if details:
-                                    if details.get('page_count'):
-                                        manga.page_count = details['page_count']
-                                    if details.get('updated_at'):
-                                        manga.updated_at = details['updated_at']
-                                    if details.get('cover_image_url'):
-                                        manga.cover_image_url = details['cover_image_url']
-                                    db.commit()
-                            except Exception as detail_error:
-                                logger.warning(f"     ⚠ 获取详情失败: {detail_error}")
-                        
-                        # 更新任务进度
-                        progress = int((processed_count / max(processed_count, 1)) * 90)  # 90%用于爬取，10%用于完成
-                        TaskManager.update_task(
-                            db, task_id,
-                            progress=progress,
-                            completed_items=processed_count,
-                            message=f"已处理 {processed_count} 个漫画（新增 {added_count}，更新 {updated_count}）"
-                        )
-                        
-                    except Exception as e:
-                        logger.error(f"[{processed_count}] ✗ 处理失败: {item.get('title', 'Unknown')[:50]} - {e}")
-                        db.rollback()
-                        continue
+                            # 更新任务进度
+                            category_label = f"分类 {category_progress['completed']}/{category_progress['total']}，" if category_progress['total'] else ""
+                            tracker.update(
+                                completed_items=processed_count,
+                                message=f"{category_label}已处理 {processed_count} 个漫画（新增 {added_count}，更新 {updated_count}）"
+                            )
+                            
+                        except Exception as e:
+                            logger.error(f"[{processed_count}] ✗ 处理失败: {item.get('title', 'Unknown')[:50]} - {e}")
+                            db.rollback()
+                            continue
+                    
+                    # 等待剩余的详情获取完成
+                    drain_details()
+                    flush()
+                finally:
+                    detail_executor.shutdown(wait=False, cancel_futures=True)
                 
-                # 任务完成
-                TaskManager.update_task(
-                    db, task_id,
-                    status="completed",
+                # HTTP获取详情失败的漫画使用浏览器重试（浏览器只能在当前线程使用）
+                if browser_retry:
+                    logger.info(f"使用浏览器获取 {len(browser_retry)} 个漫画的详情")
+                    for item in browser_retry:
+                        try:
+                            details = crawler.get_manga_details(item['manga_url'])
+                            if details:
+                                SyncService.apply_details(pending_row(item), details)
+                                pending_metadata[item['manga_url']] = details
+                                DetailsCacheService.put(db, item['manga_url'], details, commit=False)
+                        except Exception as detail_error:
+                            logger.warning(f"     ⚠ 获取详情失败: {detail_error}")
+                        if len(pending_rows) >= settings.sync_batch_size:
+                            flush()
+                    flush()
+                
+                # 任务完成，清除检查点
+                TaskManager.save_checkpoint(db, task_id, None)
+                tracker.finish(
+                    "completed",
                     progress=100,
                     message=f"同步完成：新增 {added_count} 个，更新 {updated_count} 个",
                     result_data=f'{{"added_count": {added_count}, "updated_count": {updated_count}}}'
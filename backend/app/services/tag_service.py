@@ -0,0 +1,114 @@
+"""标签业务服务 - 保存详情页的标签、分类和上传者，提供标签统计"""
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import Manga, Tag, MangaTag
+from app.utils.bulk import bulk_upsert
+from app.utils.logger import logger
+
+
+class TagService:
+    """标签业务服务类"""
+    
+    @staticmethod
+    def _normalize(tags) -> List[str]:
+        """去除空白和重复的标签（保持原顺序）"""
+        names = []
+        for tag in tags or []:
+            name = (tag or "").strip()
+            if name and name not in names:
+                names.append(name)
+        return names
+    
+    @staticmethod
+    def ensure_tags(db: Session, names: List[str]) -> Dict[str, str]:
+        """
+        获取标签ID，不存在的标签批量创建（不提交）
+        
+        Returns:
+            dict: {标签名: 标签ID}
+        """
+        if not names:
+            return {}
+        bulk_upsert(db, Tag, [{'name': name} for name in names], 'name', [])
+        return dict(db.query(Tag.name, Tag.id).filter(Tag.name.in_(names)).all())
+    
+    @staticmethod
+    def save_metadata(db: Session, details_by_url: Dict[str, Optional[Dict]]):
+        """
+        批量保存漫画的详情元数据（不提交）：分类、上传者写入漫画记录，标签替换为详情页上的标签
+        
+        Args:
+            details_by_url: {漫画URL: 详情字典}，详情为空的漫画跳过
+        """
+        details_by_url = {url: details for url, details in details_by_url.items() if details}
+        if not details_by_url:
+            return
+        
+        manga_ids = dict(db.query(Manga.manga_url, Manga.id).filter(Manga.manga_url.in_(list(details_by_url))).all())
+        if not manga_ids:
+            return
+        
+        updates = []
+        tags_by_manga: Dict[str, List[str]] = {}
+        for url, details in details_by_url.items():
+            manga_id = manga_ids.get(url)
+            if not manga_id:
+                continue
+            values = {key: details[key] for key in ('category', 'uploader') if details.get(key)}
+            if values:
+                updates.append({'id': manga_id, **values})
+            # 详情页没有返回标签字段时保留已有标签
+            if 'tags' in details:
+                tags_by_manga[manga_id] = TagService._normalize(details['tags'])
+        
+        if updates:
+            db.bulk_update_mappings(Manga, updates)
+        if not tags_by_manga:
+            return
+        
+        all_names = sorted({name for names in tags_by_manga.values() for name in names})
+        tag_ids = TagService.ensure_tags(db, all_names)
+        
+        db.query(MangaTag).filter(MangaTag.manga_id.in_(list(tags_by_manga))).delete(synchronize_session=False)
+        links = [
+            {'manga_id': manga_id, 'tag_id': tag_ids[name]}
+            for manga_id, names in tags_by_manga.items()
+            for name in names if name in tag_ids
+        ]
+        if links:
+            db.bulk_insert_mappings(MangaTag, links)
+        logger.debug(f"保存 {len(tags_by_manga)} 个漫画的标签（{len(links)} 条关联）")
+    
+    @staticmethod
+    def get_manga_tags(db: Session, manga_id: str) -> List[str]:
+        """获取漫画的标签"""
+        rows = db.query(Tag.name).join(MangaTag, MangaTag.tag_id == Tag.id).filter(
+            MangaTag.manga_id == manga_id
+        ).order_by(Tag.name).all()
+        return [row[0] for row in rows]
+    
+    @staticmethod
+    def delete_manga_tags(db: Session, manga_id: str):
+        """删除漫画的标签关联（不提交）"""
+        db.query(MangaTag).filter(MangaTag.manga_id == manga_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def tag_counts(db: Session, limit: int = 100) -> List[Dict]:
+        """标签统计（按漫画数量倒序，只统计仍存在的漫画）"""
+        count = func.count(MangaTag.manga_id)
+        rows = db.query(Tag.name, count.label('count')).join(MangaTag, MangaTag.tag_id == Tag.id).join(
+            Manga, Manga.id == MangaTag.manga_id
+        ).group_by(
+            Tag.name
+        ).order_by(count.desc(), Tag.name).limit(limit).all()
+        return [{'name': name, 'count': total} for name, total in rows]
+    
+    @staticmethod
+    def field_counts(db: Session, column, limit: int = 100) -> List[Dict]:
+        """分类、上传者等字段的统计（按漫画数量倒序）"""
+        count = func.count(Manga.id)
+        rows = db.query(column, count.label('count')).filter(column.isnot(None)).group_by(column).order_by(
+            count.desc(), column
+        ).limit(limit).all()
+        return [{'name': name, 'count': total} for name, total in rows]
@@ -1,34 +1,41 @@
 """任务管理服务 - 管理任务状态和SSE推送"""
 import json
 import asyncio
+import time
 from typing import Dict, Optional, List
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models import Task
+from app.config import settings
 from app.utils.logger import logger
+from app.utils.serialization import dumps
 
 # SSE连接管理器
 class SSEManager:
-    """Server-Sent Events 连接管理器"""
+    """Server-Sent Events 连接管理器
+    
+    后台任务运行在工作线程中，不能直接操作事件循环里的 asyncio.Queue。
+    启动时绑定服务器的事件循环，工作线程只负责序列化消息，
+    再通过 call_soon_threadsafe 交给事件循环分发到各个客户端。
+    每个客户端的队列有上限，客户端消费不及时时丢弃最旧的消息。
+    """
     
     def __init__(self):
         self.connections: List[asyncio.Queue] = []
         self._loop: Optional[asyncio.AbstractEventLoop] = None
     
-    def _get_loop(self):
-        """获取或创建事件循环"""
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                raise RuntimeError("Event loop is closed")
-            return loop
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            return loop
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """绑定服务器的事件循环（启动时调用）"""
+        self._loop = loop
+    
+    def create_queue(self) -> asyncio.Queue:
+        """创建客户端消息队列（有上限）"""
+        return asyncio.Queue(maxsize=max(settings.sse_queue_max_size, 1))
     
     async def add_connection(self, queue: asyncio.Queue):
         """添加SSE连接"""
+        if self._loop is None:
+            self.bind_loop(asyncio.get_running_loop())
         self.connections.append(queue)
         logger.info(f"SSE连接已添加，当前连接数: {len(self.connections)}")
     
@@ -38,42 +45,44 @@ class SSEManager:
             self.connections.remove(queue)
             logger.info(f"SSE连接已移除，当前连接数: {len(self.connections)}")
     
-    async def broadcast(self, event_type: str, data: Dict):
-        """广播消息到所有连接的客户端"""
+    @staticmethod
+    def _format(event_type: str, data: Dict) -> str:
+        """转换为SSE格式"""
         message = {
             "type": event_type,
             "data": data,
             "timestamp": datetime.now().isoformat()
         }
-        
-        # 转换为SSE格式
-        sse_message = f"event: {event_type}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
-        
-        # 发送到所有连接
-        disconnected = []
-        for queue in self.connections:
+        return f"event: {event_type}\ndata: {dumps(message)}\n\n"
+    
+    def _fanout(self, sse_message: str):
+        """把消息放入所有客户端队列（只在事件循环线程中执行）"""
+        for queue in list(self.connections):
+            if queue.full():
+                # 客户端消费太慢：丢弃最旧的消息，保留最新状态
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
             try:
-                await queue.put(sse_message)
-            except Exception as e:
-                logger.warning(f"发送SSE消息失败: {e}")
-                disconnected.append(queue)
-        
-        # 清理断开的连接
-        for queue in disconnected:
-            await self.remove_connection(queue)
+                queue.put_nowait(sse_message)
+            except asyncio.QueueFull:
+                logger.warning("SSE客户端队列已满，消息被丢弃")
+    
+    async def broadcast(self, event_type: str, data: Dict):
+        """广播消息到所有连接的客户端（在事件循环中调用）"""
+        self._fanout(self._format(event_type, data))
     
     def broadcast_sync(self, event_type: str, data: Dict):
-        """同步方式广播消息（用于后台任务）"""
+        """同步方式广播消息（可在任意线程调用，不等待分发完成）"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self.connections:
+            return
         try:
-            loop = self._get_loop()
-            if loop.is_running():
-                # 如果事件循环正在运行，创建任务
-                asyncio.create_task(self.broadcast(event_type, data))
-            else:
-                # 如果事件循环未运行，运行它
-                loop.run_until_complete(self.broadcast(event_type, data))
-        except Exception as e:
-            logger.error(f"同步广播消息失败: {e}")
+            loop.call_soon_threadsafe(self._fanout, self._format(event_type, data))
+        except RuntimeError as e:
+            # 事件循环已关闭（应用正在退出）
+            logger.debug(f"同步广播消息失败: {e}")
 
 
 # 全局SSE管理器
@@ -127,9 +136,10 @@ class TaskManager:
         completed_items: Optional[int] = None,
         message: Optional[str] = None,
         error_message: Optional[str] = None,
-        result_data: Optional[Dict] = None
+        result_data: Optional[Dict] = None,
+        broadcast: bool = True
     ) -> Optional[Task]:
-        """更新任务状态"""
+        """更新任务状态（broadcast为False时只写数据库，由调用方负责推送）"""
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
             return None
@@ -154,7 +164,9 @@ class TaskManager:
         
         task.updated_at = datetime.now()
         db.commit()
-        db.refresh(task)
+        
+        if not broadcast:
+            return task
         
         # 广播任务更新事件（同步方式，因为这是从同步函数调用的）
         sse_manager.broadcast_sync("task_updated", {
@@ -190,6 +202,50 @@ class TaskManager:
             Task.task_type == task_type
         ).order_by(Task.created_at.desc()).first()
     
+    @staticmethod
+    def save_checkpoint(db: Session, task_id: str, checkpoint: Optional[Dict], commit: bool = True):
+        """保存任务的爬取检查点（None表示清除）"""
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if not task:
+            return
+        
+        task.checkpoint = json.dumps(checkpoint, ensure_ascii=False) if checkpoint is not None else None
+        if commit:
+            db.commit()
+    
+    @staticmethod
+    def take_checkpoint(db: Session, task_type: str) -> Optional[Dict]:
+        """
+        取出指定类型最近一次中断任务的检查点（取出后清除，避免重复恢复）
+        
+        只恢复 checkpoint_max_age_hours 内创建的任务，更早的检查点直接丢弃
+        """
+        from datetime import timedelta
+        
+        tasks = db.query(Task).filter(
+            Task.task_type == task_type,
+            Task.status == "failed",
+            Task.checkpoint.isnot(None)
+        ).order_by(Task.created_at.desc()).all()
+        if not tasks:
+            return None
+        
+        checkpoint = None
+        threshold = datetime.now() - timedelta(hours=settings.checkpoint_max_age_hours)
+        latest = tasks[0]
+        if latest.created_at and latest.created_at >= threshold:
+            try:
+                checkpoint = json.loads(latest.checkpoint)
+                logger.info(f"找到中断任务的检查点: {latest.id} ({task_type})")
+            except (TypeError, ValueError):
+                logger.warning(f"任务检查点格式错误，忽略: {latest.id}")
+        
+        for task in tasks:
+            task.checkpoint = None
+        db.commit()
+        
+        return checkpoint
+    
     @staticmethod
     def cleanup_stale_tasks(db: Session, timeout_minutes: int = 60, cleanup_all_on_startup: bool = False):
         """
@@ -250,3 +306,82 @@ class TaskManager:
         
         return len(stale_tasks)
 
+
+class ProgressTracker:
+    """任务进度跟踪器
+    
+    运行中的进度变化立即通过SSE推送，数据库只按时间间隔（progress_flush_interval_seconds）
+    或进度变化（progress_flush_percent_step）合并写入；状态变化（完成/失败）立即写入。
+    写入时会一起提交会话中的其他修改（例如漫画的已下载页数）。
+    """
+    
+    def __init__(self, db: Session, task_id: str, task_type: Optional[str] = None):
+        self.db = db
+        self.task_id = task_id
+        task = TaskManager.get_task(db, task_id)
+        self.task_type = task_type or (task.task_type if task else None)
+        self._state: Dict = {}  # 尚未写入数据库的进度
+        # 最新的完整进度（用于推送）：从任务记录初始化，前端用推送的数据覆盖任务状态，不能推送空值
+        self._snapshot: Dict = {
+            'progress': task.progress,
+            'total_items': task.total_items,
+            'completed_items': task.completed_items,
+            'message': task.message
+        } if task else {}
+        self._last_flush_at = time.monotonic()
+        self._last_flushed_progress = (task.progress if task else None) or 0
+    
+    def update(
+        self,
+        progress: Optional[int] = None,
+        total_items: Optional[int] = None,
+        completed_items: Optional[int] = None,
+        message: Optional[str] = None,
+        force: bool = False
+    ):
+        """更新进度：立即推送，到期时写入数据库（force为True时立即写入）"""
+        changes = {
+            key: value for key, value in (
+                ('progress', progress), ('total_items', total_items),
+                ('completed_items', completed_items), ('message', message)
+            ) if value is not None
+        }
+        self._state.update(changes)
+        self._snapshot.update(changes)
+        
+        sse_manager.broadcast_sync("task_updated", {
+            "task_id": self.task_id,
+            "task_type": self.task_type,
+            "status": "running",
+            "progress": self._snapshot.get('progress'),
+            "completed_items": self._snapshot.get('completed_items'),
+            "total_items": self._snapshot.get('total_items'),
+            "message": self._snapshot.get('message'),
+            "error_message": None
+        })
+        
+        if force or self._flush_due():
+            self.flush()
+    
+    def _flush_due(self) -> bool:
+        if time.monotonic() - self._last_flush_at >= settings.progress_flush_interval_seconds:
+            return True
+        progress = self._state.get('progress')
+        return progress is not None and progress - self._last_flushed_progress >= settings.progress_flush_percent_step
+    
+    def flush(self):
+        """把尚未写入的进度写入数据库（不推送，推送已在 update 中完成）"""
+        if self._state:
+            TaskManager.update_task(self.db, self.task_id, broadcast=False, **self._state)
+            self._last_flushed_progress = self._state.get('progress', self._last_flushed_progress)
+            self._state = {}
+        else:
+            self.db.commit()
+        self._last_flush_at = time.monotonic()
+    
+    def finish(self, status: str, **kwargs) -> Optional[Task]:
+        """状态变化（完成/失败）：合并尚未写入的进度，立即写入并推送"""
+        values = {**self._state, **kwargs}
+        self._state = {}
+        return TaskManager.update_task(self.db, self.task_id, status=status, **values)
+
@@ -0,0 +1,137 @@
+"""任务历史保留服务 - 把超过保留期的已完成/失败任务移到归档表，并定期执行"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Task, TaskArchive
+from app.utils.bulk import bulk_upsert
+from app.utils.logger import logger, get_error_message
+
+# 归档时保留的列
+ARCHIVE_COLUMNS = (
+    'id', 'task_type', 'status', 'message', 'error_message', 'manga_id', 'manga_ids',
+    'result_data', 'created_at', 'completed_at'
+)
+
+# 启动后第一次执行前的等待时间（秒）
+STARTUP_DELAY_SECONDS = 60
+
+
+class TaskRetentionService:
+    """任务历史保留服务类"""
+    
+    @staticmethod
+    def _archive_batch(db: Session, task_filter) -> int:
+        """归档并删除一批任务（一次提交），返回处理的任务数"""
+        rows = db.query(*[getattr(Task, column) for column in ARCHIVE_COLUMNS]).filter(
+            *task_filter
+        ).order_by(Task.created_at).limit(settings.task_retention_batch_size).all()
+        if not rows:
+            return 0
+        
+        bulk_upsert(db, TaskArchive, [dict(row._mapping) for row in rows], 'id', [])
+        db.query(Task).filter(Task.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.commit()
+        return len(rows)
+    
+    @staticmethod
+    def compact(db: Session) -> Dict[str, int]:
+        """
+        按任务类型的保留期归档已完成/失败的任务（分批删除，每批一次提交）
+        
+        Returns:
+            dict: {任务类型: 归档的任务数}
+        """
+        now = datetime.now()
+        retention = settings.task_retention_days
+        task_types = [row[0] for row in db.query(Task.task_type).distinct().all()]
+        
+        archived: Dict[str, int] = {}
+        for task_type in task_types:
+            days = retention.get(task_type, settings.task_retention_default_days)
+            cutoff = now - timedelta(days=days)
+            task_filter = (
+                Task.task_type == task_type,
+                Task.status.in_(["completed", "failed"]),
+                func.coalesce(Task.completed_at, Task.updated_at, Task.created_at) < cutoff
+            )
+            
+            total = 0
+            while True:
+                count = TaskRetentionService._archive_batch(db, task_filter)
+                total += count
+                if count < settings.task_retention_batch_size:
+                    break
+            
+            if total:
+                archived[task_type] = total
+                logger.info(f"已归档 {total} 个 {task_type} 任务（保留 {days} 天）")
+        
+        return archived
+
+
+class TaskRetentionScheduler:
+    """任务历史保留调度器（单例）
+    
+    在后台线程中按 task_retention_interval_hours 定期执行归档
+    """
+    
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(TaskRetentionScheduler, cls).__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self._run_lock = threading.Lock()  # 定时执行和手动触发不同时进行
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._initialized = True
+    
+    def start(self):
+        """启动后台调度线程（重复调用无效）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="task-retention", daemon=True)
+        self._thread.start()
+        logger.info(f"任务历史保留调度已启动（每 {settings.task_retention_interval_hours} 小时执行一次）")
+    
+    def stop(self):
+        """停止后台调度线程"""
+        self._stop_event.set()
+    
+    def run_once(self) -> Dict[str, int]:
+        """立即执行一次归档"""
+        with self._run_lock:
+            db = SessionLocal()
+            try:
+                return TaskRetentionService.compact(db)
+            finally:
+                db.close()
+    
+    def _loop(self):
+        interval = max(settings.task_retention_interval_hours, 0.1) * 3600
+        # 启动后稍等片刻再执行第一次，避免与启动时的迁移和任务恢复争抢数据库
+        delay = STARTUP_DELAY_SECONDS
+        while not self._stop_event.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"任务归档失败: {get_error_message(e)}")
+            delay = interval
+
+
+# 全局任务历史保留调度器实例
+retention_scheduler = TaskRetentionScheduler()
@@ -0,0 +1,94 @@
+"""批量写入工具 - 按唯一键批量插入或更新（PostgreSQL 使用 INSERT ... ON CONFLICT）"""
+from typing import Dict, List, Sequence
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.utils.logger import logger
+
+# 单条语句的最大行数（PostgreSQL单条语句最多65535个参数）
+CHUNK_SIZE = 500
+
+
+def bulk_upsert(db: Session, model, rows: List[Dict], key: str, update_columns: Sequence[str]) -> int:
+    """
+    按唯一键批量写入记录（不提交）
+    
+    - 不存在的记录直接插入（未提供的列使用模型默认值，例如ID）
+    - 已存在的记录只更新 update_columns 中的列，且只用非空的新值覆盖旧值
+    
+    Args:
+        db: 数据库会话
+        model: ORM模型类
+        rows: 记录列表（字典），同一批中唯一键不能重复
+        key: 唯一键列名（例如 manga_url）
+        update_columns: 冲突时更新的列（为空时跳过已存在的记录）
+    
+    Returns:
+        写入的记录数
+    """
+    if not rows:
+        return 0
+    
+    # 所有记录使用相同的列（缺少的列补None，批量语句要求每行的列一致）
+    columns = set()
+    for row in rows:
+        columns.update(row)
+    rows = [{column: row.get(column) for column in columns} for row in rows]
+    
+    if db.get_bind().dialect.name == "postgresql":
+        _upsert_postgresql(db, model, rows, key, update_columns)
+    else:
+        _upsert_generic(db, model, rows, key, update_columns)
+    
+    logger.debug(f"批量写入 {len(rows)} 条记录到 {model.__tablename__}")
+    return len(rows)
+
+
+def _upsert_postgresql(db: Session, model, rows: List[Dict], key: str, update_columns: Sequence[str]):
+    """INSERT ... ON CONFLICT (key) DO UPDATE，一条语句写入一批记录"""
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    
+    table = model.__table__
+    statement = pg_insert(table)
+    if not update_columns:
+        statement = statement.on_conflict_do_nothing(index_elements=[table.c[key]])
+        for start in range(0, len(rows), CHUNK_SIZE):
+            db.execute(statement, rows[start:start + CHUNK_SIZE])
+        return
+    
+    set_ = {
+        column: func.coalesce(statement.excluded[column], table.c[column])
+        for column in update_columns
+    }
+    # ON CONFLICT DO UPDATE 不会触发列的 onupdate，需要手动更新
+    if 'updated_at_db' in table.c:
+        set_['updated_at_db'] = func.now()
+    statement = statement.on_conflict_do_update(index_elements=[table.c[key]], set_=set_)
+    
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(statement, rows[start:start + CHUNK_SIZE])
+
+
+def _upsert_generic(db: Session, model, rows: List[Dict], key: str, update_columns: Sequence[str]):
+    """其他数据库：每批查询一次已存在的记录，新记录批量插入，已存在的记录在会话中更新"""
+    key_column = getattr(model, key)
+    
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        existing = {
+            getattr(record, key): record
+            for record in db.query(model).filter(key_column.in_([row[key] for row in chunk])).all()
+        }
+        
+        new_rows = []
+        for row in chunk:
+            record = existing.get(row[key])
+            if record is None:
+                new_rows.append(row)
+                continue
+            for column in update_columns:
+                if row.get(column) is not None:
+                    setattr(record, column, row[column])
+        
+        if new_rows:
+            db.execute(insert(model), new_rows)
+        db.flush()
@@ -0,0 +1,94 @@
+"""响应压缩中间件 - 根据 Accept-Encoding 使用 brotli（已安装时）或 gzip 压缩较大的响应"""
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 可选的brotli导入
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# 需要压缩的内容类型（图片、CBZ等已经压缩过的文件不再压缩）
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+class CompressionMiddleware:
+    """响应压缩中间件
+    
+    - 只压缩一次性返回的响应（API的JSON列表等），流式响应（SSE事件流、文件下载）原样转发，
+      不会因为压缩缓冲而延迟推送
+    - 客户端支持 br 且安装了 brotli 时优先使用 brotli，否则使用 gzip
+    """
+    
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if BROTLI_AVAILABLE and "br" in accept_encoding:
+            encoding = "br"
+        elif "gzip" in accept_encoding:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+        
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """单个请求的响应压缩（缓存响应头，根据第一个响应体决定是否压缩）"""
+    
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Message = None
+        self.decided = False
+    
+    def _compress(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return brotli.compress(body, quality=self.middleware.brotli_quality)
+        return gzip.compress(body, compresslevel=self.middleware.gzip_level)
+    
+    def _should_compress(self, headers: Headers, body: bytes, more_body: bool) -> bool:
+        if more_body or len(body) < self.middleware.minimum_size:
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+    
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        
+        if message["type"] != "http.response.body" or self.decided:
+            await self.downstream(message)
+            return
+        
+        self.decided = True
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        
+        if self._should_compress(headers, body, more_body):
+            body = self._compress(body)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            message = {**message, "body": body}
+        
+        await self.downstream(self.start_message)
+        await self.downstream(message)
@@ -6,7 +6,7 @@ from alembic import command
 from alembic.config import Config
 from alembic.script import ScriptDirectory
 from alembic.runtime.migration import MigrationContext
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from app.config import settings
 from app.database import engine, Base
 from app.utils.logger import logger
@@ -35,6 +35,9 @@ def run_migrations():
         
         logger.info("开始检查数据库迁移...")
         
+        # 搜索使用的 pg_trgm 扩展（三元组索引需要先创建扩展）
+        ensure_extensions()
+        
         # 检查迁移脚本目录，如果不存在则创建
         versions_dir = os.path.join(backend_dir, "migrations", "versions")
         if not os.path.exists(versions_dir):
@@ -122,6 +125,18 @@ def run_migrations():
         # 如果确实需要迁移，会在后续操作中暴露问题
 
 
+def ensure_extensions():
+    """创建数据库扩展（仅PostgreSQL）"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        logger.info("已启用 pg_trgm 扩展")
+    except Exception as e:
+        logger.warning(f"创建 pg_trgm 扩展失败（搜索索引将无法创建）: {e}")
+
+
 def create_initial_migration():
     """
     创建初始迁移脚本（仅在需要时手动调用）
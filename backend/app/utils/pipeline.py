@@ -0,0 +1,79 @@
+"""流水线工具 - 在后台线程中运行生产者，通过有界队列把结果交给消费者"""
+import queue
+import threading
+from typing import Iterable, Iterator, Optional, TypeVar
+from app.utils.logger import logger, get_error_message
+
+T = TypeVar('T')
+
+_SENTINEL = object()
+
+
+def iter_in_background(iterable: Iterable[T], maxsize: int = 32, name: str = "pipeline-producer",
+                       stop_event: Optional[threading.Event] = None) -> Iterator[T]:
+    """在后台线程中迭代 iterable，按原顺序产出结果
+
+    生产者和消费者通过有界队列连接：队列满时生产者阻塞，
+    因此生产者最多领先消费者 maxsize 个元素。
+    生产者抛出的异常会在消费者一侧重新抛出。
+    消费者提前结束（break/close）时，生产者会在下一次放入队列时停止。
+
+    注意：iterable 的整个迭代过程都在后台线程中执行，
+    其中使用的资源（例如 WebDriver）在此期间不能被其他线程使用。
+
+    Args:
+        iterable: 生产者（通常是生成器）
+        maxsize: 队列容量
+        name: 后台线程名称（用于日志）
+        stop_event: 生产者在阻塞操作前检查的停止事件。传入时，消费者结束后设置该事件，
+            并等待生产者线程真正退出（之后可以安全释放生产者使用的资源）；
+            不传时生产者只在放入队列时停止，消费者最多等待5秒
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    cooperative = stop_event is not None
+    stop_event = stop_event or threading.Event()
+    errors = []
+
+    def put(item) -> bool:
+        """放入队列，消费者已停止时返回False"""
+        while not stop_event.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+        except BaseException as e:
+            logger.debug(f"{name} 生产者出错: {get_error_message(e)}")
+            errors.append(e)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+            put(_SENTINEL)
+
+    thread = threading.Thread(target=producer, name=name, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _SENTINEL:
+                break
+            yield item
+
+        if errors:
+            raise errors[0]
+    finally:
+        stop_event.set()
+        thread.join(timeout=None if cooperative else 5)
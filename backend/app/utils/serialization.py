@@ -0,0 +1,41 @@
+"""JSON序列化工具 - 安装了orjson时使用orjson，否则回退到标准库json"""
+import json
+from typing import Any, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# 可选的orjson导入
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# API默认的响应类
+DefaultJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+
+def dumps(obj: Any) -> str:
+    """序列化为JSON字符串（不转义中文，datetime输出ISO格式）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, default=_default)
+
+
+def _default(obj: Any):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None):
+    """
+    直接返回JSON响应，跳过FastAPI按 response_model 逐行校验和 jsonable_encoder 的转换
+    
+    content 只能包含基本类型和datetime（例如查询行直接转换的字典列表）
+    """
+    if ORJSON_AVAILABLE:
+        return ORJSONResponse(content, headers=headers)
+    return JSONResponse(jsonable_encoder(content), headers=headers)
@@ -0,0 +1,65 @@
+"""
+API响应基准测试
+
+对列表接口分别以不压缩、gzip、brotli 请求多次，输出延迟（中位数/P95）和实际传输字节数，
+用于比较序列化和压缩优化前后的效果（分别对优化前后的服务运行一次即可对比）
+
+用法:
+    python scripts/benchmark_api.py --base-url http://localhost:8000 --runs 20
+"""
+import argparse
+import statistics
+import time
+import requests
+
+DEFAULT_ENDPOINTS = [
+    "/api/mangas",
+    "/api/mangas?limit=100",
+    "/api/recent-updates",
+    "/api/tasks?limit=50",
+]
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def measure(session: requests.Session, url: str, encoding: str, runs: int):
+    """请求 runs 次，返回 (延迟列表（毫秒）, 传输字节数, 实际使用的编码)"""
+    latencies = []
+    wire_bytes = 0
+    used_encoding = "identity"
+    for _ in range(runs):
+        start = time.perf_counter()
+        # stream=True 读取原始字节，统计压缩后的传输大小
+        response = session.get(url, headers={"Accept-Encoding": encoding}, stream=True)
+        raw = response.raw.read(decode_content=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        wire_bytes = len(raw)
+        used_encoding = response.headers.get("Content-Encoding", "identity")
+    return latencies, wire_bytes, used_encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API响应基准测试（延迟和传输字节数）")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--endpoint", action="append", help="要测试的接口（可重复），默认测试所有列表接口")
+    args = parser.parse_args()
+    
+    session = requests.Session()
+    endpoints = args.endpoint or DEFAULT_ENDPOINTS
+    
+    print(f"{'接口':<28} {'请求编码':<9} {'响应编码':<9} {'中位数(ms)':>11} {'P95(ms)':>9} {'传输字节':>11}")
+    for endpoint in endpoints:
+        url = args.base_url.rstrip("/") + endpoint
+        # 预热（建立连接、填充数据库缓存）
+        session.get(url)
+        for encoding in ENCODINGS:
+            latencies, wire_bytes, used_encoding = measure(session, url, encoding, args.runs)
+            p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+            print(f"{endpoint:<28} {encoding:<9} {used_encoding:<9} "
+                  f"{statistics.median(latencies):>11.1f} {p95:>9.1f} {wire_bytes:>11,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+检查任务表热点查询的执行计划（仅PostgreSQL）
+
+在一个事务中插入大量历史任务并 ANALYZE，然后对下载队列、任务列表等查询执行 EXPLAIN，
+确认它们使用索引而不是全表扫描；结束时回滚，不会留下测试数据
+
+用法（在 backend 目录下，需要与应用相同的环境变量）:
+    python scripts/explain_task_queries.py --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models import Task  # noqa: E402
+
+SEED_SQL = text("""
+    INSERT INTO tasks (id, task_type, status, progress, completed_items, manga_id, created_at, updated_at)
+    SELECT md5(random()::text || g),
+           (ARRAY['download', 'sync', 'batch_download', 'sync_recent_updates'])[1 + g % 4],
+           (ARRAY['completed', 'failed'])[1 + g % 2],
+           100, 0, md5(g::text),
+           now() - make_interval(secs => g),
+           now() - make_interval(secs => g)
+    FROM generate_series(1, :rows) AS g
+""")
+
+
+def hot_queries(db):
+    """与 DownloadQueueManager、TaskManager 和 /api/tasks 相同的查询"""
+    return {
+        "队列：下一个待执行任务": db.query(Task).filter(
+            Task.task_type == "download", Task.status == "pending"
+        ).order_by(Task.created_at.asc()).limit(1),
+        "队列：列出待执行任务": db.query(Task).filter(
+            Task.task_type == "download", Task.status == "pending"
+        ).order_by(Task.created_at.asc()),
+        "队列：漫画是否已在队列中": db.query(Task).filter(
+            Task.task_type == "download", Task.manga_id == "x", Task.status.in_(["pending", "running"])
+        ).limit(1),
+        "任务列表（按类型）": db.query(Task).filter(
+            Task.task_type == "download"
+        ).order_by(Task.created_at.desc()).limit(10),
+        "任务列表（按类型和状态）": db.query(Task).filter(
+            Task.task_type == "download", Task.status == "completed"
+        ).order_by(Task.created_at.desc()).limit(10),
+        "任务列表（全部）": db.query(Task).order_by(Task.created_at.desc()).limit(10),
+        "最新任务": db.query(Task).filter(Task.task_type == "sync").order_by(Task.created_at.desc()).limit(1),
+        "未完成的任务（全部类型）": db.query(Task).filter(
+            Task.status.in_(["pending", "running"])
+        ).order_by(Task.created_at.desc()),
+    }
+
+
+def plan_nodes(plan):
+    """遍历执行计划的所有节点"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查任务表热点查询的执行计划")
+    parser.add_argument("--rows", type=int, default=200000, help="插入的历史任务数量（事务结束时回滚）")
+    parser.add_argument("--verbose", action="store_true", help="输出完整执行计划")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    if db.get_bind().dialect.name != "postgresql":
+        print("只支持PostgreSQL")
+        return 2
+    
+    failed = []
+    try:
+        if args.rows:
+            db.execute(SEED_SQL, {"rows": args.rows})
+        db.execute(text("ANALYZE tasks"))
+        
+        for name, query in hot_queries(db).items():
+            sql = str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]["Plan"]
+            nodes = list(plan_nodes(root))
+            seq_scans = [node for node in nodes if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "tasks"]
+            indexes = sorted({node["Index Name"] for node in nodes if node.get("Index Name")})
+            
+            status = "FAIL" if seq_scans else "OK"
+            if seq_scans:
+                failed.append(name)
+            print(f"[{status}] {name}: 代价 {root['Total Cost']:.1f}，索引 {', '.join(indexes) or '无'}")
+            if args.verbose:
+                print(json.dumps(root, ensure_ascii=False, indent=2))
+    finally:
+        db.rollback()
+        db.close()
+    
+    if failed:
+        print(f"{len(failed)} 个查询使用了全表扫描: {', '.join(failed)}")
+        return 1
+    print("所有查询都使用了索引")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
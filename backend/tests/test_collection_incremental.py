@@ -0,0 +1,46 @@
+"""收藏夹分类增量遍历测试（镜像切换后高水位和已知漫画仍然有效）"""
+from app.config import settings
+from app.crawler.collection import CollectionCrawler
+from app.crawler.parser import parse_html, manga_key
+
+OLD_MIRROR = "https://old.example.com"
+NEW_MIRROR = "https://new.example.com"
+
+
+class FakeBrowser:
+    base_url = NEW_MIRROR
+    driver = object()
+
+
+def listing_page(aids):
+    """单页收藏夹列表（当前镜像上的链接）"""
+    links = "".join(f'<a href="/photos-index-aid-{aid}.html">漫画{aid}</a>' for aid in aids)
+    return parse_html(f"<html><body>{links}</body></html>", f"{NEW_MIRROR}/users-users_fav-c-1.html")
+
+
+def crawl(aids, known_keys, high_water_url):
+    crawler = CollectionCrawler(FakeBrowser())
+    emitted = []
+    crawler._crawl_category(
+        "作者", f"{NEW_MIRROR}/users-users_fav-c-1.html", "1",
+        lambda url: listing_page(aids), emitted.append,
+        known_keys, True, high_water_url
+    )
+    return [item['manga_url'] for item in emitted]
+
+
+def test_high_water_mark_from_another_mirror_stops_crawl():
+    urls = crawl([5, 4, 3, 2, 1], set(), f"{OLD_MIRROR}/photos-index-aid-3.html")
+    
+    assert [manga_key(url) for url in urls] == ["5", "4"]
+
+
+def test_known_mangas_from_another_mirror_count_as_known():
+    known_keys = {manga_key(f"{OLD_MIRROR}/photos-index-aid-{aid}.html") for aid in range(1, 100)}
+    aids = list(range(120, 0, -1))
+    
+    urls = crawl(aids, known_keys, None)
+    
+    # 新漫画（aid >= 100）全部产出，之后连续 collection_known_run 个已知漫画时停止
+    new_count = len([aid for aid in aids if aid >= 100])
+    assert len(urls) == new_count + settings.collection_known_run - 1
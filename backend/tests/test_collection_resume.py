@@ -0,0 +1,85 @@
+"""收藏夹分类并发遍历的检查点恢复测试"""
+import threading
+from app.crawler.collection import CollectionCrawler
+from app.crawler.parser import parse_html
+
+BASE_URL = "https://example.com"
+
+BOOKSHELF_HTML = """
+<html><head><title>書架</title></head><body>
+  <a href="/users-users_fav-c-1.html">作者A</a>
+  <a href="/users-users_fav-c-2.html">作者B</a>
+  <a href="/users-users_fav-c-3.html">作者C</a>
+</body></html>
+"""
+
+
+def listing_html(category_id: str) -> str:
+    """每个分类一页，两个漫画"""
+    links = "".join(
+        f'<a href="/photos-index-aid-{category_id}0{i}.html">漫画{category_id}-{i}</a>' for i in range(2)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+class FakeHttp:
+    def __init__(self):
+        self.fetched = []
+    
+    def fetch(self, url):
+        self.fetched.append(url)
+        category_id = url.split("users-users_fav-c-")[1].split(".")[0].split("-")[0]
+        return listing_html(category_id)
+
+
+class FakeBrowser:
+    base_url = BASE_URL
+    driver = object()
+    
+    def __init__(self):
+        self.http = FakeHttp()
+    
+    def snapshot(self, url, wait=0):
+        return parse_html(BOOKSHELF_HTML, url)
+
+
+def collect(crawler, **kwargs):
+    """在线程中消费生成器，超时视为卡死"""
+    result = {}
+    
+    def run():
+        result['items'] = list(crawler.get_collection_stream(**kwargs))
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "恢复的同步没有结束"
+    return result['items']
+
+
+def test_resume_skips_completed_categories_and_finishes():
+    browser = FakeBrowser()
+    crawler = CollectionCrawler(browser)
+    progress = []
+    
+    items = collect(
+        crawler,
+        resume={'completed_categories': ['1', '3'], 'cursors': {}},
+        progress_callback=lambda completed, total, name: progress.append((completed, total))
+    )
+    
+    assert {item['author'] for item in items} == {"作者B"}
+    assert len(items) == 2
+    assert all("c-2" in url for url in browser.http.fetched)
+    # 已完成的分类计入进度，最后一个分类完成时进度到达总数
+    assert progress == [(3, 3)]
+
+
+def test_resume_with_all_categories_completed_returns_immediately():
+    browser = FakeBrowser()
+    crawler = CollectionCrawler(browser)
+    
+    items = collect(crawler, resume={'completed_categories': ['1', '2', '3']})
+    
+    assert items == []
+    assert browser.http.fetched == []
@@ -38,8 +38,8 @@ fi
 
 # 创建必要的目录
 echo "📁 创建必要的目录..."
-mkdir -p backend/downloads backend/covers backend/logs
-chmod -R 755 backend/downloads backend/covers backend/logs
+mkdir -p backend/downloads backend/covers backend/logs backend/cache
+chmod -R 755 backend/downloads backend/covers backend/logs backend/cache
 
 # 检查环境变量文件
 if [ ! -f ".env" ]; then